@@ -0,0 +1,126 @@
+import hashlib
+import math
+import smtplib
+import time
+from typing import Callable, Dict, List, Optional
+
+from attachments import readable_attachments, split_attachments
+
+# SMTP reply codes that mean the sending account (not the recipient) is throttled or unusable
+ACCOUNT_LIMIT_CODES = {421, 451, 452, 454, 550, 554}
+ACCOUNT_LIMIT_HINTS = ('quota', 'limit', 'rate', 'too many', 'exceeded', 'suspended')
+
+
+def is_account_error(error: Exception) -> bool:
+    """Check whether a send failure should take the account out of rotation"""
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPSenderRefused)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in ACCOUNT_LIMIT_CODES:
+        message = error.smtp_error.decode('utf-8', 'replace') if isinstance(error.smtp_error, bytes) else str(error.smtp_error)
+        return error.smtp_code == 421 or any(hint in message.lower() for hint in ACCOUNT_LIMIT_HINTS)
+    return False
+
+
+class AccountPool:
+    """Spread sends across all configured accounts, weighted by each account's daily quota
+
+    Recipients are assigned with weighted rendezvous hashing, so the same address
+    always gets the same From account while that account is healthy. When an
+    account fails with an auth/quota error its recipients move to their next choice.
+    """
+
+    def __init__(self, email_sender, accounts: List[str] = None, cooldown: float = 300.0):
+        self.email_sender = email_sender
+        names = accounts or list(email_sender.email_accounts)
+        self.accounts = {name: email_sender.email_accounts[name] for name in names}
+        self.cooldown = cooldown
+        self.sent = {name: 0 for name in self.accounts}
+        self.disabled_until = {}
+        self.sessions = {}
+
+    def quota(self, account_name: str) -> int:
+        """Messages the account may send in this run"""
+        return max(0, self.accounts[account_name].get('daily_quota', 500))
+
+    def is_available(self, account_name: str) -> bool:
+        """Check whether an account has quota left and is not cooling down"""
+        if self.sent[account_name] >= self.quota(account_name):
+            return False
+        return time.monotonic() >= self.disabled_until.get(account_name, 0)
+
+    def _score(self, account_name: str, recipient_email: str) -> float:
+        """Weighted rendezvous score of an account for a recipient"""
+        digest = hashlib.blake2b(f"{account_name}\0{recipient_email.strip().lower()}".encode('utf-8'),
+                                 digest_size=8).digest()
+        # Uniform in (0, 1); weight / -ln(u) picks accounts in proportion to their weight
+        uniform = (int.from_bytes(digest, 'big') + 1) / (2 ** 64 + 2)
+        return self.quota(account_name) / -math.log(uniform)
+
+    def candidates(self, recipient_email: str) -> List[str]:
+        """Available accounts for a recipient, in preference order"""
+        ranked = sorted(self.accounts, key=lambda name: self._score(name, recipient_email), reverse=True)
+        return [name for name in ranked if self.is_available(name)]
+
+    def account_for(self, recipient_email: str) -> Optional[str]:
+        """The account that should send to this recipient, or None if all are exhausted"""
+        candidates = self.candidates(recipient_email)
+        return candidates[0] if candidates else None
+
+    def mark_failed(self, account_name: str, error: Exception):
+        """Take an account out of rotation after an auth/quota error"""
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            # Credentials will not fix themselves during this run
+            self.disabled_until[account_name] = float('inf')
+        else:
+            self.disabled_until[account_name] = time.monotonic() + self.cooldown
+        self._close_session(account_name)
+        print(f"⚠️  Account '{account_name}' taken out of rotation: {error}")
+
+    def send(self, recipient_email: str, subject: str, body: str, attachments: list = None,
+             message_id_for: Callable[[dict], Optional[str]] = None) -> Optional[str]:
+        """Send one message, failing over between accounts; returns the account used
+
+        message_id_for(account_info), when given, supplies the Message-ID for the account tried.
+        """
+        file_attachments = readable_attachments(split_attachments(attachments)[0])
+        use_streaming = self.email_sender._should_stream(file_attachments)
+
+        for account_name in self.candidates(recipient_email):
+            account_info = self.accounts[account_name]
+            try:
+                server = self._session(account_name)
+                self.email_sender._deliver(server, account_info, recipient_email, [recipient_email], subject, body,
+                                           file_attachments, use_streaming,
+                                           message_id_for(account_info) if message_id_for else None)
+                self.sent[account_name] += 1
+                print(f"✅ Email sent to {recipient_email} from {account_info['email']}")
+                return account_name
+            except Exception as e:
+                if is_account_error(e):
+                    self.mark_failed(account_name, e)
+                    continue
+                self._close_session(account_name)
+                print(f"❌ Failed to send to {recipient_email}: {str(e)}")
+                return None
+
+        print(f"❌ No email account available for {recipient_email}")
+        return None
+
+    def usage(self) -> Dict[str, int]:
+        """Messages sent per account in this run"""
+        return dict(self.sent)
+
+    def _session(self, account_name: str):
+        """Reuse one authenticated SMTP session per account"""
+        if account_name not in self.sessions:
+            self.sessions[account_name] = self.email_sender._connect_smtp(self.accounts[account_name])
+        return self.sessions[account_name]
+
+    def _close_session(self, account_name: str):
+        """Drop an account's SMTP session"""
+        self.email_sender._close_smtp(self.sessions.pop(account_name, None))
+
+    def close(self):
+        """Close all SMTP sessions"""
+        for account_name in list(self.sessions):
+            self._close_session(account_name)
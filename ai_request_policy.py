@@ -0,0 +1,260 @@
+import asyncio
+import http.client
+import random
+import threading
+import time
+import urllib.error
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Awaitable, Callable, Optional
+
+from metrics import metrics
+
+# HTTP status codes that are worth retrying (throttling and server-side errors)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Transient errors raised without a status code: timeouts, refused/reset connections, truncated responses
+RETRYABLE_ERRORS = (TimeoutError, asyncio.TimeoutError, ConnectionError, http.client.HTTPException)
+# SDK (groq/openai) connection and timeout errors, matched by name so the SDK stays optional
+RETRYABLE_SDK_ERRORS = {'APIConnectionError', 'APITimeoutError'}
+
+
+class RequestTimeoutError(TimeoutError):
+    """Raised when an AI request does not answer within its deadline"""
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Record the latency of a successful request"""
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Get the latency percentile over the rolling window"""
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class RequestPolicy:
+    def __init__(self, timeout: float = 30.0, max_retries: int = 2, retry_backoff: float = 0.5,
+                 max_backoff: float = 8.0, deadline: float = 90.0, hedge: bool = False,
+                 hedge_percentile: float = 95, hedge_min_delay: float = 1.0,
+                 hedge_min_samples: int = 20, max_workers: int = 8):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+        self.max_workers = max_workers
+        # Only hedged requests need worker threads; created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, section: str = 'ai_settings') -> 'RequestPolicy':
+        """Build a request policy from the [ai_settings] section"""
+        return cls(
+            timeout=config.getfloat(section, 'request_timeout', fallback=30.0),
+            max_retries=config.getint(section, 'max_retries', fallback=2),
+            retry_backoff=config.getfloat(section, 'retry_backoff', fallback=0.5),
+            deadline=config.getfloat(section, 'request_deadline', fallback=90.0),
+            hedge=config.getboolean(section, 'hedge_requests', fallback=False),
+            hedge_percentile=config.getfloat(section, 'hedge_percentile', fallback=95),
+            hedge_min_delay=config.getfloat(section, 'hedge_min_delay', fallback=1.0)
+        )
+
+    def hedge_delay(self) -> float:
+        """Delay before firing a duplicate request, based on observed tail latency"""
+        if len(self.latency) < self.hedge_min_samples:
+            return max(self.hedge_min_delay, self.timeout / 2)
+        observed = self.latency.percentile(self.hedge_percentile)
+        return max(self.hedge_min_delay, observed)
+
+    def close(self):
+        """Shut down the hedging threads"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ai-request')
+            return self._executor
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Check whether a failed request should be retried
+
+        Only timeouts, connection failures and error responses with a
+        retryable status code are retried; anything else (bad requests,
+        programming errors) fails immediately.
+        """
+        if isinstance(error, RETRYABLE_ERRORS):
+            return True
+        if isinstance(error, urllib.error.URLError) and not isinstance(error, urllib.error.HTTPError):
+            # DNS failures and refused connections from urllib
+            return True
+        if any(cls.__name__ in RETRYABLE_SDK_ERRORS for cls in type(error).__mro__):
+            return True
+        status_code = getattr(error, 'status_code', None)
+        return isinstance(status_code, int) and status_code in RETRYABLE_STATUS_CODES
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with jitter, honouring Retry-After when present"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers:
+            try:
+                return min(self.max_backoff, float(headers.get('retry-after')))
+            except (TypeError, ValueError):
+                pass
+        delay = min(self.max_backoff, self.retry_backoff * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _attempt_timeout(self, started: float, label: str) -> float:
+        """Timeout for the next attempt, bounded by the overall deadline"""
+        remaining = self.deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            raise RequestTimeoutError(f"{label} exceeded its {self.deadline:.0f}s deadline")
+        return min(self.timeout, remaining)
+
+    def _retry_delay(self, attempt: int, error: Exception, started: float, label: str) -> Optional[float]:
+        """Delay before retrying a failed attempt, or None to give up"""
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return None
+        delay = self._backoff_delay(attempt, error)
+        if time.monotonic() - started + delay >= self.deadline:
+            return None
+        print(f"⚠️  {label} failed ({error}); retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+        metrics.incr('generation_retries')
+        return delay
+
+    def call(self, request_fn: Callable[[float], object], label: str = 'AI request'):
+        """Run request_fn(timeout) under the deadline, retry and hedging policy"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(started, label)
+            try:
+                return self._attempt(request_fn, timeout)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, started, label)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    async def acall(self, request_fn: Callable[[float], Awaitable], label: str = 'AI request'):
+        """Async version of call(): request_fn(timeout) returns an awaitable"""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(started, label)
+            try:
+                return await self._async_attempt(request_fn, timeout)
+            except Exception as e:
+                delay = self._retry_delay(attempt, e, started, label)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def _timed(self, request_fn: Callable[[float], object], timeout: float):
+        """Run a single request and record its latency on success"""
+        start = time.monotonic()
+        result = request_fn(timeout)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _attempt(self, request_fn: Callable[[float], object], timeout: float):
+        """Run one attempt, optionally hedged with a duplicate request"""
+        if not self.hedge:
+            # The client enforces the timeout itself; skipping the executor keeps concurrency unbounded
+            return self._timed(request_fn, timeout)
+        started = time.monotonic()
+        executor = self._get_executor()
+        primary = executor.submit(self._timed, request_fn, timeout)
+        pending = {primary}
+
+        done, _ = wait(pending, timeout=min(self.hedge_delay(), timeout))
+        if not done:
+            hedge_timeout = max(0.0, timeout - (time.monotonic() - started))
+            pending.add(executor.submit(self._timed, request_fn, hedge_timeout))
+            metrics.incr('generation_hedges')
+
+        last_error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                last_error = future.exception()
+
+        if last_error is not None and not pending:
+            raise last_error
+        raise RequestTimeoutError(f"no response within {timeout:.1f}s")
+
+    async def _async_attempt(self, request_fn: Callable[[float], Awaitable], timeout: float):
+        """Run one async attempt, optionally hedged with a duplicate request"""
+        started = time.monotonic()
+
+        async def timed(request_timeout):
+            start = time.monotonic()
+            result = await request_fn(request_timeout)
+            self.latency.record(time.monotonic() - start)
+            return result
+
+        pending = {asyncio.ensure_future(timed(timeout))}
+        try:
+            if self.hedge:
+                done, _ = await asyncio.wait(pending, timeout=min(self.hedge_delay(), timeout))
+                if not done:
+                    hedge_timeout = max(0.0, timeout - (time.monotonic() - started))
+                    pending.add(asyncio.ensure_future(timed(hedge_timeout)))
+                    metrics.incr('generation_hedges')
+
+            last_error = None
+            while pending:
+                remaining = timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, remaining),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+
+            if last_error is not None and not pending:
+                raise last_error
+            raise RequestTimeoutError(f"no response within {timeout:.1f}s")
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,470 @@
+import asyncio
+import base64
+import smtplib
+import ssl
+import sys
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List
+
+from attachments import readable_attachments, split_attachments
+from batch_progress import BatchProgress
+from email_sender import EmailSender
+from metrics import metrics
+from mime_stream import StreamingMessage, BytesMessage
+from recipient_filters import RecipientDeduper
+from recipient_sources import personalization
+from sent_log import content_hash, idempotency_key, message_id
+from smtp_pipelining import bdat_frames, envelope_commands, envelope_continues, envelope_result
+
+# Errors after which the SMTP session is still usable (the transaction was reset)
+RECOVERABLE_SMTP_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+# StreamWriter.start_tls (STARTTLS) is 3.11+, asyncio.to_thread (blocking providers) 3.9+
+ASYNC_MIN_PYTHON = (3, 11)
+
+
+def require_async_support():
+    """Fail early with a clear error on Python versions the async path cannot run on"""
+    if sys.version_info < ASYNC_MIN_PYTHON:
+        raise RuntimeError(
+            f"Async sending requires Python {'.'.join(map(str, ASYNC_MIN_PYTHON))}+ "
+            f"(running {sys.version_info.major}.{sys.version_info.minor}); use batch_email_sender.py instead"
+        )
+
+
+class AsyncSMTPConnection:
+    """Minimal asyncio SMTP client with STARTTLS, AUTH, PIPELINING and CHUNKING"""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.extensions = {}
+
+    async def connect(self):
+        """Open the connection and greet the server"""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        code, response = await self._read_reply()
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, response)
+        await self.ehlo()
+
+    async def _read_reply(self):
+        """Read a (possibly multi-line) reply"""
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not line:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].strip())
+            if line[3:4] != b'-':
+                return int(line[:3]), b'\n'.join(lines)
+
+    async def command(self, line: str):
+        """Send one command and wait for its reply"""
+        self.writer.write(line.encode('ascii') + b'\r\n')
+        await self.writer.drain()
+        return await self._read_reply()
+
+    async def ehlo(self):
+        """Send EHLO and record the advertised extensions"""
+        code, response = await self.command('EHLO localhost')
+        if code != 250:
+            raise smtplib.SMTPHeloError(code, response)
+        self.extensions = {}
+        for line in response.decode('latin-1').split('\n')[1:]:
+            keyword, _, params = line.partition(' ')
+            self.extensions[keyword.lower()] = params
+
+    def has_extn(self, name: str) -> bool:
+        return name.lower() in self.extensions
+
+    async def starttls(self):
+        """Upgrade the connection to TLS"""
+        require_async_support()
+        code, response = await self.command('STARTTLS')
+        if code != 220:
+            raise smtplib.SMTPResponseException(code, response)
+        await self.writer.start_tls(ssl.create_default_context(), server_hostname=self.host)
+        await self.ehlo()
+
+    async def login(self, username: str, password: str):
+        """Authenticate with AUTH PLAIN (or AUTH LOGIN)"""
+        mechanisms = self.extensions.get('auth', '').upper().split()
+        if 'PLAIN' in mechanisms or 'LOGIN' not in mechanisms:
+            token = base64.b64encode(f"\0{username}\0{password}".encode('utf-8')).decode('ascii')
+            code, response = await self.command(f'AUTH PLAIN {token}')
+        else:
+            await self.command('AUTH LOGIN')
+            await self.command(base64.b64encode(username.encode('utf-8')).decode('ascii'))
+            code, response = await self.command(base64.b64encode(password.encode('utf-8')).decode('ascii'))
+        if code != 235:
+            raise smtplib.SMTPAuthenticationError(code, response)
+
+    async def send_streamed(self, from_addr: str, to_addrs: List[str], message) -> dict:
+        """Send a message object exposing iter_chunks(dot_stuff); returns refused recipients"""
+        pipelining = self.has_extn('pipelining')
+        chunking = self.has_extn('chunking')
+
+        commands = envelope_commands(from_addr, to_addrs, use_data=not chunking)
+        if pipelining:
+            self.writer.write(''.join(command + '\r\n' for command in commands).encode('ascii'))
+            await self.writer.drain()
+            replies = [await self._read_reply() for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                replies.append(await self.command(command))
+                if not envelope_continues(replies, len(to_addrs)):
+                    break
+
+        refused, data_accepted, error = envelope_result(from_addr, to_addrs, replies, use_data=not chunking)
+        if error is not None:
+            if data_accepted:
+                self.writer.write(b'.\r\n')
+                await self._read_reply()
+            await self.command('RSET')
+            raise error
+
+        if chunking:
+            await self._send_bdat(message, pipelining)
+        else:
+            sent_bytes = 0
+            for chunk in message.iter_chunks(dot_stuff=True):
+                self.writer.write(chunk)
+                sent_bytes += len(chunk)
+                await self.writer.drain()
+            self.writer.write(b'.\r\n')
+            metrics.incr('smtp_bytes_sent', sent_bytes)
+            await self.writer.drain()
+            code, response = await self._read_reply()
+            if code != 250:
+                raise smtplib.SMTPDataError(code, response)
+        return refused
+
+    async def _send_bdat(self, message, pipelining: bool):
+        """Send the body as BDAT chunks, reading replies in batches when pipelining"""
+        for frame in bdat_frames(message, pipelining):
+            self.writer.write(frame.data)
+            await self.writer.drain()
+            for _ in range(frame.replies):
+                code, response = await self._read_reply()
+                if code != 250:
+                    raise smtplib.SMTPDataError(code, response)
+
+    async def quit(self):
+        """Say goodbye and close the connection"""
+        try:
+            await self.command('QUIT')
+        except Exception:
+            pass
+        await self.close()
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+
+
+class AsyncSMTPPool:
+    """A bounded pool of authenticated SMTP sessions for one account"""
+
+    def __init__(self, account_info: dict, size: int = 4, timeout: float = 30.0, use_tls: bool = True):
+        self.account_info = account_info
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def _open(self) -> AsyncSMTPConnection:
+        connection = AsyncSMTPConnection(self.account_info['smtp_server'], self.account_info['smtp_port'], self.timeout)
+        with metrics.timer('smtp_connect'):
+            await connection.connect()
+            try:
+                if self.use_tls:
+                    await connection.starttls()
+            except Exception:
+                metrics.incr('smtp_connect_errors')
+                await connection.close()
+                raise
+        try:
+            with metrics.timer('smtp_auth'):
+                await connection.login(self.account_info['smtp_username'], self.account_info['smtp_password'])
+        except Exception:
+            metrics.incr('smtp_connect_errors')
+            await connection.close()
+            raise
+        return connection
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a session; broken sessions are dropped instead of returned"""
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._open()
+            try:
+                yield connection
+            except RECOVERABLE_SMTP_ERRORS:
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                await connection.close()
+                raise
+            else:
+                self._idle.append(connection)
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().quit()
+
+
+class AsyncEmailSender:
+    """Async generation and sending that shares configuration with EmailSender
+
+    EmailSender stays the blocking API behind the interactive menus; this class
+    reuses its settings, prompts, templates and MIME building, and keeps many
+    LLM and SMTP operations in flight on one event loop.
+    """
+
+    def __init__(self, email_sender: EmailSender = None, config_file='email_config.cfg'):
+        require_async_support()
+        self.email_sender = email_sender or EmailSender(config_file)
+        config = self.email_sender.config
+        self.generation_concurrency = config.getint('sending_settings', 'async_generation_concurrency', fallback=100)
+        self.smtp_connections = config.getint('sending_settings', 'async_smtp_connections', fallback=4)
+        self.smtp_timeout = config.getfloat('sending_settings', 'smtp_timeout', fallback=30.0)
+        self.use_tls = True
+        self.verbose = True
+        self._generation_slots = asyncio.Semaphore(self.generation_concurrency)
+        self._pools = {}
+
+    def _pool(self, account_name: str) -> AsyncSMTPPool:
+        """Get (or create) the shared SMTP pool for an account"""
+        if account_name not in self._pools:
+            self._pools[account_name] = AsyncSMTPPool(
+                self.email_sender.email_accounts[account_name], self.smtp_connections, self.smtp_timeout, self.use_tls
+            )
+        return self._pools[account_name]
+
+    async def generate_email_content(self, recipient_name: str, message_request: str, tone_option: str,
+                                     attachments: list = None, recipient_details: dict = None) -> str:
+        """Async version of EmailSender.generate_email_content"""
+        sender = self.email_sender
+        if not sender.provider.is_available():
+            metrics.incr('generation_fallbacks')
+            return sender._create_fallback_email(recipient_name, message_request, tone_option, attachments)
+
+        request = sender.build_generation_request(recipient_name, message_request, tone_option, attachments,
+                                                  recipient_details)
+        if not sender.provider.capabilities.network:
+            return await sender.provider.agenerate(request)
+        async with self._generation_slots:
+            try:
+                metrics.incr('generation_requests')
+                with metrics.timer('generation'):
+                    return await sender.provider.agenerate(request)
+            except Exception as e:
+                print(f"⚠️  AI generation failed: {str(e)}")
+                metrics.incr('generation_errors')
+                metrics.incr('generation_fallbacks')
+                return sender._create_fallback_email(recipient_name, message_request, tone_option, attachments)
+
+    async def resolve_recipients(self, names: Iterable[str]) -> Dict[str, List[str]]:
+        """Resolve contact names (or plain addresses) to email lists without prompting"""
+        contact_manager = self.email_sender.contact_manager
+        resolved = {}
+        for i, name in enumerate(names, 1):
+            if self.email_sender.validate_email(name):
+                resolved[name] = [name]
+            else:
+                resolved[name] = contact_manager.get_contact_emails(name)
+            if i % 1000 == 0:
+                # Keep the event loop responsive on very large lists
+                await asyncio.sleep(0)
+        return resolved
+
+    async def send_email(self, recipient_emails: list, subject: str, body: str, attachments: list = None,
+                         recipient_mode: str = None, account_name: str = None, campaign_id: str = None,
+                         message_hash: str = None, on_already_sent: Callable[[str], None] = None) -> bool:
+        """Async version of EmailSender.send_email; individual messages are sent concurrently
+
+        Idempotency keys are claimed before sending, so concurrent workers never
+        deliver the same (account, recipient, message, campaign) twice.
+        """
+        sender = self.email_sender
+        account_name = account_name or sender.current_account
+        account_info = sender.email_accounts.get(account_name)
+        if not account_info:
+            print("❌ No email account configured")
+            return False
+
+        recipient_mode = recipient_mode or sender.sending_settings['recipient_mode']
+        recipient_emails = sender.filter_suppressed(sender.dedup_recipients(recipient_emails))
+        if not recipient_emails:
+            return False
+        file_attachments = readable_attachments(split_attachments(attachments)[0])
+        use_streaming = sender._should_stream(file_attachments)
+        pool = self._pool(account_name)
+
+        keys = {}
+        if sender.sent_log is not None and campaign_id:
+            message_hash = message_hash or content_hash(subject, body, *(a.path for a in file_attachments))
+            recipient_emails, keys = sender.claim_sends(account_info, recipient_emails, message_hash, campaign_id,
+                                                        on_already_sent)
+            if not recipient_emails:
+                return True
+
+        def finish(recipient_email, sent, sent_message_id=None):
+            if recipient_email in keys:
+                if sent:
+                    sender.sent_log.record(keys[recipient_email], recipient_email, campaign_id, sent_message_id)
+                else:
+                    sender.sent_log.release(keys[recipient_email])
+
+        async def deliver(to_header, envelope, msg_id=None):
+            with metrics.timer('mime_build'):
+                if use_streaming:
+                    # Opened before borrowing a session, so a vanished file cannot fail mid-message
+                    message = StreamingMessage(sender._message_headers(account_info, to_header, subject, msg_id), body,
+                                               file_attachments).open()
+                else:
+                    message = BytesMessage.from_mime(
+                        sender._build_mime_message(account_info, to_header, subject, body, file_attachments, msg_id)
+                    )
+            try:
+                async with pool.connection() as connection:
+                    with metrics.timer('smtp_send'):
+                        return await connection.send_streamed(account_info['email'], envelope, message)
+            finally:
+                if use_streaming:
+                    message.close()
+
+        async def deliver_one(recipient_email):
+            msg_id = message_id(keys[recipient_email], account_info['email']) if keys else None
+            try:
+                await deliver(recipient_email, [recipient_email], msg_id)
+                finish(recipient_email, True, msg_id)
+                if self.verbose:
+                    print(f"✅ Email sent to {recipient_email}")
+                return True
+            except Exception as e:
+                finish(recipient_email, False)
+                print(f"❌ Failed to send to {recipient_email}: {str(e)}")
+                return False
+
+        success_count = 0
+        individual_recipients = recipient_emails
+        if recipient_mode in ('shared', 'bcc') and len(recipient_emails) > 1:
+            individual_recipients = []
+            chunk_size = max(1, account_info.get('max_recipients', 50))
+            for start in range(0, len(recipient_emails), chunk_size):
+                chunk = recipient_emails[start:start + chunk_size]
+                to_header = ', '.join(chunk) if recipient_mode == 'shared' else 'undisclosed-recipients:;'
+                chunk_message_id = None
+                if keys:
+                    chunk_message_id = message_id(idempotency_key(account_info['email'], '\n'.join(chunk), message_hash,
+                                                                  campaign_id), account_info['email'])
+                try:
+                    refused = await deliver(to_header, chunk, chunk_message_id)
+                except smtplib.SMTPRecipientsRefused as e:
+                    refused = e.recipients
+                except Exception as e:
+                    print(f"❌ Failed to send to {len(chunk)} recipient(s): {str(e)}")
+                    for r in chunk:
+                        finish(r, False)
+                    continue
+                success_count += len(chunk) - len(refused)
+                for r in chunk:
+                    if r not in refused:
+                        finish(r, True, chunk_message_id)
+                individual_recipients.extend(r for r in chunk if r in refused)
+
+        results = await asyncio.gather(*(deliver_one(r) for r in individual_recipients))
+        success_count += sum(results)
+        metrics.incr('emails_sent', success_count)
+        metrics.incr('emails_failed', len(recipient_emails) - success_count)
+        return success_count > 0
+
+    async def send_batch(self, recipients: Iterable[dict], concurrency: int = None,
+                         on_result: Callable[[str, dict], None] = None, progress: BatchProgress = None,
+                         campaign_id: str = None, account_names: list = None) -> dict:
+        """Generate and send to many recipients (dicts with name, email, message, tone) without prompts
+
+        recipients can be any iterable of such dicts, e.g. csv.DictReader or a
+        ContactBatchSource; optional company/position fields personalize generation.
+
+        on_result(status, recipient) is called with 'sent', 'failed' or 'skipped' for each record.
+        progress, when given, tracks throughput and the generate/send queue depths.
+        With a campaign_id, recipients already in the sent log are skipped before generation;
+        account_names lists every account that may have sent to them (default: the current one).
+        """
+        progress = progress or BatchProgress(live=False)
+        summary = {'sent': 0, 'failed': 0, 'skipped': 0, 'already_sent': 0}
+
+        def record(status, recipient):
+            summary[status] += 1
+            progress.record(status)
+            if on_result:
+                on_result(status, recipient)
+
+        # Repeated addresses are skipped before any generation or SMTP work
+        deduper = RecipientDeduper.from_config(self.email_sender.config,
+                                               expected=len(recipients) if hasattr(recipients, '__len__') else None)
+        records = deduper.filter_records(recipients, on_duplicate=lambda recipient: record('skipped', recipient))
+        suppressed = []
+        if self.email_sender.suppression is not None:
+            def skip_suppressed(recipient, reason):
+                suppressed.append(recipient)
+                record('skipped', recipient)
+            records = self.email_sender.suppression.filter_records(records, on_suppressed=skip_suppressed)
+
+        async def worker():
+            for recipient in records:
+                name = (recipient.get('name') or '').strip()
+                email = (recipient.get('email') or '').strip()
+                message = (recipient.get('message') or '').strip()
+                tone = (recipient.get('tone') or 'Formal').strip()
+                if not all([name, email, message]):
+                    record('skipped', recipient)
+                    continue
+                message_hash = content_hash(message, tone)
+                if self.email_sender.already_sent(email, message_hash, campaign_id, account_names):
+                    summary['already_sent'] += 1
+                    record('skipped', recipient)
+                    continue
+                with progress.stage('generate'):
+                    content = await self.generate_email_content(name, message, tone,
+                                                                recipient_details=personalization(recipient))
+                    subject, body = self.email_sender.parse_generated_content(content)
+                # Another worker or process may have claimed the key since the check above
+                claimed = []
+                with progress.stage('send'):
+                    sent = await self.send_email([email], subject, body, campaign_id=campaign_id,
+                                                 message_hash=message_hash, on_already_sent=claimed.append)
+                if claimed:
+                    summary['already_sent'] += 1
+                    record('skipped', recipient)
+                else:
+                    record('sent' if sent else 'failed', recipient)
+
+        workers = concurrency or self.generation_concurrency
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        summary['duplicates'] = deduper.report.duplicates
+        summary['suppressed'] = len(suppressed)
+        metrics.incr('recipients_deduplicated', deduper.report.duplicates)
+        metrics.incr('recipients_suppressed', len(suppressed))
+        metrics.flush()
+        return summary
+
+    async def close(self):
+        """Close pooled SMTP sessions"""
+        for pool in self._pools.values():
+            await pool.close()
+        self._pools.clear()
@@ -0,0 +1,66 @@
+import os
+from dataclasses import dataclass
+from typing import ClassVar, List, Tuple
+
+
+@dataclass(frozen=True)
+class FileAttachment:
+    path: str
+    is_link: ClassVar[bool] = False
+
+    @property
+    def name(self) -> str:
+        """File name shown to the user and used in the MIME part"""
+        return os.path.basename(self.path)
+
+
+@dataclass(frozen=True)
+class LinkAttachment:
+    url: str
+    label: str = ''
+    is_link: ClassVar[bool] = True
+
+    @classmethod
+    def from_input(cls, url: str, label: str = '') -> 'LinkAttachment':
+        """Create a link from user input, defaulting to https://"""
+        url = url.strip()
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        return cls(url, label.strip())
+
+    @property
+    def name(self) -> str:
+        """Link text shown to the user"""
+        return self.label or self.url
+
+    @property
+    def markdown(self) -> str:
+        """Markdown form of the link"""
+        return f"[{self.name}]({self.url})"
+
+
+def coerce_attachments(attachments) -> list:
+    """Accept attachment objects or plain file paths and return attachment objects"""
+    if not attachments:
+        return []
+    return [FileAttachment(att) if isinstance(att, str) else att for att in attachments]
+
+
+def readable_attachments(file_attachments: List[FileAttachment]) -> List[FileAttachment]:
+    """Files that can be opened for reading; the others are skipped with a warning"""
+    readable = []
+    for attachment in file_attachments:
+        try:
+            with open(attachment.path, 'rb'):
+                readable.append(attachment)
+        except OSError as e:
+            print(f"⚠️  Failed to attach {attachment.path}: {str(e)}")
+    return readable
+
+
+def split_attachments(attachments) -> Tuple[List[FileAttachment], List[LinkAttachment]]:
+    """Split attachments into (files, links)"""
+    files, links = [], []
+    for att in coerce_attachments(attachments):
+        (links if att.is_link else files).append(att)
+    return files, links
@@ -1,23 +1,94 @@
 import csv
 import json
+from account_pool import AccountPool
+from batch_progress import BatchProgress
 from email_sender import EmailSender
+from metrics import metrics
+from profiling import BatchProfiler, parse_profile_mode
+from recipient_filters import RecipientDeduper
+from recipient_sources import ContactBatchSource, csv_recipients, personalization
+from sent_log import content_hash, idempotency_key, message_id
 
 class BatchEmailSender:
     def __init__(self, config_file='email_config.cfg'):
         self.email_sender = EmailSender(config_file)
     
-    def send_batch_emails(self, csv_file_path):
-        """Send emails to multiple recipients from a CSV file"""
+    def send_batch_emails(self, csv_file_path, use_account_pool=False, profile=None, campaign_id=None):
+        """Send emails to multiple recipients from a CSV file
+        
+        With use_account_pool the batch is spread across all configured accounts.
+        profile ('cprofile' or 'sampling') overrides [profiling] mode for this run.
+        campaign_id scopes the sent log: re-running with the same ID skips recipients
+        that already received their message. Without one the sent log is not checked.
+        """
+        with BatchProfiler.from_config(self.email_sender.config, 'batch', profile):
+            try:
+                # Count in a first pass so rows are streamed rather than held in memory
+                total = sum(1 for _ in csv_recipients(csv_file_path))
+            except Exception as e:
+                print(f"❌ Error processing batch: {str(e)}")
+                return
+            
+            print(f"📋 Found {total} recipients in CSV file")
+            self._send_batch(csv_recipients(csv_file_path), total, use_account_pool, campaign_id)
+    
+    def send_segment_emails(self, message, tone='Formal', segment=None, search=None, all_emails=False,
+                            use_account_pool=False, profile=None, campaign_id=None):
+        """Send a campaign to contacts selected by a segment query or search term
+        
+        Recipients are streamed from the contact store; no CSV export is needed.
+        campaign_id scopes the sent log as in send_batch_emails.
+        """
+        with BatchProfiler.from_config(self.email_sender.config, 'batch', profile):
+            try:
+                source = ContactBatchSource(self.email_sender.contact_manager, message, tone, segment=segment,
+                                            search=search, all_emails=all_emails)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            
+            total = len(source)
+            print(f"📋 Found {total} recipients in the contact store")
+            if total:
+                self._send_batch(source, total, use_account_pool, campaign_id)
+    
+    def _send_batch(self, recipients, total, use_account_pool, campaign_id=None):
+        account_pool = AccountPool(self.email_sender) if use_account_pool else None
+        progress = None
+        if self.email_sender.sent_log is not None:
+            if campaign_id:
+                print(f"🧾 Sent log: recipients already sent in campaign '{campaign_id}' will be skipped")
+            else:
+                print("🧾 No campaign ID given; the sent log is not checked for this run")
         
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-                recipients = list(csv_reader)
+            # Prompts run between records, so the status is printed per record rather than redrawn live
+            progress = BatchProgress.from_config(self.email_sender.config, total=total, live=False)
+            
+            # Repeated addresses are dropped before any AI generation or SMTP work
+            deduper = RecipientDeduper.from_config(self.email_sender.config, expected=total)
+            
+            already_sent = 0
+            
+            def skip_duplicate(recipient):
+                print(f"⏭️  Skipping duplicate address: {recipient.get('email', '').strip()}")
+                progress.record('skipped')
             
-            print(f"📋 Found {len(recipients)} recipients in CSV file")
+            # Unsubscribed and bounced addresses cost neither generation nor SMTP time
+            suppression = self.email_sender.suppression
+            suppressed = []
             
-            for i, recipient in enumerate(recipients, 1):
-                print(f"\n--- Processing {i}/{len(recipients)} ---")
+            def skip_suppressed(recipient, reason):
+                print(f"🚫 Skipping suppressed address ({reason}): {recipient.get('email', '').strip()}")
+                suppressed.append(recipient)
+                progress.record('skipped')
+            
+            records = deduper.filter_records(recipients, on_duplicate=skip_duplicate)
+            if suppression is not None:
+                records = suppression.filter_records(records, on_suppressed=skip_suppressed)
+            
+            for recipient in records:
+                print(f"\n--- Processing {progress.processed() + 1}/{total} --- {progress.render()}")
                 
                 name = recipient.get('name', '').strip()
                 email = recipient.get('email', '').strip()
@@ -26,28 +97,91 @@ class BatchEmailSender:
                 
                 if not all([name, email, message]):
                     print(f"❌ Skipping incomplete record: {name}")
+                    progress.record('skipped')
+                    continue
+                
+                # Keyed on the message request, so a retried run skips delivered recipients before generating
+                message_hash = content_hash(message, tone)
+                accounts = list(account_pool.accounts) if account_pool else None
+                if self.email_sender.already_sent(email, message_hash, campaign_id, accounts):
+                    print(f"⏭️  Already sent to {email} in campaign '{campaign_id}'")
+                    already_sent += 1
+                    progress.record('skipped')
                     continue
                 
                 # Generate email content
-                generated_content = self.email_sender.generate_email_content(name, message, tone)
-                subject, body = self.email_sender.parse_generated_content(generated_content)
+                with progress.stage('generate'):
+                    generated_content = self.email_sender.generate_email_content(
+                        name, message, tone, recipient_details=personalization(recipient))
+                    subject, body = self.email_sender.parse_generated_content(generated_content)
                 
                 # Preview and send
                 self.email_sender.preview_email(name, subject, body, tone)
                 confirm = input(f"Send to {name}? (y/n/skip all): ").lower()
                 
                 if confirm == 'y':
-                    self.email_sender.send_email([email], subject, body)
+                    claimed = []
+                    with progress.stage('send'):
+                        if account_pool:
+                            sent = self._pool_send(account_pool, email, subject, body, message_hash, campaign_id)
+                        else:
+                            sent = self.email_sender.send_email([email], subject, body, campaign_id=campaign_id,
+                                                                message_hash=message_hash,
+                                                                on_already_sent=claimed.append)
+                    if claimed:
+                        # Sent by another run while this one was generating and asking
+                        already_sent += 1
+                        progress.record('skipped')
+                    else:
+                        progress.record('sent' if sent else 'failed')
                 elif confirm == 'skip all':
                     print("Skipping remaining emails.")
+                    progress.record('skipped', total - progress.processed())
                     break
                 else:
                     print(f"Skipped {name}")
+                    progress.record('skipped')
             
             print("\n✅ Batch processing completed!")
+            print(f"📊 {progress.render()}")
+            if deduper.report.duplicates:
+                print(f"🧹 Recipients: {deduper.report.summary()}")
+                metrics.incr('recipients_deduplicated', deduper.report.duplicates)
+            if already_sent:
+                print(f"⏭️  {already_sent} recipient(s) skipped by the sent log: already sent in campaign "
+                      f"'{campaign_id}'")
+            if suppressed:
+                print(f"🚫 {len(suppressed)} suppressed recipient(s) skipped")
+                metrics.incr('recipients_suppressed', len(suppressed))
+            if account_pool:
+                for account_name, sent in account_pool.usage().items():
+                    print(f"📊 {account_name}: {sent} sent")
             
         except Exception as e:
             print(f"❌ Error processing batch: {str(e)}")
+        finally:
+            metrics.flush()
+            if progress:
+                progress.close()
+            if account_pool:
+                account_pool.close()
+
+    def _pool_send(self, account_pool, email, subject, body, message_hash, campaign_id):
+        """Send through the account pool, recording the delivery under the account that sent it"""
+        sent_log = self.email_sender.sent_log if campaign_id else None
+        if sent_log is None:
+            return account_pool.send(email, subject, body) is not None
+        
+        def key_for(account_info):
+            return idempotency_key(account_info['email'], email, message_hash, campaign_id)
+        
+        account_name = account_pool.send(email, subject, body,
+                                         message_id_for=lambda info: message_id(key_for(info), info['email']))
+        if account_name is None:
+            return False
+        account_info = account_pool.accounts[account_name]
+        sent_log.record(key_for(account_info), email, campaign_id, message_id(key_for(account_info), account_info['email']))
+        return True
 
 def create_sample_csv():
     """Create a sample CSV file for batch sending"""
@@ -64,19 +198,54 @@ def create_sample_csv():
     
     print("✅ Sample CSV created: 'sample_recipients.csv'")
 
+def ask_campaign_id(email_sender):
+    """Campaign ID for the sent log; None when the log is disabled or the answer is blank"""
+    if email_sender.sent_log is None:
+        return None
+    return input("Campaign ID (re-runs with the same ID skip delivered recipients; blank for none): ").strip() or None
+
+
 if __name__ == "__main__":
     batch_sender = BatchEmailSender()
     
     print("📧 Batch Email Sender")
     print("1. Send batch emails from CSV")
     print("2. Create sample CSV template")
+    print("3. Profile a batch run")
+    print("4. Send to a contact segment")
     
-    choice = input("Choose option (1 or 2): ").strip()
+    choice = input("Choose option (1-4): ").strip()
     
-    if choice == '1':
+    if choice in ('1', '3'):
         csv_file = input("Enter CSV file path: ").strip()
-        batch_sender.send_batch_emails(csv_file)
+        use_pool = False
+        if len(batch_sender.email_sender.email_accounts) > 1:
+            use_pool = input("Spread the batch across all email accounts? (y/n): ").lower().strip() in ['y', 'yes']
+        profile = None
+        if choice == '3':
+            profile = parse_profile_mode(input("Profiler (cprofile/sampling) [sampling]: ") or 'sampling')
+        campaign_id = ask_campaign_id(batch_sender.email_sender)
+        batch_sender.send_batch_emails(csv_file, use_account_pool=use_pool, profile=profile,
+                                       campaign_id=campaign_id)
     elif choice == '2':
         create_sample_csv()
+    elif choice == '4':
+        print("Segment examples: tag:vip AND NOT category:family, company:\"Acme Inc\", created>=2024-01-01")
+        segment = input("Segment query (blank to search instead): ").strip()
+        search = None if segment else input("Search term: ").strip()
+        message = input("Message for every recipient: ").strip()
+        tone = input("Tone [Formal]: ").strip() or 'Formal'
+        all_emails = input("Send to every address of each contact? (y/n) [n]: ").lower().strip() in ['y', 'yes']
+        use_pool = False
+        if len(batch_sender.email_sender.email_accounts) > 1:
+            use_pool = input("Spread the batch across all email accounts? (y/n): ").lower().strip() in ['y', 'yes']
+        campaign_id = ask_campaign_id(batch_sender.email_sender)
+        if message:
+            batch_sender.send_segment_emails(message, tone, segment=segment or None, search=search or None,
+                                             all_emails=all_emails, use_account_pool=use_pool,
+                                             campaign_id=campaign_id)
+        else:
+            print("❌ Message required")
     else:
-        print("Invalid choice")
\ No newline at end of file
+        print("Invalid choice")
+    batch_sender.email_sender.close()
\ No newline at end of file
@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+BAR_WIDTH = 30
+
+
+class _Stage:
+    __slots__ = ('progress', 'name')
+
+    def __init__(self, progress: 'BatchProgress', name: str):
+        self.progress = progress
+        self.name = name
+
+    def __enter__(self):
+        self.progress._adjust_stage(self.name, 1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.progress._adjust_stage(self.name, -1)
+        return False
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Format seconds as H:MM:SS ('--:--' when unknown)"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class BatchProgress:
+    """Rolling throughput, ETA and per-stage queue depths for a batch run
+
+    Shown as a live terminal bar and written periodically as a JSON status file.
+    """
+
+    def __init__(self, total: int = None, status_path: str = None, status_interval: float = 5.0,
+                 window: float = 30.0, live: bool = True, stream=None):
+        self.total = total
+        self.status_path = status_path
+        self.status_interval = status_interval
+        self.window = window
+        self.stream = stream or sys.stdout
+        self.live = live and self.stream.isatty()
+        # Redirected output gets a plain status line every status_interval instead of a redrawn bar
+        self.log_lines = live and not self.live
+        self.counts = {'sent': 0, 'failed': 0, 'skipped': 0}
+        self.stages: Dict[str, int] = {}
+        self.started = time.monotonic()
+        self._completions = deque()
+        self._last_draw = self.started
+        self._last_status = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, total: int = None, section: str = 'sending_settings', **kwargs) -> 'BatchProgress':
+        """Build a progress reporter from [sending_settings]"""
+        return cls(
+            total=total,
+            status_path=config.get(section, 'progress_file', fallback='') or None,
+            status_interval=config.getfloat(section, 'progress_interval', fallback=5.0),
+            **kwargs
+        )
+
+    def stage(self, name: str) -> _Stage:
+        """Context manager counting items currently in a pipeline stage"""
+        return _Stage(self, name)
+
+    def _adjust_stage(self, name: str, delta: int):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0) + delta
+
+    def record(self, status: str, count: int = 1):
+        """Record finished items ('sent', 'failed' or 'skipped')"""
+        now = time.monotonic()
+        with self._lock:
+            self.counts[status] += count
+            self._completions.extend([now] * count)
+        self.update(now)
+
+    def processed(self) -> int:
+        return sum(self.counts.values())
+
+    def rate(self, now: float = None) -> float:
+        """Messages per second over the rolling window"""
+        now = now or time.monotonic()
+        with self._lock:
+            while self._completions and self._completions[0] < now - self.window:
+                self._completions.popleft()
+            recent = len(self._completions)
+        span = min(self.window, now - self.started)
+        return recent / span if span > 0 else 0.0
+
+    def eta(self, now: float = None) -> Optional[float]:
+        """Seconds remaining at the current rate, or None if unknown"""
+        if self.total is None:
+            return None
+        rate = self.rate(now)
+        remaining = max(0, self.total - self.processed())
+        if remaining == 0:
+            return 0.0
+        return remaining / rate if rate > 0 else None
+
+    def snapshot(self, now: float = None) -> dict:
+        """Current status as a JSON-serialisable dict"""
+        now = now or time.monotonic()
+        processed = self.processed()
+        return {
+            'timestamp': time.time(),
+            'elapsed': now - self.started,
+            'total': self.total,
+            'processed': processed,
+            'sent': self.counts['sent'],
+            'failed': self.counts['failed'],
+            'skipped': self.counts['skipped'],
+            'error_rate': self.counts['failed'] / processed if processed else 0.0,
+            'msgs_per_sec': self.rate(now),
+            'eta_seconds': self.eta(now),
+            'stages': dict(self.stages)
+        }
+
+    def render(self, now: float = None) -> str:
+        """One-line status (bar + counts + rate + ETA)"""
+        status = self.snapshot(now)
+        if self.total:
+            done = min(1.0, status['processed'] / self.total)
+            filled = int(BAR_WIDTH * done)
+            head = f"[{'█' * filled}{'░' * (BAR_WIDTH - filled)}] {status['processed']}/{self.total}"
+        else:
+            head = f"{status['processed']} processed"
+        stages = ' '.join(f"{name}:{depth}" for name, depth in status['stages'].items())
+        line = (f"{head} | ✅ {status['sent']} ❌ {status['failed']} ⏭️ {status['skipped']} | "
+                f"{status['msgs_per_sec']:.1f} msgs/sec | ETA {format_duration(status['eta_seconds'])}")
+        return f"{line} | {stages}" if stages else line
+
+    def update(self, now: float = None):
+        """Redraw the live bar and write the status file when due"""
+        now = now or time.monotonic()
+        if self.live and now - self._last_draw >= 0.2:
+            self._last_draw = now
+            self.stream.write('\r' + self.render(now) + '\x1b[K')
+            self.stream.flush()
+        elif self.log_lines and now - self._last_draw >= self.status_interval:
+            self._last_draw = now
+            self.stream.write(f"📊 {self.render(now)}\n")
+            self.stream.flush()
+        if self.status_path and now - self._last_status >= self.status_interval:
+            self._last_status = now
+            self.write_status(now)
+
+    def write_status(self, now: float = None, final: bool = False):
+        """Atomically replace the JSON status file"""
+        if not self.status_path:
+            return
+        status = self.snapshot(now)
+        status['finished'] = final
+        temp_path = f"{self.status_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(status, file)
+            os.replace(temp_path, self.status_path)
+        except OSError as e:
+            print(f"⚠️  Failed to write progress file: {e}")
+
+    def close(self):
+        """Draw the final state and write the last status snapshot"""
+        now = time.monotonic()
+        if self.live:
+            self.stream.write('\r' + self.render(now) + '\x1b[K\n')
+            self.stream.flush()
+        elif self.log_lines:
+            self.stream.write(f"📊 {self.render(now)}\n")
+            self.stream.flush()
+        self.write_status(now, final=True)
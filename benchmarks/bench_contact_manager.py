@@ -0,0 +1,220 @@
+"""Microbenchmarks for ContactManager on synthetic address books
+
+Usage:
+    python benchmarks/bench_contact_manager.py                  # 1k, 100k and 1M contacts
+    python benchmarks/bench_contact_manager.py --sizes 1000 100000 --repeat 5
+    python benchmarks/bench_contact_manager.py --sizes 100000 --profile sampling
+
+Each result (median time and peak traced memory per operation) is appended to
+benchmarks/results/contact_manager.jsonl, tagged with the current git commit,
+so storage and index changes can be compared across commits. With --profile the
+whole run is also profiled into benchmarks/results/profiles/.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from contact_manager import ContactManager  # noqa: E402
+from profiling import PROFILE_MODES, BatchProfiler  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmarks', 'results', 'contact_manager.jsonl')
+PROFILE_DIR = os.path.join(ROOT, 'benchmarks', 'results', 'profiles')
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Wei', 'Aisha']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Nguyen', 'Khan']
+CATEGORIES = ['Work', 'Personal', 'Family', 'Clients', 'Vendors', '']
+POSITIONS = ['Engineer', 'Manager', 'Director', 'Analyst', 'Designer', 'Consultant', 'Founder', '']
+DOMAINS = ['example.com', 'mail.test', 'corp.example', 'acme.test', 'globex.example']
+
+
+def generate_contacts(count: int, seed: int = 42) -> dict:
+    """Build a deterministic synthetic address book in ContactManager's JSON shape"""
+    rng = random.Random(seed)
+    companies = [f"Company {i}" for i in range(max(10, count // 200))]
+    base_time = 1_600_000_000
+    contacts = {}
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        name = f"{first} {last} {i}"
+        local = f"{first}.{last}{i}".lower()
+        contact = {
+            'emails': [f"{local}@{rng.choice(DOMAINS)}" for _ in range(rng.randint(1, 3))],
+            'phones': [f"+1-555-{rng.randint(0, 9999):04d}" for _ in range(rng.randint(0, 2))],
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base_time + i * 37)),
+            'last_contact': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base_time + i * 53))
+        }
+        if rng.random() < 0.8:
+            contact['company'] = rng.choice(companies)
+        position = rng.choice(POSITIONS)
+        if position:
+            contact['position'] = position
+        if rng.random() < 0.3:
+            contact['notes'] = f"Met at conference {rng.randint(2015, 2025)}; follow up about project {rng.randint(1, 500)}"
+        category = rng.choice(CATEGORIES)
+        if category:
+            contact['category'] = category
+        contacts[name] = contact
+    return contacts
+
+
+def git_commit() -> str:
+    """Short hash of the checked-out commit, for comparing results across commits"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def profiler_for(mode: str, label: str):
+    """BatchProfiler writing to benchmarks/results/profiles, or a no-op context when mode is None"""
+    if not mode:
+        return nullcontext()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return BatchProfiler(mode, os.path.join(PROFILE_DIR, f"{label}_{time.strftime('%Y%m%d_%H%M%S')}"))
+
+
+def traced_peak(operation) -> int:
+    """Peak memory allocated while running operation once (tracing is slow, so it is not timed)"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    operation()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return peak
+
+
+def measure(operation, repeat: int):
+    """Median wall time over repeat runs, then one traced run for peak memory"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), traced_peak(operation)
+
+
+def bench_size(size: int, repeat: int, workdir: str):
+    """Run every ContactManager benchmark on an address book of the given size, yielding result rows"""
+    contacts_file = os.path.join(workdir, f"contacts_{size}.json")
+    import_file = os.path.join(workdir, f"import_{size}.json")
+
+    contacts = generate_contacts(size)
+    with open(contacts_file, 'w', encoding='utf-8') as file:
+        json.dump(contacts, file, indent=2, ensure_ascii=False)
+
+    # Import file: 10% of the book, half overlapping existing names and half new
+    import_size = max(1, size // 10)
+    names = list(contacts)
+    rng = random.Random(7)
+    overlapping = {name: contacts[name] for name in rng.sample(names, import_size // 2)}
+    new_contacts = generate_contacts(import_size - len(overlapping), seed=99)
+    new_contacts = {f"Imported {name}": data for name, data in new_contacts.items()}
+    with open(import_file, 'w', encoding='utf-8') as file:
+        json.dump({**overlapping, **new_contacts}, file, ensure_ascii=False)
+    del contacts, overlapping, new_contacts
+
+    manager = ContactManager(contacts_file)
+    # Lookups: a spread of existing names/addresses plus misses, so full scans are measured too
+    sample_names = [names[int(i * (len(names) - 1) / 9)] for i in range(10)] + ['Nobody Here']
+    sample_emails = [manager.contacts[name]['emails'][0] for name in sample_names[:-1]] + ['nobody@nowhere.test']
+
+    operations = [
+        ('load_contacts', lambda: manager.load_contacts()),
+        ('save_contacts', lambda: manager.save_contacts()),
+        ('find_contact', lambda: [manager.find_contact(name.upper()) for name in sample_names]),
+        ('find_contacts_by_email', lambda: [manager.find_contacts_by_email(email) for email in sample_emails]),
+        ('search_contacts', lambda: manager.search_contacts('conference 2020')),
+        ('list_contacts', lambda: manager.list_contacts('Work')),
+        ('get_contact_categories', lambda: manager.get_contact_categories()),
+    ]
+
+    for name, operation in operations:
+        seconds, peak = measure(operation, repeat)
+        calls = len(sample_names) if name in ('find_contact', 'find_contacts_by_email') else 1
+        yield result_row(name, size, seconds / calls, peak, repeat)
+    # Free the book before the import runs load their own copies
+    del manager, operations
+    gc.collect()
+
+    def fresh_manager():
+        # Import into a fresh copy of the book so every run merges the same data
+        fresh = ContactManager(contacts_file)
+        fresh.contacts_file = os.path.join(workdir, 'imported.json')
+        return fresh
+
+    timings = []
+    for _ in range(repeat):
+        fresh = fresh_manager()
+        gc.collect()
+        start = time.perf_counter()
+        fresh.import_contacts(import_file)
+        timings.append(time.perf_counter() - start)
+        del fresh
+    fresh = fresh_manager()
+    peak = traced_peak(lambda: fresh.import_contacts(import_file))
+    del fresh
+    yield result_row('import_contacts', size, statistics.median(timings), peak, repeat)
+
+
+def result_row(operation: str, size: int, seconds: float, peak: int, repeat: int) -> dict:
+    return {
+        'operation': operation,
+        'contacts': size,
+        'seconds': seconds,
+        'peak_bytes': peak,
+        'repeat': repeat
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ContactManager on synthetic address books")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Address book sizes")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per operation (median is reported)")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help="JSON lines file to append results to")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None, help="Also profile the whole run")
+    args = parser.parse_args()
+
+    run_info = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version()
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+
+    print(f"📊 ContactManager benchmarks @ {run_info['commit']}")
+    print(f"{'operation':<24} {'contacts':>10} {'time':>12} {'peak memory':>14}")
+    with tempfile.TemporaryDirectory(prefix='contact_bench_') as workdir, \
+            open(args.results, 'a', encoding='utf-8') as results_file, \
+            profiler_for(args.profile, 'contact_manager'):
+        for size in args.sizes:
+            for row in bench_size(size, args.repeat, workdir):
+                row.update(run_info)
+                results_file.write(json.dumps(row) + '\n')
+                results_file.flush()
+                print(f"{row['operation']:<24} {size:>10,} {row['seconds'] * 1000:>10.3f}ms "
+                      f"{row['peak_bytes'] / 1024 / 1024:>11.2f} MB")
+
+    print(f"✅ Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Generation throughput benchmark against the local mock Groq server
+
+Usage:
+    python benchmarks/bench_generation.py
+    python benchmarks/bench_generation.py --requests 400 --concurrency 1 8 32 128 --error-rate 0.05
+    python benchmarks/bench_generation.py --modes async --concurrency 32 --profile cprofile
+
+Drives EmailSender.generate_email_content from a thread pool (sync) and
+AsyncEmailSender.generate_email_content with asyncio.gather (batch/async) at each
+concurrency level. It reports calls/sec, p50/p99 latency, tokens, retries,
+fallbacks and the template cache hit ratio. Results are appended to
+benchmarks/results/generation.jsonl. --profile profiles the runs into
+benchmarks/results/profiles/; only the main thread is profiled, which covers the
+async mode but only the waiting side of the sync thread pool.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from async_email_sender import AsyncEmailSender  # noqa: E402
+from bench_contact_manager import git_commit, profiler_for  # noqa: E402
+from email_sender import EmailSender  # noqa: E402
+from generation_providers import Groq, GroqProvider, OpenAICompatibleProvider  # noqa: E402
+from metrics import metrics  # noqa: E402
+from mock_groq_server import MockGroqServer, add_settings_arguments, settings_from_args  # noqa: E402
+from profiling import PROFILE_MODES  # noqa: E402
+
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmarks', 'results', 'generation.jsonl')
+TONES = ['Formal', 'Casual', 'Formal + Casual', 'Casual + Friendly']
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def make_provider(name: str, server: MockGroqServer, email_sender: EmailSender):
+    """Point a real provider implementation at the mock server"""
+    if name == 'groq':
+        return GroqProvider('mock-key', email_sender.model, email_sender.request_policy, base_url=server.base_url)
+    return OpenAICompatibleProvider(server.openai_base_url, email_sender.model, 'mock-key', email_sender.request_policy)
+
+
+def workload(count: int):
+    """(recipient, message, tone) tuples for a run"""
+    return [(f"Recipient {i}", f"Follow up on proposal #{i % 50}", TONES[i % len(TONES)]) for i in range(count)]
+
+
+def run_sync(email_sender: EmailSender, jobs, concurrency: int):
+    """generate_email_content from a thread pool; returns per-call latencies"""
+    def call(job):
+        start = time.perf_counter()
+        email_sender.generate_email_content(*job)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(call, jobs))
+
+
+def run_async(async_sender: AsyncEmailSender, jobs, concurrency: int):
+    """AsyncEmailSender.generate_email_content with bounded gather; returns per-call latencies"""
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def call(job):
+            async with slots:
+                start = time.perf_counter()
+                await async_sender.generate_email_content(*job)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*(call(job) for job in jobs))
+
+    return asyncio.run(main())
+
+
+def measure_streaming(server: MockGroqServer, model: str, samples: int) -> dict:
+    """Time to first token and total time for streamed completions"""
+    first_token, total = [], []
+    payload = json.dumps({'model': model, 'stream': True, 'max_tokens': 1024,
+                          'messages': [{'role': 'user', 'content': 'Recipient: Bench\nWrite an email.'}]}).encode()
+    for _ in range(samples):
+        request = urllib.request.Request(f"{server.openai_base_url}/chat/completions", data=payload,
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        start = time.perf_counter()
+        first = None
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                for line in response:
+                    if line.startswith(b'data: ') and first is None:
+                        first = time.perf_counter() - start
+                    if line.strip() == b'data: [DONE]':
+                        break
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+            # Throttled samples are skipped rather than retried
+            continue
+        if first is None:
+            continue
+        first_token.append(first)
+        total.append(time.perf_counter() - start)
+    return {
+        'ttft_p50': percentile(first_token, 50),
+        'ttft_p99': percentile(first_token, 99),
+        'stream_total_p50': percentile(total, 50)
+    }
+
+
+def summarise(mode: str, provider: str, concurrency: int, latencies, elapsed: float, template_engine) -> dict:
+    counters = metrics.snapshot()['counters']
+    lookups = template_engine.hits + template_engine.misses
+    return {
+        'mode': mode,
+        'provider': provider,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'calls_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'tokens_in': counters.get('tokens_in', 0),
+        'tokens_out': counters.get('tokens_out', 0),
+        'retries': counters.get('generation_retries', 0),
+        'fallbacks': counters.get('generation_fallbacks', 0),
+        'cache_hit_ratio': template_engine.hits / lookups if lookups else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AI generation against a mock Groq server")
+    parser.add_argument('--provider', choices=['auto', 'groq', 'openai_compatible'], default='auto',
+                        help="Provider implementation to drive (auto: groq when the SDK is installed)")
+    parser.add_argument('--requests', type=int, default=200, help="Generations per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--stream-samples', type=int, default=10, help="Streamed requests for TTFT (0 to skip)")
+    parser.add_argument('--config', default=os.path.join(ROOT, 'email_config.cfg'), help="Config file")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help="JSON lines file to append results to")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="Profile the generation runs (main thread; use with --modes async)")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    provider_name = args.provider
+    if provider_name == 'auto':
+        provider_name = 'groq' if Groq is not None else 'openai_compatible'
+    elif provider_name == 'groq' and Groq is None:
+        print("⚠️  Groq package is not installed; using the OpenAI-compatible provider")
+        provider_name = 'openai_compatible'
+
+    run_info = {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'latency_median': args.latency_median, 'error_rate': args.error_rate}
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+
+    with MockGroqServer(settings=settings_from_args(args)) as server:
+        # Fallback warnings from throttled requests would drown the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            email_sender = EmailSender(args.config)
+        email_sender.provider = make_provider(provider_name, server, email_sender)
+        async_sender = AsyncEmailSender(email_sender)
+        metrics.enabled = True
+        metrics.sinks = []
+
+        print(f"📊 Generation benchmark @ {run_info['commit']} ({provider_name}, mock at {server.base_url})")
+        print(f"{'mode':<6} {'conc':>5} {'calls/s':>9} {'p50':>8} {'p99':>8} {'tok in':>9} {'tok out':>9} "
+              f"{'retries':>8} {'fallbk':>7} {'cache':>6}")
+        with open(args.results, 'a', encoding='utf-8') as results_file:
+            with profiler_for(args.profile, 'generation'):
+                for mode in args.modes:
+                    for concurrency in args.concurrency:
+                        jobs = workload(args.requests)
+                        metrics.reset()
+                        email_sender.template_engine.hits = email_sender.template_engine.misses = 0
+                        start = time.perf_counter()
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            if mode == 'sync':
+                                latencies = run_sync(email_sender, jobs, concurrency)
+                            else:
+                                latencies = run_async(async_sender, jobs, concurrency)
+                        elapsed = time.perf_counter() - start
+
+                        row = summarise(mode, provider_name, concurrency, latencies, elapsed,
+                                        email_sender.template_engine)
+                        row.update(run_info)
+                        results_file.write(json.dumps(row) + '\n')
+                        cache = f"{row['cache_hit_ratio']:.0%}" if row['cache_hit_ratio'] is not None else '-'
+                        print(f"{mode:<6} {concurrency:>5} {row['calls_per_sec']:>9.1f} {row['p50'] * 1000:>6.0f}ms "
+                              f"{row['p99'] * 1000:>6.0f}ms {row['tokens_in']:>9.0f} {row['tokens_out']:>9.0f} "
+                              f"{row['retries']:>8.0f} {row['fallbacks']:>7.0f} {cache:>6}")
+
+            if args.stream_samples:
+                stream = measure_streaming(server, email_sender.model, args.stream_samples)
+                stream.update(run_info, mode='stream')
+                results_file.write(json.dumps(stream) + '\n')
+                print(f"⚡ Streaming: TTFT p50 {stream['ttft_p50'] * 1000:.0f}ms, "
+                      f"p99 {stream['ttft_p99'] * 1000:.0f}ms, total p50 {stream['stream_total_p50'] * 1000:.0f}ms")
+
+        email_sender.close()
+        print(f"🤖 Mock served {server.stats['requests']} requests ({server.stats['throttled']} throttled)")
+    print(f"✅ Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Round-trip checks for contacts.json and its snapshot: saving must write back exactly what was read
+
+Usage:
+    python benchmarks/check_contacts_roundtrip.py
+
+The contacts file covers values ContactRecord does not store in its usual
+form: a single email as a plain string, a numeric or malformed timestamp,
+fields set to null, empty lists, unknown keys and keys out of the usual
+order. It is written as json.dump(indent=2, ensure_ascii=False) would, loaded
+with ContactManager, saved again and compared byte for byte. The snapshot
+check does the same with the contacts read back from contacts.snap.
+
+Exits non-zero if any check fails.
+"""
+import json
+import os
+import sys
+import tempfile
+from typing import Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from contact_manager import ContactManager  # noqa: E402
+from contact_snapshot import snapshot_is_current  # noqa: E402
+
+CONTACTS = {
+    "Full Record": {
+        "emails": ["full@example.com", "full.work@example.com"], "phones": ["+1 555 0100"],
+        "company": "Acme", "position": "CTO", "address": "1 Main St", "notes": "Met at the fair",
+        "tags": ["vip", "client"], "category": "Business", "created_at": "2024-01-02 10:00:00",
+        "last_contact": "2024-03-04 12:30:00", "updated_at": "2024-03-04 12:30:00"
+    },
+    "Single Values": {"emails": ["one@example.com"], "phones": ["1"], "tags": ["solo"]},
+    "Bare String Email": {"emails": "bare@example.com", "tags": "single-tag"},
+    "Nulls": {"emails": None, "company": None, "created_at": None, "notes": None, "custom": None},
+    "Numeric Timestamps": {"emails": ["n@example.com"], "created_at": 1700000000, "updated_at": 1.5},
+    "Malformed Timestamp": {"emails": ["m@example.com"], "created_at": "yesterday"},
+    "Empty Lists": {"emails": [], "phones": [], "tags": []},
+    "Other Types": {"emails": [5, None], "company": 3, "address": {"city": "Oslo"}, "notes": ["a", "b"]},
+    "Reordered": {"category": "Friends", "notes": "n", "emails": ["r@example.com"], "company": "Initech"},
+    "Unknown Keys": {"birthday": "1990-01-01", "emails": ["u@example.com"], "meta": {"source": "import"}},
+    "Unicode – Ünïcødé": {"emails": ["ü@example.com"], "notes": "日本語 \"quoted\" \\ \n tab\t"},
+    "Empty": {}
+}
+
+
+def write_contacts(directory: str) -> Tuple[str, bytes]:
+    contacts_file = os.path.join(directory, 'contacts.json')
+    with open(contacts_file, 'w', encoding='utf-8') as file:
+        json.dump(CONTACTS, file, indent=2, ensure_ascii=False)
+    with open(contacts_file, 'rb') as file:
+        return contacts_file, file.read()
+
+
+def compare_saved(manager: ContactManager, contacts_file: str, original: bytes) -> list:
+    problems = []
+    if not manager.save_contacts():
+        return ["save_contacts() failed"]
+    with open(contacts_file, 'rb') as file:
+        saved = file.read()
+    if saved != original:
+        loaded = json.loads(saved)
+        for name, contact in CONTACTS.items():
+            if name not in loaded:
+                problems.append(f"{name!r} is missing")
+            elif json.dumps(loaded[name]) != json.dumps(contact):
+                problems.append(f"{name!r} was saved as {json.dumps(loaded[name])}")
+        if not problems:
+            problems.append("saved file differs from the original")
+    return problems
+
+
+def check_json_roundtrip(directory: str) -> list:
+    contacts_file, original = write_contacts(directory)
+    return compare_saved(ContactManager(contacts_file), contacts_file, original)
+
+
+def check_snapshot_roundtrip(directory: str) -> list:
+    contacts_file, original = write_contacts(directory)
+    snapshot_file = os.path.join(directory, 'contacts.snap')
+    # The first load reads the JSON and writes the snapshot; the second one reads the snapshot
+    ContactManager(contacts_file, snapshot_file)
+    if not snapshot_is_current(snapshot_file, contacts_file):
+        return ["no current snapshot was written"]
+    manager = ContactManager(contacts_file, snapshot_file)
+    problems = []
+    for name, contact in CONTACTS.items():
+        loaded = manager.contacts.get(name)
+        if loaded is None or list(loaded.items()) != list(contact.items()):
+            problems.append(f"{name!r} was read from the snapshot as {loaded and dict(loaded.items())!r}")
+    return problems + compare_saved(manager, contacts_file, original)
+
+
+CHECKS = [
+    ("contacts.json load and save", check_json_roundtrip),
+    ("contacts.snap load and save", check_snapshot_roundtrip),
+]
+
+
+def main():
+    failures = 0
+    for check_name, check in CHECKS:
+        with tempfile.TemporaryDirectory(prefix='contacts_roundtrip_') as directory:
+            try:
+                problems = check(directory)
+            except Exception as e:
+                problems = [f"{type(e).__name__}: {e}"]
+        if problems:
+            failures += 1
+            print(f"❌ {check_name}")
+            for problem in problems:
+                print(f"   {problem}")
+        else:
+            print(f"✅ {check_name}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Protocol checks for PipeliningSMTP and AsyncSMTPConnection against the local SMTP stand-in
+
+Usage:
+    python benchmarks/check_smtp_client.py
+
+Each scenario runs against both clients:
+  - pipelined MAIL/RCPT/DATA in one flight with one recipient refused
+  - a CHUNKING server receiving the body as BDAT chunks ending in BDAT ... LAST
+  - a server without PIPELINING or CHUNKING, where the client falls back to
+    DATA and the body must survive dot-stuffing byte for byte
+
+Exits non-zero if any check fails.
+"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from async_email_sender import AsyncSMTPConnection  # noqa: E402
+from mime_stream import BytesMessage  # noqa: E402
+from mock_smtp_server import MockSMTPServer  # noqa: E402
+from smtp_pipelining import PipeliningSMTP  # noqa: E402
+
+SENDER = 'sender@example.com'
+BODY = (
+    b'Subject: Check\r\n\r\n'
+    b'.leading dot\r\n'
+    b'.\r\n'
+    b'..two dots\r\n'
+    + b'x' * 200 + b'\r\n'
+    b'end\r\n'
+)
+
+
+def send_sync(server: MockSMTPServer, recipients, message) -> dict:
+    client = PipeliningSMTP(server.host, server.port, timeout=10)
+    try:
+        return client.send_streamed(SENDER, recipients, message)
+    finally:
+        client.quit()
+
+
+def send_async(server: MockSMTPServer, recipients, message) -> dict:
+    async def run():
+        connection = AsyncSMTPConnection(server.host, server.port, timeout=10)
+        await connection.connect()
+        try:
+            return await connection.send_streamed(SENDER, recipients, message)
+        finally:
+            await connection.quit()
+    return asyncio.run(run())
+
+
+def check_pipelined_refusal(send) -> list:
+    recipients = ['a@example.com', 'refused@example.com', 'c@example.com']
+    with MockSMTPServer(pipelining=True, refuse={'refused@example.com'}) as server:
+        refused = send(server, recipients, BytesMessage(BODY))
+    problems = []
+    if list(refused) != ['refused@example.com'] or refused['refused@example.com'][0] != 550:
+        problems.append(f"refused recipients were {refused!r}")
+    if [m[1] for m in server.messages] != [['a@example.com', 'c@example.com']]:
+        problems.append(f"delivered envelopes were {[m[1] for m in server.messages]!r}")
+    envelope = [burst for burst in server.bursts if burst and burst[0].startswith('MAIL')]
+    if not envelope or [c.split(' ')[0] for c in envelope[0]] != ['MAIL', 'RCPT', 'RCPT', 'RCPT', 'DATA']:
+        problems.append(f"envelope was not sent in one flight: {server.bursts!r}")
+    return problems
+
+
+def check_bdat_last(send) -> list:
+    with MockSMTPServer(pipelining=True, chunking=True) as server:
+        send(server, ['a@example.com'], BytesMessage(BODY, chunk_size=64))
+    problems = []
+    if [(m[2], m[3]) for m in server.messages] != [(BODY, 'bdat')]:
+        problems.append(f"server received {server.messages!r}")
+    bdat = [command for burst in server.bursts for command in burst if command.startswith('BDAT')]
+    if len(bdat) < 2 or not bdat[-1].endswith('LAST') or any(c.endswith('LAST') for c in bdat[:-1]):
+        problems.append(f"BDAT commands were {bdat!r}")
+    return problems
+
+
+def check_data_fallback(send) -> list:
+    with MockSMTPServer(pipelining=False, chunking=False) as server:
+        send(server, ['a@example.com'], BytesMessage(BODY))
+    problems = []
+    if [(m[2], m[3]) for m in server.messages] != [(BODY, 'data')]:
+        problems.append(f"server received {server.messages!r}")
+    if any(len(burst) > 1 for burst in server.bursts):
+        problems.append(f"commands were pipelined without PIPELINING: {server.bursts!r}")
+    return problems
+
+
+CHECKS = [
+    ("Pipelined envelope with one refused recipient", check_pipelined_refusal),
+    ("BDAT chunks ending in BDAT LAST", check_bdat_last),
+    ("Dot-stuffed DATA fallback", check_data_fallback),
+]
+
+
+def main():
+    failures = 0
+    for client_name, send in (("PipeliningSMTP", send_sync), ("AsyncSMTPConnection", send_async)):
+        for check_name, check in CHECKS:
+            try:
+                problems = check(send)
+            except Exception as e:
+                problems = [f"{type(e).__name__}: {e}"]
+            if problems:
+                failures += 1
+                print(f"❌ {client_name}: {check_name}")
+                for problem in problems:
+                    print(f"   {problem}")
+            else:
+                print(f"✅ {client_name}: {check_name}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
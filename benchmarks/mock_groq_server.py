@@ -0,0 +1,225 @@
+"""Local stand-in for the Groq chat-completions API, for benchmarks without API costs
+
+Serves POST /openai/v1/chat/completions (Groq SDK path) and /v1/chat/completions
+(OpenAI-compatible path) with:
+  - log-normal response latency (median and sigma)
+  - completion time proportional to a token rate
+  - random HTTP 429 responses with Retry-After
+  - SSE streaming when the request sets "stream": true
+
+Usage:
+    python benchmarks/mock_groq_server.py --port 8765 --latency-median 0.3 --error-rate 0.05
+    # then: [ai_settings] groq_base_url = http://127.0.0.1:8765
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions', '/chat/completions')
+
+
+class MockSettings:
+    def __init__(self, latency_median: float = 0.3, latency_sigma: float = 0.4, tokens_per_sec: float = 800.0,
+                 completion_tokens: int = 180, error_rate: float = 0.0, retry_after: float = 1.0, seed: int = None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(base latency, throttle this request?) for one request"""
+        with self._lock:
+            latency = self.latency_median * math.exp(self.random.gauss(0, self.latency_sigma))
+            throttled = self.random.random() < self.error_rate
+        return latency, throttled
+
+
+def _completion_text(messages) -> str:
+    """A plausible email reply built from the last user message"""
+    prompt = messages[-1].get('content', '') if messages else ''
+    recipient = 'there'
+    for line in prompt.splitlines():
+        if line.strip().lower().startswith('recipient:'):
+            recipient = line.split(':', 1)[1].strip() or recipient
+    return (f"Subject: Following up\n\nDear {recipient},\n\n"
+            "I hope this message finds you well. I wanted to follow up on our recent conversation "
+            "and share a few details about the next steps.\n\nBest regards")
+
+
+def _make_handler(settings: MockSettings, stats: dict):
+    class MockGroqHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except json.JSONDecodeError:
+                self._send_json(400, {'error': {'message': 'invalid JSON'}})
+                return
+            if self.path.rstrip('/') not in CHAT_PATHS:
+                self._send_json(404, {'error': {'message': f'unknown path {self.path}'}})
+                return
+
+            latency, throttled = settings.draw()
+            with stats['lock']:
+                stats['requests'] += 1
+                stats['throttled'] += throttled
+            if throttled:
+                self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_exceeded'}},
+                                {'Retry-After': f"{settings.retry_after:g}"})
+                return
+
+            messages = request.get('messages', [])
+            text = _completion_text(messages)
+            words = text.split(' ')
+            completion_tokens = min(request.get('max_tokens') or settings.completion_tokens,
+                                    settings.completion_tokens)
+            prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens}
+            generation_time = completion_tokens / settings.tokens_per_sec if settings.tokens_per_sec else 0.0
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            model = request.get('model', 'mock')
+
+            time.sleep(latency)
+            if request.get('stream'):
+                self._stream(completion_id, model, words, generation_time, usage)
+                return
+
+            time.sleep(generation_time)
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+        def _stream(self, completion_id: str, model: str, words, generation_time: float, usage: dict):
+            """Server-sent events, one word per chunk, paced by the token rate"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            delay = generation_time / max(1, len(words))
+            for i, word in enumerate(words):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word},
+                                 'finish_reason': None}]
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(delay)
+            final = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                     'x_groq': {'usage': usage}}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+            self.wfile.flush()
+            self.close_connection = True
+
+    return MockGroqHandler
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops SYNs when an event loop opens many connections at once,
+    # which shows up as 1s connect stalls (the SYN retransmit) in the client being measured
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class MockGroqServer:
+    """Threaded mock server that can run inside a benchmark process"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, settings: MockSettings = None):
+        self.settings = settings or MockSettings()
+        self.stats = {'requests': 0, 'throttled': 0, 'lock': threading.Lock()}
+        self.httpd = _MockHTTPServer((host, port), _make_handler(self.settings, self.stats))
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Groq SDK base URL (the SDK appends /openai/v1/...)"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        """Base URL for OpenAI-compatible clients"""
+        return f"{self.base_url}/openai/v1"
+
+    def start(self) -> 'MockGroqServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-groq', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """Command-line options shared by the server and the benchmark harness"""
+    parser.add_argument('--latency-median', type=float, default=0.3, help="Median time to first token (seconds)")
+    parser.add_argument('--latency-sigma', type=float, default=0.4, help="Log-normal sigma of the latency")
+    parser.add_argument('--tokens-per-sec', type=float, default=800.0, help="Completion token rate")
+    parser.add_argument('--completion-tokens', type=int, default=180, help="Tokens per completion")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After sent with 429 responses")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for reproducible runs")
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(args.latency_median, args.latency_sigma, args.tokens_per_sec, args.completion_tokens,
+                        args.error_rate, args.retry_after, args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Groq chat-completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockGroqServer(args.host, args.port, settings_from_args(args))
+    print(f"🤖 Mock Groq server on {server.base_url} (OpenAI-compatible: {server.openai_base_url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
@@ -0,0 +1,212 @@
+"""Local SMTP stand-in for checking and benchmarking the SMTP clients
+
+Speaks enough ESMTP for PipeliningSMTP and AsyncSMTPConnection:
+  - EHLO advertising PIPELINING and/or CHUNKING (BDAT), AUTH and STARTTLS-free sessions
+  - MAIL/RCPT/DATA with dot-unstuffing, BDAT with LAST, RSET, NOOP, QUIT
+  - refusing chosen recipients with 550
+  - an optional delay before every read that has to wait for the client,
+    which turns each client round trip into measurable latency
+
+Every accepted message is kept as (mail from, recipients, body, transfer),
+where transfer is 'data' or 'bdat'. Each burst of commands read before a
+reply is logged, so a test can check that an envelope arrived in one flight.
+
+Usage:
+    python benchmarks/mock_smtp_server.py --port 2525 --pipelining --chunking --delay 0.02
+"""
+import argparse
+import socket
+import threading
+import time
+from typing import Iterable, List, Tuple
+
+
+class _Session:
+    def __init__(self, server: 'MockSMTPServer', connection: socket.socket):
+        self.server = server
+        self.connection = connection
+        self.buffer = b''
+        self.burst: List[str] = []
+
+    def _fill(self):
+        # Empty buffer: the client is waiting for replies, so this read is a new flight
+        if self.burst:
+            self.server.log_burst(self.burst)
+            self.burst = []
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        data = self.connection.recv(1 << 20)
+        if not data:
+            raise EOFError
+        self.server.flights += 1
+        self.buffer += data
+
+    def readline(self) -> bytes:
+        while b'\r\n' not in self.buffer:
+            self._fill()
+        end = self.buffer.index(b'\r\n') + 2
+        line, self.buffer = self.buffer[:end], self.buffer[end:]
+        return line
+
+    def read(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            data = self.connection.recv(1 << 20)
+            if not data:
+                raise EOFError
+            self.buffer += data
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def reply(self, line: str):
+        self.connection.sendall(line.encode('ascii') + b'\r\n')
+
+    def run(self):
+        self.reply('220 mock ESMTP')
+        mail_from, recipients, chunks = None, [], []
+        while True:
+            command = self.readline().decode('utf-8', 'replace').strip()
+            self.burst.append(command)
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                lines = ['mock'] + self.server.extensions + ['AUTH PLAIN LOGIN']
+                if verb == 'HELO':
+                    lines = ['mock']
+                for index, line in enumerate(lines):
+                    self.reply(('250 ' if index == len(lines) - 1 else '250-') + line)
+            elif verb == 'AUTH':
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb == 'MAIL':
+                mail_from, recipients, chunks = command.split(':', 1)[1].strip(), [], []
+                self.reply('250 2.1.0 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip().strip('<>')
+                if address in self.server.refuse:
+                    self.reply('550 5.1.1 No such user')
+                else:
+                    recipients.append(address)
+                    self.reply('250 2.1.5 OK')
+            elif verb == 'DATA':
+                if mail_from is None or not recipients:
+                    self.reply('554 5.5.1 No valid recipients')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    line = self.readline()
+                    if line == b'.\r\n':
+                        break
+                    lines.append(line[1:] if line.startswith(b'.') else line)
+                self.server.accept(mail_from, recipients, b''.join(lines), 'data')
+                mail_from, recipients = None, []
+                self.reply('250 2.0.0 Queued')
+            elif verb == 'BDAT':
+                parts = command.split()
+                chunks.append(self.read(int(parts[1])))
+                if len(parts) > 2 and parts[2].upper() == 'LAST':
+                    if mail_from is None or not recipients:
+                        self.reply('554 5.5.1 No valid recipients')
+                    else:
+                        self.server.accept(mail_from, recipients, b''.join(chunks), 'bdat')
+                        self.reply('250 2.0.0 Queued')
+                    mail_from, recipients, chunks = None, [], []
+                else:
+                    self.reply('250 2.0.0 Chunk received')
+            elif verb == 'RSET':
+                mail_from, recipients, chunks = None, [], []
+                self.reply('250 2.0.0 OK')
+            elif verb == 'NOOP':
+                self.reply('250 2.0.0 OK')
+            elif verb == 'QUIT':
+                self.reply('221 2.0.0 Bye')
+                return
+            else:
+                self.reply('502 5.5.2 Command not recognized')
+
+
+class MockSMTPServer:
+    def __init__(self, pipelining: bool = True, chunking: bool = False, refuse: Iterable[str] = (),
+                 delay: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.extensions = (['PIPELINING'] if pipelining else []) + (['CHUNKING'] if chunking else [])
+        self.refuse = set(refuse)
+        self.delay = delay
+        self.messages: List[Tuple[str, List[str], bytes, str]] = []
+        self.bursts: List[List[str]] = []
+        self.flights = 0
+        self._lock = threading.Lock()
+        self._socket = socket.socket()
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen(16)
+        self.host, self.port = self._socket.getsockname()[:2]
+        self._running = False
+
+    def accept(self, mail_from: str, recipients: List[str], body: bytes, transfer: str):
+        with self._lock:
+            self.messages.append((mail_from, list(recipients), body, transfer))
+
+    def log_burst(self, commands: List[str]):
+        with self._lock:
+            self.bursts.append(commands)
+
+    def reset(self):
+        with self._lock:
+            self.messages.clear()
+            self.bursts.clear()
+            self.flights = 0
+
+    def _serve(self):
+        while self._running:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection: socket.socket):
+        session = _Session(self, connection)
+        try:
+            session.run()
+        except (EOFError, OSError):
+            pass
+        finally:
+            if session.burst:
+                self.log_burst(session.burst)
+            connection.close()
+
+    def start(self) -> 'MockSMTPServer':
+        self._running = True
+        threading.Thread(target=self._serve, name='mock-smtp', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in with PIPELINING and CHUNKING")
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--pipelining', action='store_true', help="Advertise PIPELINING")
+    parser.add_argument('--chunking', action='store_true', help="Advertise CHUNKING (BDAT)")
+    parser.add_argument('--refuse', nargs='*', default=[], help="Recipients to refuse with 550")
+    parser.add_argument('--delay', type=float, default=0.0, help="Simulated round-trip latency (seconds)")
+    args = parser.parse_args()
+
+    server = MockSMTPServer(args.pipelining, args.chunking, args.refuse, args.delay, port=args.port).start()
+    print(f"📮 Mock SMTP server on {server.host}:{server.port} ({', '.join(server.extensions) or 'no extensions'})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import csv
+import gzip
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from contact_record import as_dict
+
+EXPORT_FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv', '.json': 'json'}
+# Contact fields in export order; 'emails' becomes email + additional_emails in CSV
+EXPORT_FIELDS = ['emails', 'phones', 'company', 'position', 'category', 'tags', 'address', 'notes',
+                 'created_at', 'updated_at', 'last_contact']
+LIST_FIELDS = ('emails', 'phones', 'tags')
+
+
+def split_compression(path: str) -> Tuple[str, bool]:
+    """(path without .gz, compressed?)"""
+    if path.lower().endswith('.gz'):
+        return path[:-3], True
+    return path, False
+
+
+def detect_format(path: str) -> Optional[str]:
+    return EXPORT_FORMATS.get(os.path.splitext(split_compression(path)[0])[1].lower())
+
+
+def open_text(path: str, mode: str = 'r', newline: str = None):
+    """Open a text file, transparently (de)compressing .gz paths"""
+    # Files from spreadsheets and address books often start with a byte order mark
+    encoding = 'utf-8-sig' if mode == 'r' else 'utf-8'
+    if split_compression(path)[1]:
+        # Level 6 is ~2x faster than the default 9 for a few percent larger files
+        return gzip.open(path, mode + 't', compresslevel=6, encoding=encoding, newline=newline)
+    return open(path, mode, encoding=encoding, newline=newline)
+
+
+_CONTACT_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+# The C string encoder behind JSONEncoder(ensure_ascii=False)
+_encode_string = json.encoder.encode_basestring
+
+
+def _contact_json(contact: Dict) -> str:
+    """A contact as json.dump(..., indent=2) writes it one level down in contacts.json
+
+    Strings and lists of strings are laid out here, which is several times faster
+    than the pure-Python indenting encoder; anything else is left to the encoder.
+    """
+    lines = []
+    for key, value in contact.items():
+        if key.__class__ is not str:
+            return _CONTACT_ENCODER.encode(contact).replace('\n', '\n  ')
+        if value.__class__ is str:
+            text = _encode_string(value)
+        elif value.__class__ is list and all(item.__class__ is str for item in value):
+            text = '[\n      ' + ',\n      '.join(map(_encode_string, value)) + '\n    ]' if value else '[]'
+        else:
+            text = _CONTACT_ENCODER.encode(value).replace('\n', '\n    ')
+        lines.append(f'    {_encode_string(key)}: {text}')
+    return '{\n' + ',\n'.join(lines) + '\n  }' if lines else '{}'
+
+
+def write_contacts_json(file, contacts: Iterable[Tuple[str, Dict]]) -> int:
+    """Write (name, contact) pairs in the contacts.json layout, one contact at a time
+
+    The output is identical to json.dump(..., indent=2, ensure_ascii=False).
+    """
+    count = 0
+    file.write('{')
+    for name, contact in contacts:
+        file.write(',\n  ' if count else '\n  ')
+        file.write(_encode_string(name))
+        file.write(': ')
+        file.write(_contact_json(as_dict(contact)))
+        count += 1
+    file.write('\n}' if count else '}')
+    return count
+
+
+def csv_columns(fields: List[str]) -> List[str]:
+    columns = ['name']
+    for field in fields:
+        columns.extend(['email', 'additional_emails'] if field == 'emails' else [field])
+    return columns
+
+
+class ContactExporter:
+    """Stream contacts to JSON Lines, CSV or JSON (optionally gzip-compressed)
+
+    Contacts are written one at a time straight from the store, optionally
+    limited to a segment and projected to a subset of fields. JSON Lines and
+    CSV output can be re-imported with ContactImporter; CSV output with a
+    message column can be sent with BatchEmailSender.
+    """
+
+    def __init__(self, contact_manager):
+        self.contact_manager = contact_manager
+
+    def contacts(self, segment: str = None) -> Iterator[Tuple[str, Dict]]:
+        """(name, contact) pairs in store order, or sorted by name for a segment"""
+        contacts = self.contact_manager.contacts
+        if not segment:
+            yield from contacts.items()
+            return
+        for name in sorted(self.contact_manager.find_segment(segment)):
+            if name in contacts:
+                yield name, contacts[name]
+
+    def export(self, path: str, file_format: str = None, segment: str = None, fields: List[str] = None,
+               message: str = None, tone: str = None) -> int:
+        """Write contacts to path (.jsonl, .csv, .json, optionally .gz) and return how many were exported
+
+        message and tone add constant columns so a CSV export can go straight to batch sending.
+        """
+        file_format = file_format or detect_format(path)
+        fields = [field for field in (fields or EXPORT_FIELDS) if field != 'name']
+        unknown = [field for field in fields if field not in EXPORT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown export field(s): {', '.join(unknown)}")
+        if file_format == 'jsonl':
+            return self._export_jsonl(path, segment, fields)
+        if file_format == 'csv':
+            return self._export_csv(path, segment, fields, message, tone)
+        if file_format == 'json':
+            return self._export_json(path, segment, fields)
+        raise ValueError(f"Unsupported export format for '{path}' (use .jsonl, .csv or .json, optionally .gz)")
+
+    def _project(self, contact: Dict, fields: List[str]) -> Dict:
+        if fields == EXPORT_FIELDS:
+            return as_dict(contact)
+        return {field: contact[field] for field in fields if contact.get(field)}
+
+    def _export_jsonl(self, path: str, segment: str, fields: List[str]) -> int:
+        count = 0
+        with open_text(path, 'w') as file:
+            for name, contact in self.contacts(segment):
+                record = {'name': name}
+                record.update(self._project(contact, fields))
+                file.write(json.dumps(record, ensure_ascii=False))
+                file.write('\n')
+                count += 1
+        return count
+
+    def _export_csv(self, path: str, segment: str, fields: List[str], message: str, tone: str) -> int:
+        columns = csv_columns(fields)
+        extra = {}
+        if message:
+            extra['message'] = message
+        if tone:
+            extra['tone'] = tone
+        count = 0
+        with open_text(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns + list(extra))
+            extra_values = list(extra.values())
+            for name, contact in self.contacts(segment):
+                row = [name]
+                for field in fields:
+                    value = contact.get(field) or ''
+                    if field == 'emails':
+                        row.append(value[0] if value else '')
+                        row.append(';'.join(value[1:]))
+                    elif field in LIST_FIELDS:
+                        row.append(';'.join(value))
+                    else:
+                        row.append(value)
+                writer.writerow(row + extra_values)
+                count += 1
+        return count
+
+    def _export_json(self, path: str, segment: str, fields: List[str]) -> int:
+        """The contacts.json layout, written one contact at a time"""
+        with open_text(path, 'w') as file:
+            return write_contacts_json(file, ((name, self._project(contact, fields))
+                                              for name, contact in self.contacts(segment)))
@@ -0,0 +1,322 @@
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from contact_exporter import open_text, split_compression
+from contact_index import normalize_tags
+from contact_manager import EMAIL_PATTERN
+
+IMPORT_FORMATS = {'.csv': 'csv', '.vcf': 'vcard', '.vcard': 'vcard', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+# CSV header (lowercased, spaces/underscores/dashes removed) -> contact field
+CSV_COLUMNS = {
+    'name': 'name', 'fullname': 'name', 'displayname': 'name',
+    'firstname': 'first_name', 'givenname': 'first_name',
+    'lastname': 'last_name', 'familyname': 'last_name', 'surname': 'last_name',
+    'email': 'emails', 'emails': 'emails', 'emailaddress': 'emails', 'email1': 'emails', 'email2': 'emails',
+    'additionalemails': 'emails',
+    'phone': 'phones', 'phones': 'phones', 'phonenumber': 'phones', 'mobile': 'phones', 'telephone': 'phones',
+    'company': 'company', 'organization': 'company', 'organisation': 'company',
+    'position': 'position', 'title': 'position', 'jobtitle': 'position',
+    'address': 'address', 'notes': 'notes', 'note': 'notes',
+    'category': 'category', 'group': 'category', 'tags': 'tags', 'labels': 'tags',
+    'createdat': 'created_at', 'updatedat': 'updated_at', 'lastcontact': 'last_contact'
+}
+# Copied onto new contacts when present (e.g. re-importing an export)
+OPTIONAL_FIELDS = ('company', 'position', 'address', 'notes', 'category')
+MULTI_VALUE_FIELDS = ('emails', 'phones', 'tags')
+TEXT_FIELDS = ('name', 'first_name', 'last_name', 'created_at', 'updated_at', 'last_contact') + OPTIONAL_FIELDS
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    merged: int = 0
+    rejected: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def reject(self, record_number: int, reason: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((record_number, reason))
+
+    def summary(self) -> str:
+        return (f"{self.inserted} inserted, {self.merged} merged, {self.rejected} rejected "
+                f"in {self.elapsed:.1f}s")
+
+
+def _split_values(value: str) -> List[str]:
+    """Split a multi-value cell on ';' or ','"""
+    if ',' not in value and ';' not in value:
+        value = value.strip()
+        return [value] if value else []
+    return [part.strip() for part in value.replace(';', ',').split(',') if part.strip()]
+
+
+def _multi_values(record: Dict, key: str) -> List[str]:
+    """A multi-value field as a list of strings; raises ValueError for null items or other types"""
+    value = record.get(key)
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return _split_values(value)
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    raise ValueError(f"'{key}' must be text or a list of text")
+
+
+def _clean_record(record: Dict) -> Dict:
+    """Copy of a record with multi-value fields as string lists ('email' folded into 'emails')
+
+    Raises ValueError when a field has the wrong type, e.g. "emails": null items or a number.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    for key in TEXT_FIELDS:
+        if record.get(key) is not None and not isinstance(record[key], str):
+            raise ValueError(f"'{key}' must be text")
+    cleaned = dict(record)
+    for key in MULTI_VALUE_FIELDS:
+        cleaned[key] = _multi_values(record, key)
+    if 'email' in cleaned:
+        cleaned['emails'] = cleaned['emails'] + _multi_values(cleaned, 'email')
+    return cleaned
+
+
+def parse_csv(path: str) -> Iterator[Dict]:
+    """Stream contact records from a CSV file with a header row"""
+    with open_text(path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if not header:
+            return
+        columns = [CSV_COLUMNS.get(''.join(ch for ch in column.lower() if ch.isalnum())) for column in header]
+        for row in reader:
+            record = {}
+            for column, value in zip(columns, row):
+                if not column or not value:
+                    continue
+                if column in MULTI_VALUE_FIELDS:
+                    record.setdefault(column, []).extend(_split_values(value))
+                else:
+                    record[column] = value.strip()
+            yield record
+
+
+def _unescape_vcard(value: str) -> str:
+    return value.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def _vcard_lines(file) -> Iterator[str]:
+    """Unfold vCard lines (continuations start with a space or tab)"""
+    pending = None
+    for line in file:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+def parse_vcard(path: str) -> Iterator[Dict]:
+    """Stream contact records from a vCard (.vcf) file"""
+    with open_text(path, 'r') as file:
+        record = None
+        for line in _vcard_lines(file):
+            key, separator, value = line.partition(':')
+            if not separator:
+                continue
+            # Property names may carry a group prefix (item1.EMAIL) and parameters (EMAIL;TYPE=work)
+            prop = key.split(';', 1)[0].rsplit('.', 1)[-1].upper()
+            if prop == 'BEGIN' and value.strip().upper() == 'VCARD':
+                record = {}
+            elif prop == 'END' and record is not None:
+                yield record
+                record = None
+            elif record is None:
+                continue
+            elif prop == 'FN':
+                record['name'] = _unescape_vcard(value).strip()
+            elif prop == 'N':
+                parts = [_unescape_vcard(part).strip() for part in value.split(';')]
+                record['last_name'] = parts[0] if parts else ''
+                record['first_name'] = parts[1] if len(parts) > 1 else ''
+            elif prop == 'EMAIL':
+                record.setdefault('emails', []).append(value.strip())
+            elif prop == 'TEL':
+                record.setdefault('phones', []).append(value.strip())
+            elif prop == 'ORG':
+                record['company'] = _unescape_vcard(value.split(';')[0]).strip()
+            elif prop == 'TITLE':
+                record['position'] = _unescape_vcard(value).strip()
+            elif prop == 'NOTE':
+                record['notes'] = _unescape_vcard(value).strip()
+            elif prop == 'ADR':
+                parts = [_unescape_vcard(part).strip() for part in value.split(';')]
+                record['address'] = ', '.join(part for part in parts if part)
+            elif prop == 'CATEGORIES':
+                record.setdefault('tags', []).extend(_split_values(_unescape_vcard(value)))
+
+
+def parse_jsonl(path: str) -> Iterator[Dict]:
+    """Stream contact records from a JSON Lines file (one {"name": ..., "emails": [...]} per line)"""
+    with open_text(path, 'r') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {'_error': f"invalid JSON ({e.msg})"}
+                continue
+            if not isinstance(record, dict):
+                yield {'_error': "record is not an object"}
+                continue
+            for field in MULTI_VALUE_FIELDS:
+                if isinstance(record.get(field), str):
+                    record[field] = _split_values(record[field])
+            yield record
+
+
+PARSERS = {'csv': parse_csv, 'vcard': parse_vcard, 'jsonl': parse_jsonl}
+
+
+class ContactImporter:
+    """Bulk import of CSV and vCard files into a ContactManager
+
+    Records are streamed, emails validated with a precompiled pattern and
+    de-duplicated against the email index. Changes are applied to the store
+    and indexes in batches, then the contacts file is saved once.
+    """
+
+    def __init__(self, contact_manager, batch_size: int = 10000):
+        self.contact_manager = contact_manager
+        self.batch_size = batch_size
+
+    @staticmethod
+    def detect_format(path: str) -> Optional[str]:
+        return IMPORT_FORMATS.get(os.path.splitext(split_compression(path)[0])[1].lower())
+
+    def import_file(self, path: str, file_format: str = None) -> ImportReport:
+        """Import a CSV, vCard or JSON Lines file (optionally .gz) and return the inserted/merged/rejected counts"""
+        file_format = file_format or self.detect_format(path)
+        if file_format not in PARSERS:
+            raise ValueError(f"Unsupported import format for '{path}' (use .csv, .vcf or .jsonl)")
+        return self.import_records(PARSERS[file_format](path))
+
+    def import_records(self, records) -> ImportReport:
+        """Import an iterable of record dicts (name, emails, phones, company, ...)"""
+        started = time.perf_counter()
+        report = ImportReport()
+        timestamp = self.contact_manager._get_current_timestamp()
+        # Emails of contacts touched in the current batch, not yet in the index
+        pending_emails: Dict[str, str] = {}
+        batch: Dict[str, None] = {}
+
+        try:
+            for record_number, record in enumerate(records, 1):
+                if '_error' in record:
+                    report.reject(record_number, record['_error'])
+                    continue
+                try:
+                    record = _clean_record(record)
+                except ValueError as e:
+                    report.reject(record_number, str(e))
+                    continue
+                emails = []
+                seen = set()
+                invalid = []
+                for email in record['emails']:
+                    email = email.strip()
+                    if EMAIL_PATTERN.match(email) is None:
+                        invalid.append(email)
+                    elif email.lower() not in seen:
+                        seen.add(email.lower())
+                        emails.append(email)
+                if not emails:
+                    report.reject(record_number, f"no valid email ({', '.join(invalid)})" if invalid else "no email")
+                    continue
+
+                name = record.get('name') or ' '.join(
+                    part for part in (record.get('first_name'), record.get('last_name')) if part)
+                existing = (self._existing_contact(emails, pending_emails)
+                            or (name if name in self.contact_manager.contacts else None))
+                if existing:
+                    self._merge(self.contact_manager.contacts[existing], record, emails)
+                    report.merged += 1
+                    name = existing
+                else:
+                    name = name or emails[0]
+                    self.contact_manager.contacts[name] = self._new_contact(record, emails, timestamp)
+                    report.inserted += 1
+
+                batch[name] = None
+                for email in self.contact_manager.contacts[name]['emails']:
+                    pending_emails.setdefault(email.lower(), name)
+                if len(batch) >= self.batch_size:
+                    self._commit(batch, pending_emails, report)
+        finally:
+            # Also on a read error part-way through: contacts already written to the store
+            # must reach the stats and indexes, and the file must match memory
+            if batch:
+                self._commit(batch, pending_emails, report)
+            if report.inserted or report.merged:
+                self.contact_manager.save_contacts()
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _existing_contact(self, emails: List[str], pending_emails: Dict[str, str]) -> Optional[str]:
+        """Name of a contact that already has one of these emails"""
+        index = self.contact_manager.index
+        for email in emails:
+            email = email.lower()
+            if email in pending_emails:
+                return pending_emails[email]
+            for name in index.lookup('email', email):
+                return name
+        return None
+
+    @staticmethod
+    def _new_contact(record: Dict, emails: List[str], timestamp: str) -> Dict:
+        contact = {
+            'emails': emails,
+            'phones': list(dict.fromkeys(record.get('phones', []))),
+            'created_at': record.get('created_at') or timestamp,
+            'last_contact': record.get('last_contact') or timestamp
+        }
+        for key in OPTIONAL_FIELDS + ('updated_at',):
+            if record.get(key):
+                contact[key] = record[key]
+        tags = normalize_tags(record.get('tags'))
+        if tags:
+            contact['tags'] = tags
+        return contact
+
+    @staticmethod
+    def _merge(contact: Dict, record: Dict, emails: List[str]):
+        """Add new emails, phones and tags; fill fields the contact does not have yet"""
+        known = {email.lower() for email in contact.setdefault('emails', [])}
+        contact['emails'].extend(email for email in emails if email.lower() not in known)
+        phones = contact.setdefault('phones', [])
+        phones.extend(phone for phone in dict.fromkeys(record.get('phones', [])) if phone not in phones)
+        if record.get('tags'):
+            contact['tags'] = normalize_tags(contact.get('tags', []) + list(record['tags']))
+        for key in OPTIONAL_FIELDS:
+            if record.get(key) and not contact.get(key):
+                contact[key] = record[key]
+
+    def _commit(self, batch: Dict[str, None], pending_emails: Dict[str, str], report: ImportReport):
+        """Apply a batch of changed contacts to the statistics and indexes"""
+        self.contact_manager._track_many(batch)
+        batch.clear()
+        pending_emails.clear()
+        report.batches += 1
@@ -0,0 +1,260 @@
+import re
+import sys
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from contact_record import ContactRecord, format_timestamp
+
+INDEXED_FIELDS = ('category', 'tag', 'company', 'email')
+FIELD_ALIASES = {'tags': 'tag', 'categories': 'category', 'emails': 'email'}
+# Parentheses, field:"quoted value", bare words and comparisons like created>=2024-01-01
+TOKEN_PATTERN = re.compile(r'\(|\)|[^\s()"]+"[^"]*"|"[^"]*"|[^\s()]+')
+CREATED_PATTERN = re.compile(r'^created(>=|<=|>|<|:|=)(.+)$', re.IGNORECASE)
+# Appended to a date prefix so '2024-01-31' also covers '2024-01-31 23:59:59'
+PREFIX_END = '\uffff'
+
+
+def normalize_tags(tags) -> List[str]:
+    """Tags as a de-duplicated list from a list or a comma-separated string"""
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    result = []
+    for tag in tags or []:
+        tag = str(tag).strip()
+        if tag and tag.lower() not in (t.lower() for t in result):
+            result.append(tag)
+    return result
+
+
+class ContactIndex:
+    """Secondary indexes over category, tags, company, email and created_at
+
+    Postings are dicts used as insertion-ordered sets of contact names, so
+    list_contacts keeps file order and queries use set algebra on key views.
+    """
+
+    def __init__(self, contacts: Dict = None):
+        self.postings: Dict[str, Dict[str, Dict[str, None]]] = {field: {} for field in INDEXED_FIELDS}
+        self._keys: Dict[str, Tuple[str, Tuple[str, ...], str, str, Tuple[str, ...]]] = {}
+        # (created_at, name), oldest first; bulk updates defer the sort until the next read
+        self._by_created: List[Tuple[str, str]] = []
+        self._unsorted = False
+        if contacts:
+            self.update_many(contacts)
+
+    @staticmethod
+    def _index_keys(data: Dict) -> Tuple[str, Tuple[str, ...], str, str, Tuple[str, ...]]:
+        if isinstance(data, ContactRecord):
+            # Read the compact fields directly instead of building write-through lists
+            tags, emails = data.values_of('tags'), data.values_of('emails')
+            category, company = data.category, data.company
+            created = format_timestamp(data.created_at) if data.created_at is not None else ''
+        else:
+            tags, emails = data.get('tags'), data.get('emails', [])
+            category, company = data.get('category'), data.get('company')
+            created = str(data.get('created_at') or '')
+        # Lowercase values are shared between contacts, and addresses already in lowercase are reused
+        return (_lower(category),
+                tuple(sys.intern(tag.lower()) for tag in normalize_tags(tags)) if tags else (),
+                _lower(company),
+                created,
+                tuple(email if email.islower() else email.lower() for email in emails))
+
+    def _post(self, field: str, value: str, name: str):
+        if value:
+            self.postings[field].setdefault(value, {})[name] = None
+
+    def _unpost(self, field: str, value: str, name: str):
+        names = self.postings[field].get(value)
+        if names is not None:
+            names.pop(name, None)
+            if not names:
+                del self.postings[field][value]
+
+    def _remove_postings(self, name: str) -> Optional[Tuple]:
+        keys = self._keys.pop(name, None)
+        if keys:
+            category, tags, company, _, emails = keys
+            self._unpost('category', category, name)
+            for tag in tags:
+                self._unpost('tag', tag, name)
+            self._unpost('company', company, name)
+            for email in emails:
+                self._unpost('email', email, name)
+        return keys
+
+    def _add_postings(self, name: str, data: Dict) -> str:
+        keys = self._index_keys(data)
+        category, tags, company, created, emails = keys
+        self._keys[name] = keys
+        self._post('category', category, name)
+        for tag in tags:
+            self._post('tag', tag, name)
+        self._post('company', company, name)
+        for email in emails:
+            self._post('email', email, name)
+        return created
+
+    def update(self, name: str, data: Dict):
+        """Index a new contact or re-index a changed one"""
+        self.remove(name)
+        insort(self._created_order(), (self._add_postings(name, data), name))
+
+    def remove(self, name: str):
+        """Drop a contact from every index (no-op for unknown names)"""
+        keys = self._remove_postings(name)
+        if keys:
+            entry = (keys[3], name)
+            order = self._created_order()
+            index = bisect_left(order, entry)
+            if index < len(order) and order[index] == entry:
+                del order[index]
+
+    def update_many(self, contacts: Dict):
+        """Index many contacts at once (loading, imports)"""
+        added, moved = [], set()
+        for name, data in contacts.items():
+            previous = self._remove_postings(name)
+            created = self._add_postings(name, data)
+            # Re-indexed contacts keep their place in the created_at order unless it changed
+            if previous is None or previous[3] != created:
+                added.append((created, name))
+                if previous is not None:
+                    moved.add(name)
+        if moved:
+            self._by_created = [entry for entry in self._by_created if entry[1] not in moved]
+        if added:
+            self._by_created.extend(added)
+            self._unsorted = True
+
+    def _created_order(self) -> List[Tuple[str, str]]:
+        if self._unsorted:
+            self._by_created.sort()
+            self._unsorted = False
+        return self._by_created
+
+    def all_names(self):
+        return self._keys.keys()
+
+    def lookup(self, field: str, value: str):
+        """Names whose field equals value (case-insensitive), in insertion order"""
+        if field not in self.postings:
+            raise ValueError(f"Unknown field '{field}' (use {', '.join(INDEXED_FIELDS)} or created)")
+        return self.postings[field].get(value.strip().lower(), {}).keys()
+
+    def values(self, field: str) -> List[str]:
+        """Distinct lowercase values indexed for a field"""
+        return sorted(self.postings[field])
+
+    def created_range(self, start: str = None, end: str = None) -> List[str]:
+        """Names created in [start, end); bounds are timestamp strings or prefixes
+
+        Contacts without created_at are not in any range, open-ended or not.
+        """
+        order = self._created_order()
+        # They are indexed under '', which sorts before every timestamp
+        low = bisect_left(order, (start or '\0',))
+        high = bisect_left(order, (end,)) if end else len(order)
+        return [name for _, name in order[low:high]]
+
+    def recent(self, count: int = 5) -> List[Tuple[str, str]]:
+        """(name, created_at) for the newest contacts, oldest of them first"""
+        return [(name, created) for created, name in self._created_order()[-count:]] if count > 0 else []
+
+    def query(self, text: str) -> Set[str]:
+        """Evaluate a segment query and return the matching names
+
+        Terms: tag:vip, category:work, company:"Acme Inc", email:a@b.com, created>=2024-01-01,
+        created<2025, created:2024-03 (prefix). Combine with AND, OR, NOT and
+        parentheses; adjacent terms are ANDed and '*' matches every contact.
+        """
+        tokens = TOKEN_PATTERN.findall(text or '')
+        if not tokens:
+            raise ValueError("Empty segment query")
+        return _QueryParser(self, tokens).parse()
+
+    def _term(self, token: str) -> Set[str]:
+        if token == '*':
+            return set(self._keys)
+        created = CREATED_PATTERN.match(token)
+        if created:
+            operator, value = created.group(1), _unquote(created.group(2))
+            if operator == '>=':
+                return set(self.created_range(start=value))
+            if operator == '>':
+                return set(self.created_range(start=value + PREFIX_END))
+            if operator == '<':
+                return set(self.created_range(end=value))
+            if operator == '<=':
+                return set(self.created_range(end=value + PREFIX_END))
+            return set(self.created_range(value, value + PREFIX_END))
+        field, separator, value = token.partition(':')
+        field = FIELD_ALIASES.get(field.lower(), field.lower())
+        if not separator or not value:
+            raise ValueError(f"Expected field:value, got '{token}'")
+        return set(self.lookup(field, _unquote(value)))
+
+
+def _lower(value: Optional[str]) -> str:
+    return sys.intern(value.strip().lower()) if value else ''
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+class _QueryParser:
+    """Recursive-descent parser: OR binds loosest, then AND, then NOT"""
+
+    def __init__(self, index: ContactIndex, tokens: Iterable[str]):
+        self.index = index
+        self.tokens = list(tokens)
+        self.position = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def parse(self) -> Set[str]:
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected '{self._peek()}' in segment query")
+        return result
+
+    def _or(self) -> Set[str]:
+        result = self._and()
+        while (self._peek() or '').upper() == 'OR':
+            self._next()
+            result = result | self._and()
+        return result
+
+    def _and(self) -> Set[str]:
+        result = self._not()
+        while self._peek() is not None and self._peek() != ')' and self._peek().upper() != 'OR':
+            if self._peek().upper() == 'AND':
+                self._next()
+            result = result & self._not()
+        return result
+
+    def _not(self) -> Set[str]:
+        if (self._peek() or '').upper() == 'NOT':
+            self._next()
+            return set(self.index.all_names()) - self._not()
+        return self._atom()
+
+    def _atom(self) -> Set[str]:
+        token = self._next()
+        if token is None:
+            raise ValueError("Segment query ended unexpectedly")
+        if token == '(':
+            result = self._or()
+            if self._next() != ')':
+                raise ValueError("Missing ')' in segment query")
+            return result
+        if token == ')' or token.upper() in ('AND', 'OR'):
+            raise ValueError(f"Unexpected '{token}' in segment query")
+        return self.index._term(token)
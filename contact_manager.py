@@ -1,41 +1,203 @@
+import gc
 import json
 import os
 import re
-from typing import Dict, List, Optional
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
+from contact_index import ContactIndex, normalize_tags
+from contact_record import ContactRecord, ContactStore
+from contact_exporter import write_contacts_json
+from contact_snapshot import json_fingerprint, read_snapshot, snapshot_is_current, write_snapshot
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
+@contextmanager
+def _gc_paused():
+    """Skip cyclic GC during a bulk load or save
+
+    Nothing built there forms a cycle, but every few hundred allocations set off
+    a collection that walks all the records already in memory. On the way out,
+    freeze/unfreeze moves what was built straight to the oldest generation, so
+    the first young collections afterwards do not walk it either.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.freeze()
+        gc.unfreeze()
+        if enabled:
+            gc.enable()
+
+
+class ContactStats:
+    """Running totals for the statistics screen, updated on every contact change
+
+    Each contact's contribution (email count, phone count, category) is
+    remembered so it can be subtracted again when the contact changes.
+    """
+
+    def __init__(self, contacts: Dict = None):
+        self.total_emails = 0
+        self.total_phones = 0
+        self.categories = Counter()
+        self._contributions: Dict[str, Tuple[int, int, str]] = {}
+        for name, data in (contacts or {}).items():
+            self.update(name, data)
+
+    def update(self, name: str, data: Dict):
+        """Add a contact or replace its previous contribution"""
+        self.remove(name)
+        if isinstance(data, ContactRecord):
+            emails, phones = len(data.values_of('emails')), len(data.values_of('phones'))
+        else:
+            emails, phones = len(data.get('emails', [])), len(data.get('phones', []))
+        category = data.get('category') or ''
+        self._contributions[name] = (emails, phones, category)
+        self.total_emails += emails
+        self.total_phones += phones
+        if category:
+            self.categories[category] += 1
+
+    def remove(self, name: str):
+        """Subtract a contact's contribution (no-op for unknown names)"""
+        contribution = self._contributions.pop(name, None)
+        if contribution:
+            emails, phones, category = contribution
+            self.total_emails -= emails
+            self.total_phones -= phones
+            if category:
+                self.categories[category] -= 1
+                if not self.categories[category]:
+                    del self.categories[category]
+
+    @property
+    def total_contacts(self) -> int:
+        return len(self._contributions)
+
+    def summary(self) -> Dict:
+        total = self.total_contacts
+        return {
+            'total_contacts': total,
+            'total_emails': self.total_emails,
+            'total_phones': self.total_phones,
+            'average_emails': self.total_emails / total if total else 0.0,
+            'categories': dict(sorted(self.categories.items()))
+        }
+
+
 class ContactManager:
-    def __init__(self, contacts_file='contacts.json'):
+    def __init__(self, contacts_file='contacts.json', snapshot_file: str = None):
         self.contacts_file = contacts_file
+        # Binary copy of contacts_file for fast startup (see contact_snapshot.py); None to disable
+        self.snapshot_file = snapshot_file or None
         self.contacts = self.load_contacts()
+        # Built on first use, so startup only pays for loading
+        self._stats: Optional[ContactStats] = None
+        self._index: Optional[ContactIndex] = None
+    
+    @property
+    def stats(self) -> ContactStats:
+        if self._stats is None:
+            self._stats = ContactStats(self.contacts)
+        return self._stats
+    
+    @property
+    def index(self) -> ContactIndex:
+        if self._index is None:
+            self._index = ContactIndex(self.contacts)
+        return self._index
+    
+    def _track(self, name: str):
+        """Refresh statistics and indexes after a contact was added or changed"""
+        if self._stats is not None:
+            self._stats.update(name, self.contacts[name])
+        if self._index is not None:
+            self._index.update(name, self.contacts[name])
     
-    def load_contacts(self) -> Dict:
-        """Load contacts from JSON file"""
+    def _untrack(self, name: str):
+        """Drop a contact from statistics and indexes before it is removed or renamed"""
+        if self._stats is not None:
+            self._stats.remove(name)
+        if self._index is not None:
+            self._index.remove(name)
+    
+    def _track_many(self, names):
+        """Refresh statistics and indexes for many contacts at once"""
+        if self._stats is None and self._index is None:
+            return
+        changed = {name: self.contacts[name] for name in names}
+        if self._stats is not None:
+            for name, data in changed.items():
+                self._stats.update(name, data)
+        if self._index is not None:
+            self._index.update_many(changed)
+    
+    def load_contacts(self) -> ContactStore:
+        """Load contacts from the snapshot if it is current, otherwise from the JSON file"""
+        if snapshot_is_current(self.snapshot_file, self.contacts_file):
+            try:
+                return read_snapshot(self.snapshot_file)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Error loading contacts snapshot, reading {self.contacts_file}: {e}")
+        store = ContactStore()
         if os.path.exists(self.contacts_file):
             try:
+                # Taken before reading: if the file changes meanwhile, the snapshot just looks stale next time
+                source = json_fingerprint(self.contacts_file) if self.snapshot_file else None
                 with open(self.contacts_file, 'r', encoding='utf-8') as file:
-                    return json.load(file)
+                    # Parsed by the C decoder, then turned into records in one pass
+                    with _gc_paused():
+                        store = ContactStore.from_json(json.load(file))
             except (json.JSONDecodeError, Exception) as e:
                 print(f"⚠️  Error loading contacts: {e}")
-                return {}
-        return {}
+                return ContactStore()
+            # contacts.json was new or edited by hand: refresh the snapshot for the next start
+            self.save_snapshot(store, source)
+        return store
     
     def save_contacts(self):
-        """Save contacts to JSON file"""
+        """Save contacts to JSON file (and the snapshot, when enabled)"""
         try:
-            with open(self.contacts_file, 'w', encoding='utf-8') as file:
-                json.dump(self.contacts, file, indent=2, ensure_ascii=False)
-            return True
+            with open(self.contacts_file, 'w', encoding='utf-8') as file, _gc_paused():
+                write_contacts_json(file, self.contacts.items())
         except Exception as e:
             print(f"❌ Error saving contacts: {e}")
             return False
+        self.save_snapshot()
+        return True
+    
+    def save_snapshot(self, contacts: ContactStore = None, source: Tuple[int, int, bytes] = None) -> bool:
+        """Write the binary snapshot; a failure only costs the next start a JSON load
+
+        source is the json_fingerprint of the contacts file matching contacts;
+        by default the file is fingerprinted as it is now.
+        """
+        if not self.snapshot_file:
+            return False
+        try:
+            if source is None:
+                source = json_fingerprint(self.contacts_file)
+            write_snapshot(self.snapshot_file, (contacts if contacts is not None else self.contacts).items(), source)
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Error saving contacts snapshot: {e}")
+            return False
     
     def find_contact(self, name: str) -> Optional[Dict]:
         """Find contact by name (case-insensitive)"""
+        if name in self.contacts:
+            return self.contacts[name]
         name_lower = name.lower()
-        for contact_name, contact_data in self.contacts.items():
+        # Compare names only, so a snapshot-backed store does not build every record
+        for contact_name in self.contacts:
             if contact_name.lower() == name_lower:
-                return contact_data
+                return self.contacts[contact_name]
         return None
     
     def get_contact_details(self, name: str) -> Optional[Dict]:
@@ -44,15 +206,7 @@ class ContactManager:
     
     def find_contacts_by_email(self, email: str) -> List[str]:
         """Find all contacts with matching email"""
-        matching_contacts = []
-        email_lower = email.lower()
-        
-        for contact_name, contact_data in self.contacts.items():
-            emails = contact_data.get('emails', [])
-            if any(e.lower() == email_lower for e in emails):
-                matching_contacts.append(contact_name)
-        
-        return matching_contacts
+        return list(self.index.lookup('email', email))
     
     def create_contact(self) -> bool:
         """Create a new contact with comprehensive information"""
@@ -117,6 +271,7 @@ class ContactManager:
         address = input("Address: ").strip()
         notes = input("Notes: ").strip()
         category = input("Category (e.g., Work, Personal, Family): ").strip()
+        tags = normalize_tags(input("Tags (comma-separated, e.g., vip, newsletter): "))
         
         if company:
             contact_data['company'] = company
@@ -128,9 +283,12 @@ class ContactManager:
             contact_data['notes'] = notes
         if category:
             contact_data['category'] = category
+        if tags:
+            contact_data['tags'] = tags
         
         # Save contact
         self.contacts[name] = contact_data
+        self._track(name)
         if self.save_contacts():
             print(f"✅ Contact '{name}' created successfully!")
             self.display_contact_details(name, contact_data)
@@ -183,6 +341,7 @@ class ContactManager:
         address = input("Address: ").strip()
         notes = input("Notes: ").strip()
         category = input("Category: ").strip()
+        tags = normalize_tags(input("Tags (comma-separated): "))
         
         if phone:
             contact_data['phones'] = [phone]
@@ -196,9 +355,12 @@ class ContactManager:
             contact_data['notes'] = notes
         if category:
             contact_data['category'] = category
+        if tags:
+            contact_data['tags'] = tags
         
         # Save contact
         self.contacts[name] = contact_data
+        self._track(name)
         if self.save_contacts():
             print(f"✅ Contact '{name}' created successfully!")
             return True
@@ -228,6 +390,7 @@ class ContactManager:
                     contact['emails'].append(new_email)
                     contact['updated_at'] = self._get_current_timestamp()
                     self.contacts[name] = contact
+                    self._track(name)
                     if self.save_contacts():
                         print(f"✅ Email '{new_email}' added to '{name}'")
                         return True
@@ -258,16 +421,19 @@ class ContactManager:
             print("5. 📍 Edit address")
             print("6. 📋 Edit notes")
             print("7. 🏷️  Edit category")
-            print("8. ✅ Finish editing")
+            print("8. 🔖 Edit tags")
+            print("9. ✅ Finish editing")
             
-            choice = input("\nSelect option (1-8): ").strip()
+            choice = input("\nSelect option (1-9): ").strip()
             
             if choice == '1':
                 new_name = input("New name: ").strip()
                 if new_name and new_name != name:
                     if not self.find_contact(new_name):
+                        self._untrack(name)
                         self.contacts[new_name] = self.contacts.pop(name)
                         name = new_name
+                        self._track(name)
                         print(f"✅ Name changed to '{new_name}'")
                     else:
                         print("❌ Contact with that name already exists")
@@ -302,8 +468,12 @@ class ContactManager:
                     contact['category'] = category
             
             elif choice == '8':
+                self.manage_contact_tags(name, contact)
+            
+            elif choice == '9':
                 contact['updated_at'] = self._get_current_timestamp()
                 self.contacts[name] = contact
+                self._track(name)
                 if self.save_contacts():
                     print("✅ Contact updated successfully!")
                     return True
@@ -393,6 +563,37 @@ class ContactManager:
             else:
                 print("❌ Invalid action")
     
+    def manage_contact_tags(self, name: str, contact: Dict):
+        """Manage tags for a contact"""
+        while True:
+            tags = normalize_tags(contact.get('tags', []))
+            print(f"\n🔖 MANAGING TAGS FOR '{name}'")
+            print(f"Tags: {', '.join(tags) if tags else '(none)'}")
+            
+            print("\nOptions: [a]dd, [r]emove, [d]one")
+            action = input("Choose action: ").lower().strip()
+            
+            if action == 'a':
+                new_tags = normalize_tags(input("Tags to add (comma-separated): "))
+                if new_tags:
+                    contact['tags'] = normalize_tags(tags + new_tags)
+                    print(f"✅ Tags: {', '.join(contact['tags'])}")
+                else:
+                    print("⚠️  No tags entered")
+            
+            elif action == 'r' and tags:
+                remove = {tag.lower() for tag in normalize_tags(input("Tags to remove (comma-separated): "))}
+                contact['tags'] = [tag for tag in tags if tag.lower() not in remove]
+                if not contact['tags']:
+                    del contact['tags']
+                print(f"✅ Tags: {', '.join(contact.get('tags', [])) or '(none)'}")
+            
+            elif action == 'd':
+                break
+            
+            else:
+                print("❌ Invalid action")
+    
     def display_contact_details(self, name: str, contact: Dict):
         """Display comprehensive contact details"""
         print(f"\n👤 CONTACT DETAILS: {name}")
@@ -407,6 +608,8 @@ class ContactManager:
             print(f"📍 Address: {contact.get('address')}")
         if contact.get('category'):
             print(f"🏷️  Category: {contact.get('category')}")
+        if contact.get('tags'):
+            print(f"🔖 Tags: {', '.join(contact.get('tags'))}")
         if contact.get('notes'):
             print(f"📋 Notes: {contact.get('notes')}")
         print(f"📅 Created: {contact.get('created_at', 'Unknown')}")
@@ -428,26 +631,44 @@ class ContactManager:
             confirm = input(f"Are you sure you want to delete '{name}'? (y/n): ").lower().strip()
             if confirm == 'y':
                 del self.contacts[name]
+                self._untrack(name)
                 return self.save_contacts()
         return False
     
     def list_contacts(self, category: str = None) -> List[str]:
         """Get list of all contact names, optionally filtered by category"""
         if category:
-            return [name for name, data in self.contacts.items() 
-                   if data.get('category', '').lower() == category.lower()]
+            return list(self.index.lookup('category', category))
         return list(self.contacts.keys())
     
     def get_contact_categories(self) -> List[str]:
         """Get all unique contact categories"""
-        categories = set()
-        for contact_data in self.contacts.values():
-            if 'category' in contact_data and contact_data['category']:
-                categories.add(contact_data['category'])
-        return sorted(list(categories))
+        return sorted(self.stats.categories)
+    
+    def get_statistics(self, recent: int = 5) -> Dict:
+        """Contact, email and phone totals, category counts and the newest contacts"""
+        statistics = self.stats.summary()
+        statistics['recent'] = self.index.recent(recent)
+        return statistics
+    
+    def get_contact_tags(self) -> List[str]:
+        """Get all tags in use (lowercase)"""
+        return self.index.values('tag')
+    
+    def find_segment(self, query: str) -> Set[str]:
+        """Names matching a segment query, e.g. 'tag:vip AND NOT category:family'"""
+        return self.index.query(query)
+    
+    def update_last_contact(self, name: str) -> bool:
+        """Stamp last_contact after an email was sent to a contact"""
+        contact = self.find_contact(name)
+        if not contact:
+            return False
+        contact['last_contact'] = self._get_current_timestamp()
+        return self.save_contacts()
     
     def search_contacts(self, query: str) -> List[str]:
-        """Search contacts by name, email, company, or notes"""
+        """Search contacts by name, email, company, notes, or tags"""
         query = query.lower()
         results = []
         
@@ -471,32 +692,55 @@ class ContactManager:
             if query in data.get('notes', '').lower():
                 results.append(name)
                 continue
+            
+            # Search in tags
+            if any(query in tag.lower() for tag in data.get('tags', [])):
+                results.append(name)
+                continue
         
         return results
     
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return EMAIL_PATTERN.match(email) is not None
     
     def _get_current_timestamp(self):
         """Get current timestamp"""
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    def export_contacts(self, filename: str) -> bool:
-        """Export contacts to JSON file"""
+    def export_contacts(self, filename: str, segment: str = None, fields: List[str] = None) -> bool:
+        """Export contacts to a JSON, JSON Lines or CSV file (.gz to compress)
+        
+        segment limits the export to a segment query; fields projects contact fields.
+        """
+        from contact_exporter import ContactExporter
+        
         try:
-            with open(filename, 'w', encoding='utf-8') as file:
-                json.dump(self.contacts, file, indent=2, ensure_ascii=False)
+            count = ContactExporter(self).export(filename, segment=segment, fields=fields)
+            print(f"📤 Exported {count} contact(s)")
             return True
         except Exception as e:
             print(f"❌ Error exporting contacts: {e}")
             return False
     
     def import_contacts(self, filename: str) -> bool:
-        """Import contacts from JSON file"""
+        """Import contacts from a JSON, JSON Lines, CSV or vCard file (optionally .gz)"""
+        from contact_exporter import open_text
+        from contact_importer import ContactImporter
+        
+        if ContactImporter.detect_format(filename):
+            try:
+                report = ContactImporter(self).import_file(filename)
+            except Exception as e:
+                print(f"❌ Error importing contacts: {e}")
+                return False
+            print(f"📥 {report.summary()}")
+            for record_number, reason in report.errors:
+                print(f"  ⚠️  Record {record_number}: {reason}")
+            return True
+        
         try:
-            with open(filename, 'r', encoding='utf-8') as file:
+            with open_text(filename) as file:
                 imported_contacts = json.load(file)
             
             # Merge with existing contacts
@@ -515,6 +759,7 @@ class ContactManager:
                 else:
                     self.contacts[name] = data
             
+            self._track_many(imported_contacts)
             return self.save_contacts()
         except Exception as e:
             print(f"❌ Error importing contacts: {e}")
@@ -0,0 +1,570 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import date
+from itertools import count
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+_intern = sys.intern
+
+# Contact fields in the order new contacts are built (and saved)
+FIELD_ORDER = ('emails', 'phones', 'created_at', 'last_contact', 'company', 'position', 'address', 'notes',
+               'category', 'tags', 'updated_at')
+LIST_FIELDS = frozenset(('emails', 'phones', 'tags'))
+TIMESTAMP_FIELDS = frozenset(('created_at', 'updated_at', 'last_contact'))
+# Low-cardinality values shared between contacts
+INTERNED_FIELDS = frozenset(('company', 'position', 'category'))
+# Long, rarely read fields that a snapshot leaves undecoded until first use
+LAZY_FIELDS = frozenset(('address', 'notes'))
+_FIELDS = frozenset(FIELD_ORDER)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# 'YYYY-MM-DD' -> seconds at midnight and 'HH:MM:SS' -> seconds into the day (and back);
+# contacts share far fewer dates and clock times than whole timestamps
+_DAY_SECONDS: Dict[str, Optional[int]] = {}
+_DAY_STRINGS: Dict[int, str] = {}
+_CLOCK_SECONDS: Dict[str, Optional[int]] = {}
+_CLOCK_STRINGS: Dict[int, str] = {}
+# Whole timestamps: contacts imported or added together share their created_at
+_TIMESTAMPS: Dict[str, Union[int, str]] = {}
+
+
+def _day_seconds(day: str) -> Optional[int]:
+    """Seconds from the epoch to midnight of 'YYYY-MM-DD', or None if it is not a date"""
+    seconds = None
+    digits = day[:4] + day[5:7] + day[8:]
+    if day[4] == '-' and day[7] == '-' and digits.isascii() and digits.isdigit():
+        try:
+            seconds = (date(int(day[:4]), int(day[5:7]), int(day[8:])).toordinal() - _EPOCH_ORDINAL) * 86400
+        except ValueError:
+            pass
+    if len(_DAY_SECONDS) > 100000:
+        _DAY_SECONDS.clear()
+    _DAY_SECONDS[day] = seconds
+    return seconds
+
+
+def _clock_seconds(clock: str) -> Optional[int]:
+    """Seconds into the day for 'HH:MM:SS', or None if it is not a clock time"""
+    seconds = None
+    digits = clock[:2] + clock[3:5] + clock[6:]
+    if clock[2] == ':' and clock[5] == ':' and len(digits) == 6 and digits.isascii() and digits.isdigit():
+        hours, minutes, rest = int(digits[:2]), int(digits[2:4]), int(digits[4:])
+        if hours <= 23 and minutes <= 59 and rest <= 59:
+            seconds = hours * 3600 + minutes * 60 + rest
+    if len(_CLOCK_SECONDS) > 100000:
+        _CLOCK_SECONDS.clear()
+    _CLOCK_SECONDS[clock] = seconds
+    return seconds
+
+
+def encode_timestamp(value: str) -> Union[int, str]:
+    """'YYYY-MM-DD HH:MM:SS' as epoch seconds (naive, no timezone); other strings are kept as they are"""
+    encoded = _TIMESTAMPS.get(value)
+    if encoded is not None:
+        return encoded
+    encoded = value
+    if len(value) == 19 and value[10] == ' ':
+        day = _DAY_SECONDS.get(value[:10], -1)
+        if day == -1:
+            day = _day_seconds(value[:10])
+        clock = _CLOCK_SECONDS.get(value[11:], -1)
+        if clock == -1:
+            clock = _clock_seconds(value[11:])
+        if day is not None and clock is not None:
+            encoded = day + clock
+    if len(_TIMESTAMPS) > 100000:
+        _TIMESTAMPS.clear()
+    _TIMESTAMPS[value] = encoded
+    return encoded
+
+
+def format_timestamp(value: Union[int, str]) -> str:
+    """Inverse of encode_timestamp"""
+    if value.__class__ is not int:
+        return value
+    days, seconds = divmod(value, 86400)
+    day = _DAY_STRINGS.get(days)
+    if day is None:
+        day = date.fromordinal(_EPOCH_ORDINAL + days).isoformat()
+        if len(_DAY_STRINGS) > 100000:
+            _DAY_STRINGS.clear()
+        _DAY_STRINGS[days] = day
+    clock = _CLOCK_STRINGS.get(seconds)
+    if clock is None:
+        hours, rest = divmod(seconds, 3600)
+        clock = _CLOCK_STRINGS[seconds] = f"{hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{day} {clock}"
+
+
+class LazyText:
+    """Placeholder for a text field that is decoded from its source on first read"""
+
+    __slots__ = ('source', 'index')
+
+    def __init__(self, source, index: int):
+        self.source = source
+        self.index = index
+
+    def load(self) -> str:
+        return self.source.text(self.index)
+
+
+class _FieldList(list):
+    """List returned for emails/phones/tags; in-place changes are written back to the record"""
+
+    __slots__ = ('_record', '_field')
+
+    def __init__(self, record: 'ContactRecord', field: str, values):
+        super().__init__(values)
+        self._record = record
+        self._field = field
+
+    def _sync(self):
+        self._record[self._field] = self
+
+    def __iadd__(self, values):
+        super().__iadd__(values)
+        self._sync()
+        return self
+
+
+def _write_through(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._sync()
+        return result
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse', '__setitem__', '__delitem__'):
+    setattr(_FieldList, _name, _write_through(_name))
+
+
+class ContactRecord(MutableMapping):
+    """Compact contact with the same keys and values as the contacts.json dicts
+
+    Known fields live in __slots__: a single email/phone/tag as a plain string
+    and several as a tuple, timestamps as epoch integers, company/position/
+    category as interned strings. Unknown keys go to a small extra dict, and
+    so does a known field whose value is not in its usual form (None, an email
+    string instead of a list, a numeric timestamp, ...), kept as it is.
+    Keys are listed in FIELD_ORDER; a contact whose keys came in another order
+    keeps that order in `order`, so saving writes back exactly what was loaded.
+    Reading a list field returns a list whose in-place changes (append,
+    remove, ...) are written back, so code written for plain dicts keeps working.
+    address/notes may hold a LazyText, decoded and kept on first read.
+    """
+
+    __slots__ = FIELD_ORDER + ('extra', 'order')
+
+    def __init__(self, data: Optional[Dict] = None):
+        if data:
+            self._fill(data)
+            return
+        self.emails = self.phones = self.tags = None
+        self.created_at = self.last_contact = self.updated_at = None
+        self.company = self.position = self.address = self.notes = self.category = None
+        self.extra = self.order = None
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'ContactRecord':
+        """Record from a contact dict as parsed from contacts.json; same result as ContactRecord(data)"""
+        record = cls.__new__(cls)
+        record._fill(data)
+        return record
+
+    def _fill(self, data: Dict):
+        # Written out field by field: this runs once per contact on every JSON load.
+        # Only values in the usual form go to the slots; `stored` counts them.
+        get = data.get
+        stored = 0
+        value = get('emails')
+        if value is None:
+            self.emails = None
+        elif value.__class__ is list or isinstance(value, (list, tuple)):
+            self.emails = value[0] if len(value) == 1 and value[0].__class__ is str else tuple(value)
+            stored += 1
+        else:
+            self.emails = None
+        value = get('phones')
+        if value is None:
+            self.phones = None
+        elif value.__class__ is list or isinstance(value, (list, tuple)):
+            self.phones = value[0] if len(value) == 1 and value[0].__class__ is str else tuple(value)
+            stored += 1
+        else:
+            self.phones = None
+        value = get('tags')
+        if value is None:
+            self.tags = None
+        elif value.__class__ is list or isinstance(value, (list, tuple)):
+            self.tags = value[0] if len(value) == 1 and value[0].__class__ is str else tuple(value)
+            stored += 1
+        else:
+            self.tags = None
+        value = get('created_at')
+        if value.__class__ is str:
+            self.created_at = _TIMESTAMPS.get(value) or encode_timestamp(value)
+            stored += 1
+        else:
+            self.created_at = None
+        value = get('last_contact')
+        if value.__class__ is str:
+            self.last_contact = _TIMESTAMPS.get(value) or encode_timestamp(value)
+            stored += 1
+        else:
+            self.last_contact = None
+        value = get('updated_at')
+        if value.__class__ is str:
+            self.updated_at = _TIMESTAMPS.get(value) or encode_timestamp(value)
+            stored += 1
+        else:
+            self.updated_at = None
+        value = get('company')
+        if value.__class__ is str:
+            self.company = _intern(value)
+            stored += 1
+        else:
+            self.company = None
+        value = get('position')
+        if value.__class__ is str:
+            self.position = _intern(value)
+            stored += 1
+        else:
+            self.position = None
+        value = get('category')
+        if value.__class__ is str:
+            self.category = _intern(value)
+            stored += 1
+        else:
+            self.category = None
+        value = get('address')
+        if value.__class__ is str:
+            self.address = value
+            stored += 1
+        else:
+            self.address = None
+        value = get('notes')
+        if value.__class__ is str:
+            self.notes = value
+            stored += 1
+        else:
+            self.notes = None
+        self.extra = self.order = None
+        keys = tuple(data)
+        if stored == len(keys):
+            try:
+                self.order = _KEY_ORDERS[keys]
+            except KeyError:
+                self.order = _key_order(keys)
+        else:
+            # Unknown keys, and known ones kept as they are
+            self.extra = {key: value for key, value in data.items()
+                          if key not in _FIELDS or _RAW_GETTERS[key](self) is None}
+            if keys != tuple(self):
+                self.order = _key_order(keys, False)
+
+    @classmethod
+    def from_dict(cls, data) -> 'ContactRecord':
+        return data if isinstance(data, cls) else cls(data)
+
+    def values_of(self, field: str) -> Tuple[str, ...]:
+        """emails/phones/tags as a tuple, without building a write-through list"""
+        value = _RAW_GETTERS[field](self)
+        if value is None:
+            return ()
+        return (value,) if isinstance(value, str) else value
+
+    def __getitem__(self, key: str):
+        getter = _VALUE_GETTERS.get(key)
+        value = None if getter is None else getter(self)
+        if value is None:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        if key in LIST_FIELDS:
+            return _FieldList(self, key, (value,) if isinstance(value, str) else value)
+        if key in TIMESTAMP_FIELDS:
+            return format_timestamp(value)
+        return value
+
+    def get(self, key: str, default=None):
+        getter = _VALUE_GETTERS.get(key)
+        if getter is None or key in LIST_FIELDS or key in TIMESTAMP_FIELDS:
+            try:
+                return self[key]
+            except KeyError:
+                return default
+        value = getter(self)
+        if value is None and self.extra is not None:
+            return self.extra.get(key, default)
+        return default if value is None else value
+
+    def setdefault(self, key: str, default=None):
+        # Return the stored (write-through) value rather than the default object itself
+        if key not in self:
+            self[key] = default
+        return self.get(key)
+
+    def __setitem__(self, key: str, value):
+        if self.order is not None and key not in self:
+            self.order += (key,)
+        setter = _SETTERS.get(key)
+        if setter is not None:
+            if setter(self, value):
+                if self.extra is not None and key in self.extra:
+                    self._drop_extra(key)
+                return
+            # Not in the slot's form: kept as it is, like an unknown key
+            _RAW_SETTERS[key](self, None)
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = value
+
+    def __delitem__(self, key: str):
+        getter = _RAW_GETTERS.get(key)
+        if getter is not None and getter(self) is not None:
+            _RAW_SETTERS[key](self, None)
+        elif self.extra is None or key not in self.extra:
+            raise KeyError(key)
+        else:
+            self._drop_extra(key)
+        if self.order is not None:
+            self.order = tuple(name for name in self.order if name != key)
+
+    def _drop_extra(self, key: str):
+        del self.extra[key]
+        if not self.extra:
+            self.extra = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self.order is not None:
+            yield from self.order
+            return
+        for field in FIELD_ORDER:
+            if _RAW_GETTERS[field](self) is not None:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for field in FIELD_ORDER if _RAW_GETTERS[field](self) is not None) + len(self.extra or ())
+
+    def __contains__(self, key) -> bool:
+        getter = _RAW_GETTERS.get(key)
+        if getter is not None and getter(self) is not None:
+            return True
+        return self.extra is not None and key in self.extra
+
+    def to_dict(self) -> Dict:
+        """Plain dict in the contacts.json layout, keys in the record's order"""
+        # Written out field by field: this runs once per contact on every save
+        data = {}
+        value = self.emails
+        if value is not None:
+            data['emails'] = [value] if value.__class__ is str else list(value)
+        value = self.phones
+        if value is not None:
+            data['phones'] = [value] if value.__class__ is str else list(value)
+        value = self.created_at
+        if value is not None:
+            data['created_at'] = format_timestamp(value)
+        value = self.last_contact
+        if value is not None:
+            data['last_contact'] = format_timestamp(value)
+        if self.company is not None:
+            data['company'] = self.company
+        if self.position is not None:
+            data['position'] = self.position
+        if self.address is not None:
+            data['address'] = _VALUE_GETTERS['address'](self)
+        if self.notes is not None:
+            data['notes'] = _VALUE_GETTERS['notes'](self)
+        if self.category is not None:
+            data['category'] = self.category
+        value = self.tags
+        if value is not None:
+            data['tags'] = [value] if value.__class__ is str else list(value)
+        value = self.updated_at
+        if value is not None:
+            data['updated_at'] = format_timestamp(value)
+        if self.extra:
+            data.update((key, as_dict(value)) for key, value in self.extra.items())
+        if self.order is not None:
+            data = {key: data[key] for key in self.order}
+        return data
+
+    def __repr__(self) -> str:
+        return f"ContactRecord({self.to_dict()!r})"
+
+
+_FIELD_POSITIONS = {field: position for position, field in enumerate(FIELD_ORDER)}
+# Key sequence of a loaded contact -> None if a record lists its keys that way, else the tuple to keep
+_KEY_ORDERS: Dict[tuple, Optional[tuple]] = {}
+
+
+def _key_order(keys: tuple, in_slots: bool = True) -> Optional[tuple]:
+    """The order to keep for a contact's keys; None when they follow FIELD_ORDER
+
+    in_slots says every key is a known field held in a slot, so only their
+    relative order matters. Otherwise the caller has found the order differs,
+    and the tuple is only shared with other contacts that have the same keys.
+    """
+    if len(_KEY_ORDERS) > 10000:
+        _KEY_ORDERS.clear()
+    if not in_slots:
+        return _KEY_ORDERS.setdefault(keys, keys) or keys
+    positions = [_FIELD_POSITIONS[key] for key in keys]
+    order = _KEY_ORDERS[keys] = None if positions == sorted(positions) else keys
+    return order
+
+
+def _slot_setter(field: str, accepts, convert=None):
+    """Setter storing a value in its slot and returning True, or returning False if it is not in the slot's form"""
+    raw = getattr(ContactRecord, field).__set__
+
+    def set_value(record, value) -> bool:
+        if not accepts(value):
+            return False
+        raw(record, value if convert is None else convert(value))
+        return True
+    return set_value
+
+
+def _pack_values(values) -> Union[str, tuple]:
+    """emails/phones/tags as stored: a lone string as itself, anything else as a tuple"""
+    values = tuple(values)
+    return values[0] if len(values) == 1 and isinstance(values[0], str) else values
+
+
+_RAW_GETTERS = {field: getattr(ContactRecord, field).__get__ for field in FIELD_ORDER}
+_RAW_SETTERS = {field: getattr(ContactRecord, field).__set__ for field in FIELD_ORDER}
+
+
+def _lazy_getter(field: str):
+    raw_get, raw_set = _RAW_GETTERS[field], _RAW_SETTERS[field]
+
+    def get(record):
+        value = raw_get(record)
+        if value.__class__ is LazyText:
+            value = value.load()
+            raw_set(record, value)
+        return value
+    return get
+
+
+# Like _RAW_GETTERS, but decoding lazy fields; presence checks use the raw slots
+_VALUE_GETTERS = {field: _lazy_getter(field) if field in LAZY_FIELDS else _RAW_GETTERS[field]
+                  for field in FIELD_ORDER}
+_SETTERS = {}
+for _field in FIELD_ORDER:
+    if _field in LIST_FIELDS:
+        _SETTERS[_field] = _slot_setter(_field, lambda value: isinstance(value, (list, tuple)), _pack_values)
+    elif _field in TIMESTAMP_FIELDS:
+        _SETTERS[_field] = _slot_setter(_field, lambda value: isinstance(value, str), encode_timestamp)
+    elif _field in INTERNED_FIELDS:
+        _SETTERS[_field] = _slot_setter(_field, lambda value: value.__class__ is str, _intern)
+    else:
+        _SETTERS[_field] = _slot_setter(_field, lambda value: isinstance(value, (str, LazyText)))
+
+
+def as_dict(contact) -> Dict:
+    """A contact as a plain dict, whether it is a ContactRecord or already a dict"""
+    return contact.to_dict() if isinstance(contact, ContactRecord) else contact
+
+
+class ContactStore(MutableMapping):
+    """name -> ContactRecord mapping behind ContactManager.contacts
+
+    Plain dicts assigned to it are converted to ContactRecord; keys, values and
+    items are the underlying dict views, so iteration costs the same as a dict.
+    A store opened with ContactStore.lazy holds row numbers instead and builds
+    each record on first access; values() and items() build the rest. Its
+    name lookup table is only built when a name is first looked up.
+    """
+
+    def __init__(self, contacts: Optional[Dict] = None):
+        self._by_name: Optional[Dict[str, Union[ContactRecord, int]]] = {}
+        self._names: Optional[List[str]] = None
+        self._load_record: Optional[Callable[[int], ContactRecord]] = None
+        if contacts:
+            for name, contact in contacts.items():
+                self._by_name[name] = ContactRecord.from_dict(contact)
+
+    @classmethod
+    def from_json(cls, contacts: Dict[str, Dict]) -> 'ContactStore':
+        """Store over freshly parsed contacts.json data, built in one pass
+
+        Takes over the dict: each contact is replaced by its record in place,
+        so the parsed dicts are freed as the records are built.
+        """
+        store = cls()
+        new, fill = ContactRecord.__new__, ContactRecord._fill
+        for name, contact in contacts.items():
+            contacts[name] = record = new(ContactRecord)
+            fill(record, contact)
+        store._by_name = contacts
+        return store
+
+    @classmethod
+    def lazy(cls, names: List[str], load_record: Callable[[int], ContactRecord]) -> 'ContactStore':
+        """Store whose i-th name is backed by load_record(i) until it is first read"""
+        store = cls()
+        if names:
+            store._by_name, store._names, store._load_record = None, names, load_record
+        return store
+
+    @property
+    def _records(self) -> Dict[str, Union[ContactRecord, int]]:
+        if self._by_name is None:
+            self._by_name = dict(zip(self._names, count()))
+            self._names = None
+        return self._by_name
+
+    def _materialize(self):
+        if self._load_record is not None:
+            load_record = self._load_record
+            for name, record in self._records.items():
+                if record.__class__ is int:
+                    self._records[name] = load_record(record)
+            self._load_record = None
+
+    def __getitem__(self, name: str) -> ContactRecord:
+        record = self._records[name]
+        if record.__class__ is int:
+            record = self._records[name] = self._load_record(record)
+        return record
+
+    def get(self, name: str, default=None):
+        return self[name] if name in self._records else default
+
+    def __setitem__(self, name: str, contact):
+        self._records[name] = ContactRecord.from_dict(contact)
+
+    def __delitem__(self, name: str):
+        del self._records[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names if self._by_name is None else self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._names if self._by_name is None else self._by_name)
+
+    def __contains__(self, name) -> bool:
+        return name in self._records
+
+    def keys(self):
+        return self._records.keys()
+
+    def values(self):
+        self._materialize()
+        return self._records.values()
+
+    def items(self):
+        self._materialize()
+        return self._records.items()
+
+    def to_dict(self) -> Dict[str, Dict]:
+        return {name: record.to_dict() for name, record in self.items()}
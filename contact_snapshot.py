@@ -0,0 +1,301 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from contact_record import ContactRecord, ContactStore, LazyText
+
+SNAPSHOT_MAGIC = b'CSNP'
+SNAPSHOT_VERSION = 3
+# magic, version, contacts, shared strings, texts; size, mtime (ns) and SHA-256 of the JSON file it was made from
+_HEADER = struct.Struct('<4sHIIIQq32s')
+_SECTION = struct.Struct('<Q')
+_SECTION_COUNT = 6
+# created_at, last_contact, updated_at; string ids of company, position and category; text ids of
+# address, notes, overflow and key order; list presence flags; email, phone and tag counts. The tag
+# string ids follow, then the emails and phones as NUL-separated UTF-8.
+_RECORD_HEAD = struct.Struct('<3q11I')
+_NO_TIME = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+_EMAILS, _PHONES, _TAGS = 1, 2, 4
+_ID_STRUCTS: Dict[int, struct.Struct] = {}
+
+
+def _ids_struct(count: int) -> struct.Struct:
+    packer = _ID_STRUCTS.get(count)
+    if packer is None:
+        packer = _ID_STRUCTS[count] = struct.Struct(f'<{count}I')
+    return packer
+
+
+def _array_bytes(typecode: str, values) -> bytes:
+    data = array(typecode, values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _array_from(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def json_fingerprint(path: str) -> Tuple[int, int, bytes]:
+    """(size, mtime in ns, SHA-256) of a contacts JSON file, as recorded in a snapshot made from it"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        stat = os.fstat(file.fileno())
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return stat.st_size, stat.st_mtime_ns, digest.digest()
+
+
+def _plain_strings(values) -> bool:
+    return all(value.__class__ is str and '\0' not in value for value in values)
+
+
+class _SnapshotWriter:
+    def __init__(self):
+        self.strings: Dict[str, int] = {}
+        self.texts: List[bytes] = []
+        self.orders: Dict[tuple, int] = {}
+
+    def string_id(self, value) -> int:
+        """Id in the shared string table (0 is None); -1 for values that cannot be stored there"""
+        if value is None:
+            return 0
+        if value.__class__ is not str or '\0' in value:
+            return -1
+        string_id = self.strings.get(value)
+        if string_id is None:
+            string_id = self.strings[value] = len(self.strings) + 1
+        return string_id
+
+    def text_id(self, value: str) -> int:
+        self.texts.append(value.encode('utf-8'))
+        return len(self.texts)
+
+    def order_id(self, order: Optional[tuple]) -> int:
+        """Text id of a record's key order (0 for the usual order), shared by records with the same keys"""
+        if order is None:
+            return 0
+        order_id = self.orders.get(order)
+        if order_id is None:
+            order_id = self.orders[order] = self.text_id(json.dumps(order, ensure_ascii=False))
+        return order_id
+
+    def record(self, contact: ContactRecord) -> bytes:
+        # Anything the layout cannot hold goes to a JSON overflow text, restored through the record's setters.
+        # That includes values the record keeps as they are in extra (None, a bare-string email, ...).
+        overflow = dict(contact.extra) if contact.extra else {}
+        times = []
+        for field in ('created_at', 'last_contact', 'updated_at'):
+            value = getattr(contact, field)
+            if value is None:
+                times.append(_NO_TIME)
+            elif value.__class__ is int and -_INT64_MAX <= value <= _INT64_MAX:
+                times.append(value)
+            else:
+                times.append(_NO_TIME)
+                overflow[field] = contact[field]
+        strings = []
+        for field in ('company', 'position', 'category'):
+            string_id = self.string_id(getattr(contact, field))
+            if string_id < 0:
+                string_id = 0
+                overflow[field] = contact[field]
+            strings.append(string_id)
+        texts = []
+        for field in ('address', 'notes'):
+            # The slot holds a str or LazyText; reading it through the record decodes the latter
+            texts.append(self.text_id(contact[field]) if getattr(contact, field) is not None else 0)
+        flags, lists = 0, []
+        for field, flag in (('emails', _EMAILS), ('phones', _PHONES), ('tags', _TAGS)):
+            values = contact.values_of(field) if getattr(contact, field) is not None else None
+            if values is not None and not _plain_strings(values):
+                overflow[field] = contact[field]
+                values = None
+            if values is not None:
+                flags |= flag
+            lists.append(values or ())
+        emails, phones, tags = lists
+        overflow_id = self.text_id(json.dumps(overflow, ensure_ascii=False)) if overflow else 0
+        return (_RECORD_HEAD.pack(*times, *strings, *texts, overflow_id, self.order_id(contact.order), flags,
+                                  len(emails), len(phones), len(tags))
+                + _ids_struct(len(tags)).pack(*map(self.string_id, tags))
+                + '\0'.join(emails + phones).encode('utf-8'))
+
+
+def write_snapshot(path: str, contacts: Iterable[Tuple[str, Dict]], source: Tuple[int, int, bytes]) -> int:
+    """Write (name, contact) pairs as a binary snapshot; returns the number of contacts
+
+    source is the json_fingerprint of the contacts file the pairs match. The
+    file is written next to path and then renamed over it, so a reader never
+    sees half a snapshot. Names containing NUL cannot be stored (ValueError);
+    any other value that does not fit the compact layout is kept as JSON in
+    the record's overflow text, and a key order other than FIELD_ORDER as a
+    JSON text shared by the records with that order. Reading the snapshot
+    gives back records equal to the ones written, keys in the same order.
+    """
+    writer = _SnapshotWriter()
+    names, offsets, records = [], [0], []
+    position = 0
+    for name, contact in contacts:
+        if not _plain_strings((name,)):
+            raise ValueError(f"contact name {name!r} cannot be stored in a snapshot")
+        names.append(name)
+        record = writer.record(ContactRecord.from_dict(contact))
+        records.append(record)
+        position += len(record)
+        offsets.append(position)
+    text_offsets, position = [0], 0
+    for text in writer.texts:
+        position += len(text)
+        text_offsets.append(position)
+    sections = ('\0'.join(names).encode('utf-8'), '\0'.join(writer.strings).encode('utf-8'),
+                _array_bytes('Q', offsets), b''.join(records), _array_bytes('Q', text_offsets),
+                b''.join(writer.texts))
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(names), len(writer.strings), len(writer.texts),
+                                *source))
+        for section in sections:
+            file.write(_SECTION.pack(len(section)))
+            file.write(section)
+    os.replace(temp_path, path)
+    return len(names)
+
+
+def _unpack_header(data: bytes) -> tuple:
+    if len(data) < 6 or data[:4] != SNAPSHOT_MAGIC:
+        raise ValueError("not a contacts snapshot")
+    version, = struct.unpack_from('<H', data, 4)
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    if len(data) < _HEADER.size:
+        raise ValueError("truncated snapshot")
+    return _HEADER.unpack_from(data)[2:]
+
+
+def snapshot_source(path: str) -> Optional[Tuple[int, int, bytes]]:
+    """The json_fingerprint recorded in a snapshot, or None if it is missing or unreadable"""
+    try:
+        with open(path, 'rb') as file:
+            return tuple(_unpack_header(file.read(_HEADER.size))[3:])
+    except (OSError, ValueError):
+        return None
+
+
+class SnapshotReader:
+    """Decodes records and texts from a snapshot held in memory
+
+    Opening a snapshot decodes only the names, the shared strings (companies,
+    categories, tags) and the offset tables. A record is unpacked when its
+    contact is first read, and an address or note when it is first used.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            data = file.read()
+        self._orders: Dict[int, tuple] = {}
+        contacts, strings, texts = _unpack_header(data)[:3]
+        sections, position = [], _HEADER.size
+        for _ in range(_SECTION_COUNT):
+            if position + _SECTION.size > len(data):
+                raise ValueError("truncated snapshot")
+            size, = _SECTION.unpack_from(data, position)
+            position += _SECTION.size
+            if position + size > len(data):
+                raise ValueError("truncated snapshot")
+            sections.append((position, position + size))
+            position += size
+        (names_start, names_end), (strings_start, strings_end) = sections[:2]
+        self._data = data
+        self.names: List[str] = data[names_start:names_end].decode('utf-8').split('\0') if contacts else []
+        self.strings: List[str] = [None]
+        if strings:
+            self.strings += data[strings_start:strings_end].decode('utf-8').split('\0')
+        self._record_offsets = _array_from('Q', data[sections[2][0]:sections[2][1]])
+        self._records_start = sections[3][0]
+        self._text_offsets = _array_from('Q', data[sections[4][0]:sections[4][1]])
+        self._texts_start = sections[5][0]
+        if (len(self.names) != contacts or len(self.strings) != strings + 1
+                or len(self._record_offsets) != contacts + 1 or len(self._text_offsets) != texts + 1):
+            raise ValueError("corrupt snapshot")
+
+    def text(self, index: int) -> str:
+        start = self._texts_start + self._text_offsets[index - 1]
+        return self._data[start:self._texts_start + self._text_offsets[index]].decode('utf-8')
+
+    def record(self, row: int) -> ContactRecord:
+        data, strings = self._data, self.strings
+        start = self._records_start + self._record_offsets[row]
+        end = self._records_start + self._record_offsets[row + 1]
+        (created_at, last_contact, updated_at, company, position, category, address, notes, overflow,
+         order, flags, email_count, phone_count, tag_count) = _RECORD_HEAD.unpack_from(data, start)
+        start += _RECORD_HEAD.size
+        record = ContactRecord()
+        if flags & _TAGS:
+            tags = _ids_struct(tag_count).unpack_from(data, start)
+            record.tags = strings[tags[0]] if tag_count == 1 else tuple(map(strings.__getitem__, tags))
+            start += 4 * tag_count
+        if email_count or phone_count:
+            values = data[start:end].decode('utf-8').split('\0')
+            emails, phones = values[:email_count], values[email_count:]
+        else:
+            emails = phones = ()
+        # A single email or phone is kept as a plain string, like ContactRecord does
+        if flags & _EMAILS:
+            record.emails = emails[0] if email_count == 1 else tuple(emails)
+        if flags & _PHONES:
+            record.phones = phones[0] if phone_count == 1 else tuple(phones)
+        if created_at != _NO_TIME:
+            record.created_at = created_at
+        if last_contact != _NO_TIME:
+            record.last_contact = last_contact
+        if updated_at != _NO_TIME:
+            record.updated_at = updated_at
+        record.company, record.position, record.category = strings[company], strings[position], strings[category]
+        if address:
+            record.address = LazyText(self, address)
+        if notes:
+            record.notes = LazyText(self, notes)
+        if overflow:
+            for key, value in json.loads(self.text(overflow)).items():
+                record[key] = value
+        if order:
+            keys = self._orders.get(order)
+            if keys is None:
+                keys = self._orders[order] = tuple(json.loads(self.text(order)))
+            record.order = keys
+        return record
+
+
+def read_snapshot(path: str) -> ContactStore:
+    """Open a snapshot as a lazily loaded ContactStore"""
+    reader = SnapshotReader(path)
+    return ContactStore.lazy(reader.names, reader.record)
+
+
+def snapshot_is_current(snapshot_path: str, contacts_path: str) -> bool:
+    """True if the snapshot was made from the JSON file as it is now
+
+    Both files must exist. The JSON file's size and mtime are compared with the
+    ones recorded in the snapshot first, then its SHA-256, so a copy or an edit
+    that keeps the size and timestamp is still caught.
+    """
+    if not snapshot_path or not os.path.exists(contacts_path):
+        return False
+    source = snapshot_source(snapshot_path)
+    if source is None:
+        return False
+    stat = os.stat(contacts_path)
+    if (stat.st_size, stat.st_mtime_ns) != source[:2]:
+        return False
+    return json_fingerprint(contacts_path) == source
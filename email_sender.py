@@ -8,27 +8,49 @@ from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
 from email.mime.application import MIMEApplication
 from email import encoders
-from groq import Groq
 from contact_manager import ContactManager
+from ai_request_policy import RequestPolicy
+from generation_providers import GenerationRequest, create_provider
+from template_engine import TemplateEngine, build_fallback_templates, FALLBACK_BODY, DEFAULT_GREETING
+from attachments import FileAttachment, LinkAttachment, readable_attachments, split_attachments
+from mime_stream import StreamingMessage, BytesMessage
+from smtp_pipelining import PipeliningSMTP
+from metrics import configure_metrics, metrics
+from recipient_filters import RecipientDeduper
+from suppression_list import SuppressionList, SUPPRESSION_REASONS
+from sent_log import SentLog, content_hash, idempotency_key, message_id
 import re
+import time
 from datetime import datetime
+from typing import Callable
+from email.utils import formataddr
 
 class EmailSender:
     def __init__(self, config_file='email_config.cfg'):
         self.config = configparser.ConfigParser()
         self.config.read(config_file)
         
-        # Initialize contact manager
-        self.contact_manager = ContactManager()
+        # Pipeline metrics (no-op unless [metrics] enabled = yes)
+        configure_metrics(self.config)
         
-        # Initialize Groq client
-        self.groq_api_key = self.config.get('ai_settings', 'groq_api_key')
+        # Initialize contact manager (with the binary snapshot when [contact_settings] snapshot_file is set)
+        self.contact_manager = ContactManager(
+            snapshot_file=self.config.get('contact_settings', 'snapshot_file', fallback='').strip())
+        
+        # Initialize AI generation provider (Groq, local OpenAI-compatible server or templates)
+        self.groq_api_key = self.config.get('ai_settings', 'groq_api_key', fallback='')
         self.model = self.config.get('ai_settings', 'model', fallback='llama-3.1-8b-instant')
-        try:
-            self.client = Groq(api_key=self.groq_api_key)
-        except Exception as e:
-            print(f"⚠️  Failed to initialize Groq client: {e}")
-            self.client = None
+        self.request_policy = RequestPolicy.from_config(self.config)
+        self.provider = create_provider(self.config, self.request_policy, self._create_fallback_email,
+                                        self.render_fallback_batch)
+        
+        # Compiled fallback templates, cached per (tone, account)
+        self.template_engine = TemplateEngine(build_fallback_templates(),
+                                              FALLBACK_BODY.replace('{greeting}', DEFAULT_GREETING))
+        metrics.register_collector('template_cache', lambda: {
+            'template_cache_hits': self.template_engine.hits,
+            'template_cache_misses': self.template_engine.misses
+        })
         
         # Load personal info
         self.personal_info = {
@@ -62,9 +84,22 @@ class EmailSender:
         # Load attachment settings
         self.attachment_settings = {
             'max_attachment_size': self.config.getint('attachment_settings', 'max_attachment_size', fallback=25),
-            'allowed_extensions': [ext.strip() for ext in self.config.get('attachment_settings', 'allowed_extensions', fallback='pdf,doc,docx,txt,jpg,jpeg,png,gif,zip,rar').split(',')]
+            'allowed_extensions': [ext.strip() for ext in self.config.get('attachment_settings', 'allowed_extensions', fallback='pdf,doc,docx,txt,jpg,jpeg,png,gif,zip,rar').split(',')],
+            'stream_threshold': self.config.getint('attachment_settings', 'stream_threshold', fallback=5)
+        }
+        
+        # Load sending settings
+        self.sending_settings = {
+            'recipient_mode': self.config.get('sending_settings', 'recipient_mode', fallback='individual').strip().lower(),
+            'smtp_timeout': self.config.getfloat('sending_settings', 'smtp_timeout', fallback=30.0)
         }
         
+        # Unsubscribed and bounced addresses (None when suppression_file is blank)
+        self.suppression = SuppressionList.from_config(self.config)
+        
+        # Delivered messages by idempotency key (None when sent_log_file is blank)
+        self.sent_log = SentLog.from_config(self.config)
+        
         # Available Groq models
         self.available_models = [
             "llama-3.1-8b-instant",
@@ -73,6 +108,10 @@ class EmailSender:
             "gemma2-9b-it"
         ]
     
+    def close(self):
+        """Release background resources (AI request hedging threads)"""
+        self.request_policy.close()
+    
     def _load_email_accounts(self):
         """Load all configured email accounts"""
         accounts = {}
@@ -90,7 +129,9 @@ class EmailSender:
                             'smtp_port': self.config.getint(account_section, 'smtp_port'),
                             'smtp_username': self.config.get(account_section, 'smtp_username'),
                             'smtp_password': self.config.get(account_section, 'smtp_password'),
-                            'display_name': self.config.get(account_section, 'display_name', fallback='')
+                            'display_name': self.config.get(account_section, 'display_name', fallback=''),
+                            'max_recipients': self.config.getint(account_section, 'max_recipients', fallback=50),
+                            'daily_quota': self.config.getint(account_section, 'daily_quota', fallback=500)
                         }
         
         # If no accounts found, create a default one
@@ -101,7 +142,9 @@ class EmailSender:
                 'smtp_port': 587,
                 'smtp_username': 'default@example.com',
                 'smtp_password': 'password',
-                'display_name': 'Default Account'
+                'display_name': 'Default Account',
+                'max_recipients': 50,
+                'daily_quota': 500
             }
         
         return accounts
@@ -257,6 +300,7 @@ class EmailSender:
         
         # Reload accounts
         self.email_accounts = self._load_email_accounts()
+        self.template_engine.clear()
         print(f"✅ Email account '{display_name}' added successfully!")
     
     def _edit_email_account(self):
@@ -310,6 +354,7 @@ class EmailSender:
                 
                 # Reload accounts
                 self.email_accounts = self._load_email_accounts()
+                self.template_engine.clear()
                 print(f"✅ Email account updated successfully!")
             else:
                 print("❌ Invalid selection")
@@ -357,6 +402,7 @@ class EmailSender:
                     
                     # Reload accounts
                     self.email_accounts = self._load_email_accounts()
+                    self.template_engine.clear()
                     print(f"✅ Email account deleted successfully!")
             else:
                 print("❌ Invalid selection")
@@ -520,9 +566,10 @@ class EmailSender:
         print("-" * 25)
         
         while True:
-            print(f"\nCurrent attachments: {len(attachments)} file(s)")
+            print(f"\nCurrent attachments: {len(attachments)} item(s)")
             for i, attachment in enumerate(attachments, 1):
-                print(f"  {i}. {os.path.basename(attachment)}")
+                icon = "🔗" if attachment.is_link else "📄"
+                print(f"  {i}. {icon} {attachment.name}")
             
             print("\nOptions:")
             print("1. ➕ Add attachment")
@@ -536,7 +583,7 @@ class EmailSender:
                 file_path = input("Enter file path to attach: ").strip()
                 if file_path:
                     if self.validate_attachment(file_path):
-                        attachments.append(file_path)
+                        attachments.append(FileAttachment(file_path))
                         print(f"✅ Added attachment: {os.path.basename(file_path)}")
                     else:
                         print("❌ Invalid file or file too large")
@@ -548,7 +595,7 @@ class EmailSender:
                     index = int(input("Enter attachment number to remove: ").strip()) - 1
                     if 0 <= index < len(attachments):
                         removed = attachments.pop(index)
-                        print(f"✅ Removed attachment: {os.path.basename(removed)}")
+                        print(f"✅ Removed attachment: {removed.name}")
                     else:
                         print("❌ Invalid attachment number")
                 except ValueError:
@@ -559,19 +606,9 @@ class EmailSender:
                 link_text = input("Enter link text (optional): ").strip()
                 
                 if link_url:
-                    if not link_url.startswith(('http://', 'https://')):
-                        link_url = 'https://' + link_url
-                    
-                    link_markdown = f"[{link_text or link_url}]({link_url})"
-                    # Create a temporary file for the link
-                    link_file = f"link_{len(attachments)}.txt"
-                    try:
-                        with open(link_file, 'w') as f:
-                            f.write(f"Clickable Link: {link_text or link_url}\nURL: {link_url}")
-                        attachments.append(link_file)
-                        print(f"✅ Added clickable link: {link_text or link_url}")
-                    except Exception as e:
-                        print(f"❌ Failed to create link file: {e}")
+                    link = LinkAttachment.from_input(link_url, link_text)
+                    attachments.append(link)
+                    print(f"✅ Added clickable link: {link.name}")
                 else:
                     print("❌ URL is required")
             
@@ -612,12 +649,43 @@ class EmailSender:
         
         return True
     
-    def generate_email_content(self, recipient_name: str, message_request: str, tone_option: str, attachments: list = None) -> str:
-        """Generate email content using Groq AI with AI footer and attachment awareness"""
+    def generate_email_content(self, recipient_name: str, message_request: str, tone_option: str, attachments: list = None,
+                               recipient_details: dict = None) -> str:
+        """Generate email content using the configured AI provider with AI footer and attachment awareness
+        
+        recipient_details (e.g. company, position from the contact) personalize the prompt.
+        """
+        
+        # If the AI provider is not available, use fallback immediately
+        if not self.provider.is_available():
+            metrics.incr('generation_fallbacks')
+            return self._create_fallback_email(recipient_name, message_request, tone_option, attachments)
+        
+        request = self.build_generation_request(recipient_name, message_request, tone_option, attachments,
+                                                recipient_details)
         
-        # If Groq client is not available, use fallback immediately
-        if not self.client:
+        # Local template rendering is counted by the template cache gauges instead
+        if not self.provider.capabilities.network:
+            return self.provider.generate(request)
+        
+        try:
+            metrics.incr('generation_requests')
+            with metrics.timer('generation'):
+                return self.provider.generate(request)
+            
+        except Exception as e:
+            print(f"⚠️  AI generation failed: {str(e)}")
+            metrics.incr('generation_errors')
+            metrics.incr('generation_fallbacks')
             return self._create_fallback_email(recipient_name, message_request, tone_option, attachments)
+    
+    def build_generation_request(self, recipient_name: str, message_request: str, tone_option: str, attachments: list = None,
+                                 recipient_details: dict = None) -> GenerationRequest:
+        """Build the provider request (prompt messages) for one email"""
+        # Local template providers render directly without a prompt
+        if not self.provider.capabilities.uses_prompt:
+            return GenerationRequest(recipient_name, message_request, tone_option, attachments,
+                                     recipient_details=recipient_details)
         
         tone_prompts = {
             "Formal (Full)": """Write a very formal and professional email. Use complete formal structure with detailed footer.
@@ -642,32 +710,25 @@ class EmailSender:
         # Add attachment context to prompt
         attachment_context = ""
         if attachments:
-            attachment_names = [os.path.basename(att) for att in attachments if not att.startswith('link_')]
-            link_files = [att for att in attachments if att.startswith('link_')]
+            file_attachments, link_attachments = split_attachments(attachments)
             
-            if attachment_names:
-                attachment_context = f"\nATTACHMENTS INCLUDED: {', '.join(attachment_names)}"
+            if file_attachments:
+                attachment_context = f"\nATTACHMENTS INCLUDED: {', '.join(att.name for att in file_attachments)}"
             
-            if link_files:
-                links_info = []
-                for link_file in link_files:
-                    try:
-                        with open(link_file, 'r') as f:
-                            link_content = f.read()
-                            # Extract URL from link file content
-                            if 'URL: ' in link_content:
-                                url = link_content.split('URL: ')[1].strip()
-                                link_text = link_content.split('\n')[0].replace('Clickable Link: ', '')
-                                links_info.append(f"{link_text} ({url})")
-                    except:
-                        pass
-                
-                if links_info:
-                    attachment_context += f"\nLINKS INCLUDED: {', '.join(links_info)}"
+            if link_attachments:
+                links_info = [f"{link.name} ({link.url})" for link in link_attachments]
+                attachment_context += f"\nLINKS INCLUDED: {', '.join(links_info)}"
+        
+        # Recipient details from the contact store, used to personalize the email
+        recipient_context = ""
+        if recipient_details:
+            details = [f"{key.replace('_', ' ').title()}: {value}" for key, value in recipient_details.items() if value]
+            if details:
+                recipient_context = f"\nRECIPIENT DETAILS: {', '.join(details)}"
         
         prompt = f"""
         TASK: Write a complete email to {recipient_name}.
-        
+        {recipient_context}
         CORE MESSAGE: {message_request}
         {attachment_context}
         
@@ -696,30 +757,22 @@ class EmailSender:
         [Email Body Here]
         """
         
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert email writer. Create professional, well-structured emails that match the requested tone and include the provided signature and AI footer. Naturally mention any attachments or links in the email body."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=1024,
-                top_p=1,
-                stream=False,
-            )
-            
-            return chat_completion.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"⚠️  AI generation failed: {str(e)}")
-            return self._create_fallback_email(recipient_name, message_request, tone_option, attachments)
+        return GenerationRequest(
+            recipient_name, message_request, tone_option, attachments,
+            recipient_details=recipient_details,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert email writer. Create professional, well-structured emails that match the requested tone and include the provided signature and AI footer. Naturally mention any attachments or links in the email body."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=0.7,
+            max_tokens=1024
+        )
     
     def _generate_ai_footer(self) -> str:
         """Generate the AI assistant footer"""
@@ -793,51 +846,48 @@ class EmailSender:
     
     def _create_fallback_email(self, recipient_name: str, message_request: str, tone_option: str, attachments: list = None) -> str:
         """Create fallback email template with AI footer and attachment mention"""
-        subject = f"Update: {message_request[:50]}..." if len(message_request) > 50 else message_request
-        
-        greetings = {
-            "Formal (Full)": f"Dear {recipient_name},",
-            "Formal": f"Dear {recipient_name},",
-            "Formal + Casual": f"Hello {recipient_name},",
-            "Casual": f"Hi {recipient_name},",
-            "Casual + Friendly": f"Hey {recipient_name}!"
-        }
-        
-        # Add attachment mention
+        template = self._get_fallback_template(tone_option)
+        return template.render({
+            'subject': self._fallback_subject(message_request),
+            'recipient_name': recipient_name,
+            'message_request': message_request,
+            'attachment_mention': self._attachment_mention(attachments)
+        })
+    
+    def render_fallback_batch(self, tone_option: str, recipient_names: list, message_requests: list, attachments: list = None) -> list:
+        """Render many fallback emails at once from column-oriented recipient fields"""
+        template = self._get_fallback_template(tone_option)
+        return template.render_columns({
+            'subject': [self._fallback_subject(message) for message in message_requests],
+            'recipient_name': recipient_names,
+            'message_request': message_requests,
+            'attachment_mention': self._attachment_mention(attachments)
+        }, len(recipient_names))
+    
+    def _get_fallback_template(self, tone_option: str):
+        """Get the compiled fallback template for the tone and current account"""
+        return self.template_engine.get(tone_option, self.current_account, lambda: {
+            'signature': self._generate_signature(tone_option),
+            'ai_footer': self._generate_ai_footer()
+        })
+    
+    def _fallback_subject(self, message_request: str) -> str:
+        """Build the fallback subject line from the message request"""
+        return f"Update: {message_request[:50]}..." if len(message_request) > 50 else message_request
+    
+    def _attachment_mention(self, attachments: list = None) -> str:
+        """Describe attachments and links for the fallback email body"""
         attachment_mention = ""
         if attachments:
-            file_attachments = [os.path.basename(att) for att in attachments if not att.startswith('link_')]
-            link_attachments = []
-            
-            for att in attachments:
-                if att.startswith('link_'):
-                    try:
-                        with open(att, 'r') as f:
-                            link_content = f.read()
-                            link_text = link_content.split('\n')[0].replace('Clickable Link: ', '')
-                            link_attachments.append(link_text)
-                    except:
-                        pass
+            file_attachments, link_attachments = split_attachments(attachments)
             
             if file_attachments:
-                attachment_mention = f"\n\nI've attached {', '.join(file_attachments)} for your reference."
+                attachment_mention = f"\n\nI've attached {', '.join(att.name for att in file_attachments)} for your reference."
             
             if link_attachments:
-                attachment_mention += f"\n\nHere are some useful links: {', '.join(link_attachments)}"
+                attachment_mention += f"\n\nHere are some useful links: {', '.join(link.name for link in link_attachments)}"
         
-        body = f"""
-{greetings.get(tone_option, f"Dear {recipient_name},")}
-
-I hope this message finds you well.
-
-{message_request}{attachment_mention}
-
-Please let me know if you have any questions or need additional information.
-
-{self._generate_signature(tone_option)}
-{self._generate_ai_footer()}
-"""
-        return f"Subject: {subject}\n\n{body}"
+        return attachment_mention
     
     def parse_generated_content(self, content: str) -> tuple:
         """Parse AI-generated content into subject and body"""
@@ -951,10 +1001,7 @@ Please let me know if you have any questions or need additional information.
                 link_text = input("Enter link text (optional): ").strip()
                 
                 if link_url:
-                    if not link_url.startswith(('http://', 'https://')):
-                        link_url = 'https://' + link_url
-                    
-                    link_markdown = f"[{link_text or link_url}]({link_url})"
+                    link_markdown = LinkAttachment.from_input(link_url, link_text).markdown
                     
                     print("\nWhere would you like to insert the link?")
                     print("1. At cursor position (will be marked with {{LINK}})")
@@ -979,94 +1026,312 @@ Please let me know if you have any questions or need additional information.
         
         return subject, body
     
-    def send_email(self, recipient_emails: list, subject: str, body: str, attachments: list = None) -> bool:
-        """Send email to multiple recipients with attachments using current account"""
-        success_count = 0
-        total_emails = len(recipient_emails)
+    def dedup_recipients(self, recipient_emails: list) -> list:
+        """Drop repeated addresses (case, whitespace, IDN and optional +tag variants)"""
+        if len(recipient_emails) < 2:
+            return [email.strip() for email in recipient_emails]
+        deduper = RecipientDeduper.from_config(self.config, expected=len(recipient_emails))
+        unique = deduper.filter_emails(recipient_emails)
+        if deduper.report.duplicates:
+            print(f"🧹 Removed {deduper.report.duplicates} duplicate recipient(s): {', '.join(deduper.report.samples)}")
+            metrics.incr('recipients_deduplicated', deduper.report.duplicates)
+        return unique
+    
+    def filter_suppressed(self, recipient_emails: list) -> list:
+        """Drop unsubscribed, bounced and otherwise suppressed addresses"""
+        if self.suppression is None:
+            return recipient_emails
+        allowed, suppressed = self.suppression.partition(recipient_emails)
+        if suppressed:
+            print(f"🚫 Skipping {len(suppressed)} suppressed recipient(s): {', '.join(suppressed[:20])}")
+            metrics.incr('recipients_suppressed', len(suppressed))
+        return allowed
+    
+    def already_sent(self, recipient_email: str, message_hash: str, campaign_id: str, account_names: list = None) -> bool:
+        """Check the sent log for a recipient before generating content for it
+        
+        account_names lists every account that may have sent it (default: the current one).
+        """
+        if self.sent_log is None or not campaign_id:
+            return False
+        accounts = [self.email_accounts[name] for name in account_names or [self.current_account]
+                    if name in self.email_accounts]
+        return self.sent_log.any_sent(idempotency_key(account['email'], recipient_email, message_hash, campaign_id)
+                                      for account in accounts)
+    
+    def claim_sends(self, account_info: dict, recipient_emails: list, message_hash: str, campaign_id: str,
+                    on_already_sent: Callable[[str], None] = None) -> tuple:
+        """Claim idempotency keys for a send; returns (recipients still to send, {recipient: key})
+
+        on_already_sent(recipient) is called for each recipient whose key was
+        already sent or is being sent by another worker.
+        """
+        keys = {recipient_email: idempotency_key(account_info['email'], recipient_email, message_hash, campaign_id)
+                for recipient_email in recipient_emails}
+        pending = []
+        for recipient_email in recipient_emails:
+            if self.sent_log.claim(keys[recipient_email]):
+                pending.append(recipient_email)
+            elif on_already_sent:
+                on_already_sent(recipient_email)
+        skipped = len(recipient_emails) - len(pending)
+        if skipped:
+            print(f"⏭️  Already sent to {skipped} recipient(s) in campaign '{campaign_id}'")
+            metrics.incr('sends_already_delivered', skipped)
+        return pending, {recipient_email: keys[recipient_email] for recipient_email in pending}
+    
+    def send_email(self, recipient_emails: list, subject: str, body: str, attachments: list = None, recipient_mode: str = None,
+                   account_name: str = None, campaign_id: str = None, message_hash: str = None,
+                   on_already_sent: Callable[[str], None] = None) -> bool:
+        """Send email to multiple recipients with attachments using current account
+        
+        recipient_mode is 'individual' (one message per address), 'shared' (one
+        message, all addresses in To) or 'bcc' (one message, addresses hidden).
+        account_name overrides the current account for this send.
+        
+        With a campaign_id every delivery is recorded in the sent log under an
+        idempotency key of (account, recipient, message_hash, campaign_id) and
+        recipients already recorded are not sent to again. message_hash defaults
+        to a hash of the subject, body and attachments; batches pass a hash of
+        the message request so regenerated content keeps the same key.
+        on_already_sent(recipient) is called for each recipient skipped that way.
+        """
+        recipient_emails = self.filter_suppressed(self.dedup_recipients(recipient_emails))
+        if not recipient_emails:
+            print("❌ No recipients left to send to")
+            return False
         
         # Get current account info
-        account_info = self.get_current_account_info()
+        account_info = self.email_accounts.get(account_name) if account_name else self.get_current_account_info()
         if not account_info:
             print("❌ No email account configured")
             return False
         
+        recipient_mode = recipient_mode or self.sending_settings['recipient_mode']
+        
+        # Links are mentioned in the body; only files become MIME parts.
+        # Unreadable files are dropped now, before any SMTP transaction starts.
+        file_attachments, _ = split_attachments(attachments)
+        file_attachments = readable_attachments(file_attachments)
+        
+        keys = {}
+        if self.sent_log is not None and campaign_id:
+            message_hash = message_hash or content_hash(subject, body, *(a.path for a in file_attachments))
+            recipient_emails, keys = self.claim_sends(account_info, recipient_emails, message_hash, campaign_id,
+                                                      on_already_sent)
+            if not recipient_emails:
+                return True
+        
+        def finish(recipient_email, sent, sent_message_id=None):
+            if recipient_email in keys:
+                if sent:
+                    self.sent_log.record(keys[recipient_email], recipient_email, campaign_id, sent_message_id)
+                else:
+                    self.sent_log.release(keys[recipient_email])
+        
+        success_count = 0
+        total_emails = len(recipient_emails)
+        
         print(f"\n📤 Sending email from: {account_info['display_name']}")
         print(f"📧 To: {total_emails} recipient(s)...")
-        if attachments:
-            print(f"📎 With {len(attachments)} attachment(s)")
+        if file_attachments:
+            print(f"📎 With {len(file_attachments)} attachment(s)")
         
-        for i, recipient_email in enumerate(recipient_emails, 1):
-            try:
-                # Create message container
-                msg = MIMEMultipart()
-                
-                # Set From field with display name
-                from_name = account_info['display_name'] or self.personal_info['name']
-                msg['From'] = f'{from_name} <{account_info["email"]}>'
-                msg['To'] = recipient_email
-                msg['Subject'] = subject
-                
-                # Attach body text
-                msg.attach(MIMEText(body, 'plain'))
-                
-                # Attach files
-                if attachments:
-                    for file_path in attachments:
-                        if file_path.startswith('link_'):
-                            # Skip link files (they're not real attachments)
-                            continue
-                        try:
-                            with open(file_path, 'rb') as file:
-                                # Guess the MIME type
-                                mime_type, encoding = mimetypes.guess_type(file_path)
-                                if mime_type is None or encoding is not None:
-                                    mime_type = 'application/octet-stream'
-                                
-                                main_type, sub_type = mime_type.split('/', 1)
-                                
-                                if main_type == 'text':
-                                    attachment = MIMEText(file.read().decode('utf-8'), _subtype=sub_type)
-                                elif main_type == 'image':
-                                    attachment = MIMEImage(file.read(), _subtype=sub_type)
-                                elif main_type == 'application':
-                                    attachment = MIMEApplication(file.read(), _subtype=sub_type)
-                                else:
-                                    attachment = MIMEBase(main_type, sub_type)
-                                    attachment.set_payload(file.read())
-                                    encoders.encode_base64(attachment)
-                                
-                                # Add header
-                                filename = os.path.basename(file_path)
-                                attachment.add_header('Content-Disposition', f'attachment; filename="{filename}"')
-                                msg.attach(attachment)
-                                
-                        except Exception as e:
-                            print(f"⚠️  Failed to attach {file_path}: {str(e)}")
-                
-                # Send email
-                with smtplib.SMTP(account_info['smtp_server'], account_info['smtp_port']) as server:
-                    server.starttls()
-                    server.login(account_info['smtp_username'], account_info['smtp_password'])
-                    server.send_message(msg)
-                
-                print(f"✅ [{i}/{total_emails}] Email sent to {recipient_email}")
-                success_count += 1
-                
-            except Exception as e:
-                print(f"❌ [{i}/{total_emails}] Failed to send to {recipient_email}: {str(e)}")
+        # Large attachments are streamed straight to the SMTP socket
+        use_streaming = self._should_stream(file_attachments)
         
-        # Clean up temporary link files
-        if attachments:
-            for file_path in attachments:
-                if file_path.startswith('link_') and os.path.exists(file_path):
+        server = None
+        processed = 0
+        individual_recipients = recipient_emails
+        
+        try:
+            if recipient_mode in ('shared', 'bcc') and total_emails > 1:
+                # One DATA transfer per chunk of recipients; only rejected addresses go one by one
+                individual_recipients = []
+                chunk_size = max(1, account_info.get('max_recipients', 50))
+                
+                for start in range(0, total_emails, chunk_size):
+                    chunk = recipient_emails[start:start + chunk_size]
+                    to_header = ', '.join(chunk) if recipient_mode == 'shared' else 'undisclosed-recipients:;'
+                    chunk_message_id = None
+                    if keys:
+                        chunk_message_id = message_id(idempotency_key(account_info['email'], '\n'.join(chunk), message_hash,
+                                                                      campaign_id), account_info['email'])
                     try:
-                        os.remove(file_path)
-                    except:
-                        pass
+                        server = server or self._connect_smtp(account_info)
+                        refused = self._deliver(server, account_info, to_header, chunk, subject, body,
+                                                file_attachments, use_streaming, chunk_message_id)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        refused = e.recipients
+                    except Exception as e:
+                        processed += len(chunk)
+                        print(f"❌ [{processed}/{total_emails}] Failed to send to {len(chunk)} recipient(s): {str(e)}")
+                        server = self._close_smtp(server)
+                        for recipient_email in chunk:
+                            finish(recipient_email, False)
+                        continue
+                    
+                    for recipient_email in chunk:
+                        if recipient_email in refused:
+                            individual_recipients.append(recipient_email)
+                        else:
+                            processed += 1
+                            success_count += 1
+                            finish(recipient_email, True, chunk_message_id)
+                            print(f"✅ [{processed}/{total_emails}] Email sent to {recipient_email}")
+                
+                if individual_recipients:
+                    print(f"🔁 Retrying {len(individual_recipients)} rejected recipient(s) individually")
+            
+            for recipient_email in individual_recipients:
+                processed += 1
+                recipient_message_id = message_id(keys[recipient_email], account_info['email']) if keys else None
+                try:
+                    server = server or self._connect_smtp(account_info)
+                    self._deliver(server, account_info, recipient_email, [recipient_email], subject, body,
+                                  file_attachments, use_streaming, recipient_message_id)
+                    print(f"✅ [{processed}/{total_emails}] Email sent to {recipient_email}")
+                    success_count += 1
+                    finish(recipient_email, True, recipient_message_id)
+                    
+                except Exception as e:
+                    finish(recipient_email, False)
+                    print(f"❌ [{processed}/{total_emails}] Failed to send to {recipient_email}: {str(e)}")
+                    # Start a fresh session for the next recipient
+                    server = self._close_smtp(server)
+        finally:
+            self._close_smtp(server)
+        
+        metrics.incr('emails_sent', success_count)
+        metrics.incr('emails_failed', total_emails - success_count)
+        # Batches flush when they finish and every process on exit; between them, at most once per interval
+        metrics.flush_if_due()
         
         print(f"\n📊 Sent {success_count} out of {total_emails} emails successfully")
         return success_count > 0
     
+    def _connect_smtp(self, account_info: dict) -> PipeliningSMTP:
+        """Open an authenticated SMTP session for an account"""
+        started = time.perf_counter()
+        server = PipeliningSMTP(account_info['smtp_server'], account_info['smtp_port'],
+                                timeout=self.sending_settings['smtp_timeout'])
+        try:
+            server.starttls()
+            metrics.observe('smtp_connect', time.perf_counter() - started)
+            with metrics.timer('smtp_auth'):
+                server.login(account_info['smtp_username'], account_info['smtp_password'])
+        except Exception:
+            metrics.incr('smtp_connect_errors')
+            server.close()
+            raise
+        return server
+    
+    def _close_smtp(self, server):
+        """Close an SMTP session, ignoring errors on a broken connection"""
+        if server is not None:
+            if getattr(server, 'in_message', False):
+                # Failed halfway through a message: the server would read QUIT as message data
+                server.close()
+                return None
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+        return None
+    
+    def _deliver(self, server, account_info: dict, to_header: str, envelope_recipients: list, subject: str, body: str,
+                 file_attachments: list, use_streaming: bool, message_id: str = None) -> dict:
+        """Send one message in a single SMTP transaction; returns refused recipients"""
+        with metrics.timer('mime_build'):
+            if use_streaming:
+                # Attachments are opened here, before MAIL FROM, so a vanished file cannot fail mid-message
+                message = StreamingMessage(self._message_headers(account_info, to_header, subject, message_id), body,
+                                           file_attachments).open()
+            else:
+                msg = self._build_mime_message(account_info, to_header, subject, body, file_attachments, message_id)
+                message = BytesMessage.from_mime(msg)
+        
+        # Uses PIPELINING/CHUNKING when the server advertises them
+        try:
+            with metrics.timer('smtp_send'):
+                return server.send_streamed(account_info['email'], envelope_recipients, message)
+        finally:
+            if use_streaming:
+                message.close()
+    
+    def _message_headers(self, account_info: dict, recipient_email: str, subject: str, message_id: str = None) -> list:
+        """From/To/Subject (and Message-ID, when given) headers for an outgoing message"""
+        from_name = account_info['display_name'] or self.personal_info['name']
+        headers = [
+            ('From', formataddr((from_name, account_info['email']))),
+            ('To', recipient_email),
+            ('Subject', subject)
+        ]
+        if message_id:
+            headers.append(('Message-ID', message_id))
+        return headers
+    
+    def _should_stream(self, file_attachments: list) -> bool:
+        """Check whether attachments are large enough to use the streaming MIME writer"""
+        threshold = self.attachment_settings['stream_threshold'] * 1024 * 1024
+        total_size = 0
+        for attachment in file_attachments:
+            try:
+                total_size += os.path.getsize(attachment.path)
+            except OSError:
+                continue
+        return bool(file_attachments) and total_size >= threshold
+    
+    def _build_mime_message(self, account_info: dict, recipient_email: str, subject: str, body: str, file_attachments: list,
+                            message_id: str = None) -> MIMEMultipart:
+        """Build an in-memory MIME message for small emails"""
+        # Create message container
+        msg = MIMEMultipart()
+        
+        # Set From field with display name
+        from_name = account_info['display_name'] or self.personal_info['name']
+        msg['From'] = f'{from_name} <{account_info["email"]}>'
+        msg['To'] = recipient_email
+        msg['Subject'] = subject
+        if message_id:
+            msg['Message-ID'] = message_id
+        
+        # Attach body text
+        msg.attach(MIMEText(body, 'plain'))
+        
+        # Attach files
+        for file_attachment in file_attachments:
+            file_path = file_attachment.path
+            try:
+                with open(file_path, 'rb') as file:
+                    # Guess the MIME type
+                    mime_type, encoding = mimetypes.guess_type(file_path)
+                    if mime_type is None or encoding is not None:
+                        mime_type = 'application/octet-stream'
+                    
+                    main_type, sub_type = mime_type.split('/', 1)
+                    
+                    if main_type == 'text':
+                        attachment = MIMEText(file.read().decode('utf-8'), _subtype=sub_type)
+                    elif main_type == 'image':
+                        attachment = MIMEImage(file.read(), _subtype=sub_type)
+                    elif main_type == 'application':
+                        attachment = MIMEApplication(file.read(), _subtype=sub_type)
+                    else:
+                        attachment = MIMEBase(main_type, sub_type)
+                        attachment.set_payload(file.read())
+                        encoders.encode_base64(attachment)
+                    
+                    # Add header
+                    filename = os.path.basename(file_path)
+                    attachment.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+                    msg.attach(attachment)
+                    
+            except Exception as e:
+                print(f"⚠️  Failed to attach {file_path}: {str(e)}")
+        
+        return msg
+    
     def preview_email(self, recipient_name: str, subject: str, body: str, tone_option: str, attachments: list = None):
         """Preview email content with attachments"""
         account_info = self.get_current_account_info()
@@ -1081,23 +1346,12 @@ Please let me know if you have any questions or need additional information.
         print(f"Tone: {tone_option}")
         
         if attachments:
-            file_attachments = [os.path.basename(att) for att in attachments if not att.startswith('link_')]
-            link_attachments = []
-            
-            for att in attachments:
-                if att.startswith('link_'):
-                    try:
-                        with open(att, 'r') as f:
-                            link_content = f.read()
-                            link_text = link_content.split('\n')[0].replace('Clickable Link: ', '')
-                            link_attachments.append(link_text)
-                    except:
-                        pass
+            file_attachments, link_attachments = split_attachments(attachments)
             
             if file_attachments:
-                print(f"📎 Attachments: {', '.join(file_attachments)}")
+                print(f"📎 Attachments: {', '.join(att.name for att in file_attachments)}")
             if link_attachments:
-                print(f"🔗 Links: {', '.join(link_attachments)}")
+                print(f"🔗 Links: {', '.join(link.name for link in link_attachments)}")
         
         print("-" * 70)
         print(body)
@@ -1123,6 +1377,7 @@ Please let me know if you have any questions or need additional information.
         with open('email_config.cfg', 'w') as configfile:
             self.config.write(configfile)
         
+        self.template_engine.clear()
         print("✅ Signature settings updated!")
     
     def manage_assistant_settings(self):
@@ -1151,6 +1406,7 @@ Please let me know if you have any questions or need additional information.
         with open('email_config.cfg', 'w') as configfile:
             self.config.write(configfile)
         
+        self.template_engine.clear()
         print("✅ AI assistant settings updated!")
     
     def manage_attachment_settings(self):
@@ -1180,7 +1436,63 @@ Please let me know if you have any questions or need additional information.
             self.config.write(configfile)
         
         print("✅ Attachment settings updated!")
-    
+
+    def manage_suppression_list(self):
+        """Add, remove, check and import suppressed addresses"""
+        if self.suppression is None:
+            print("❌ Suppression list disabled (set suppression_file in [sending_settings])")
+            return
+
+        while True:
+            counts = ', '.join(f"{reason}: {count}" for reason, count in sorted(self.suppression.counts().items()))
+            print("\n🚫 SUPPRESSION LIST")
+            print("=" * 30)
+            print(f"{len(self.suppression)} suppressed address(es)" + (f" ({counts})" if counts else ""))
+            print("1. ➕ Suppress an address or @domain")
+            print("2. ➖ Remove a suppression")
+            print("3. 🔍 Check an address")
+            print("4. 📥 Import bounces/unsubscribes from file")
+            print("5. 📋 List suppressed addresses")
+            print("6. ↩️ Back")
+
+            choice = input("Select option (1-6): ").strip()
+
+            if choice == '1':
+                address = input("Address or @domain: ").strip()
+                reason = input(f"Reason ({'/'.join(SUPPRESSION_REASONS)}) [manual]: ").strip().lower() or 'manual'
+                if self.suppression.add(address, reason):
+                    print(f"✅ {address} suppressed ({reason})")
+                else:
+                    print("❌ Invalid or already suppressed")
+            elif choice == '2':
+                address = input("Address or @domain: ").strip()
+                if self.suppression.remove(address):
+                    print(f"✅ {address} can be emailed again")
+                else:
+                    print("❌ Not in the suppression list")
+            elif choice == '3':
+                address = input("Address: ").strip()
+                reason = self.suppression.reason(address)
+                print(f"🚫 Suppressed ({reason})" if reason else "✅ Not suppressed")
+            elif choice == '4':
+                path = input("File path (CSV with an email column or one address per line): ").strip()
+                reason = input(f"Reason ({'/'.join(SUPPRESSION_REASONS)}) [bounced]: ").strip().lower() or 'bounced'
+                try:
+                    added = self.suppression.import_file(path, reason)
+                    print(f"✅ {added} new address(es) suppressed")
+                except Exception as e:
+                    print(f"❌ Error importing suppression list: {e}")
+            elif choice == '5':
+                for i, (address, reason) in enumerate(self.suppression.entries()):
+                    if i == 50:
+                        print(f"   ... and {len(self.suppression) - 50} more")
+                        break
+                    print(f"   {address} ({reason})")
+            elif choice == '6':
+                break
+            else:
+                print("❌ Invalid choice")
+
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
         pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -0,0 +1,355 @@
+import asyncio
+import json
+import ssl
+import urllib.error
+import urllib.parse
+import urllib.request
+from types import SimpleNamespace
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from ai_request_policy import RequestPolicy
+from metrics import metrics
+
+try:
+    from groq import Groq, AsyncGroq
+except ImportError:  # Groq is only required for the 'groq' provider
+    Groq = None
+    AsyncGroq = None
+
+
+@dataclass(frozen=True)
+class ProviderCapabilities:
+    streaming: bool = False
+    batching: bool = False
+    network: bool = True
+    per_token_cost: bool = False
+    uses_prompt: bool = True
+
+
+@dataclass
+class GenerationRequest:
+    recipient_name: str
+    message_request: str
+    tone_option: str
+    attachments: Optional[list] = None
+    recipient_details: Optional[Dict] = None
+    messages: List[Dict] = field(default_factory=list)
+    temperature: float = 0.7
+    max_tokens: int = 1024
+
+
+class ProviderError(Exception):
+    """Raised when a generation backend returns an error response"""
+
+    def __init__(self, message: str, status_code: int = None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class GenerationProvider:
+    name = 'base'
+    capabilities = ProviderCapabilities()
+
+    def __init__(self, model: str = '', request_policy: RequestPolicy = None):
+        self.model = model
+        self.request_policy = request_policy or RequestPolicy()
+
+    def is_available(self) -> bool:
+        """Check whether the provider can serve requests"""
+        return True
+
+    def generate(self, request: GenerationRequest) -> str:
+        """Generate the raw email text (Subject line + body)"""
+        raise NotImplementedError
+
+    def generate_batch(self, requests: List[GenerationRequest]) -> List[str]:
+        """Generate several emails; providers with native batching override this"""
+        return [self.generate(request) for request in requests]
+
+    async def agenerate(self, request: GenerationRequest) -> str:
+        """Async generation; providers with an event-loop client override this"""
+        return await asyncio.to_thread(self.generate, request)
+
+    def test_connection(self) -> bool:
+        """Send a tiny request to check the backend is reachable"""
+        return self.is_available()
+
+    def describe(self) -> str:
+        """Short human-readable description of the provider"""
+        return f"{self.name} ({self.model})" if self.model else self.name
+
+    def _record_usage(self, usage):
+        """Count prompt/completion tokens from an OpenAI-style usage object or dict"""
+        if not usage:
+            return
+        if isinstance(usage, dict):
+            usage = SimpleNamespace(**usage)
+        metrics.incr('tokens_in', getattr(usage, 'prompt_tokens', 0) or 0)
+        metrics.incr('tokens_out', getattr(usage, 'completion_tokens', 0) or 0)
+
+
+class GroqProvider(GenerationProvider):
+    name = 'groq'
+    capabilities = ProviderCapabilities(streaming=True, batching=False, network=True, per_token_cost=True)
+
+    def __init__(self, api_key: str, model: str, request_policy: RequestPolicy = None, base_url: str = None):
+        super().__init__(model, request_policy)
+        self.api_key = api_key
+        # Overridable so benchmarks can point the SDK at a local mock server
+        self.base_url = base_url or None
+        self.client = None
+        self._async_client = None
+        self._async_loop = None
+        if Groq is None:
+            print("⚠️  Groq package is not installed")
+            return
+        try:
+            # Retries are handled by the request policy, not the SDK
+            self.client = Groq(api_key=api_key, base_url=self.base_url, timeout=self.request_policy.timeout,
+                               max_retries=0)
+        except Exception as e:
+            print(f"⚠️  Failed to initialize Groq client: {e}")
+
+    def is_available(self) -> bool:
+        return self.client is not None
+
+    def generate(self, request: GenerationRequest) -> str:
+        chat_completion = self.request_policy.call(
+            lambda timeout: self.client.chat.completions.create(
+                messages=request.messages,
+                model=self.model,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                top_p=1,
+                stream=False,
+                timeout=timeout,
+            ),
+            label="AI generation"
+        )
+        self._record_usage(getattr(chat_completion, 'usage', None))
+        return chat_completion.choices[0].message.content.strip()
+
+    async def agenerate(self, request: GenerationRequest) -> str:
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # The SDK's connection pool belongs to one event loop; reusing it from a later
+            # asyncio.run() fails with "Event loop is closed", so each loop gets its own client
+            self._async_client = AsyncGroq(api_key=self.api_key, base_url=self.base_url,
+                                           timeout=self.request_policy.timeout, max_retries=0)
+            self._async_loop = loop
+        chat_completion = await self.request_policy.acall(
+            lambda timeout: self._async_client.chat.completions.create(
+                messages=request.messages,
+                model=self.model,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                top_p=1,
+                stream=False,
+                timeout=timeout,
+            ),
+            label="AI generation"
+        )
+        self._record_usage(getattr(chat_completion, 'usage', None))
+        return chat_completion.choices[0].message.content.strip()
+
+    def test_connection(self) -> bool:
+        if not self.client:
+            return False
+        self.client.chat.completions.create(
+            messages=[{"role": "user", "content": "Say 'Hello' in a short message."}],
+            model=self.model,
+            max_tokens=10,
+            timeout=min(10.0, self.request_policy.timeout),
+        )
+        return True
+
+
+class OpenAICompatibleProvider(GenerationProvider):
+    name = 'openai_compatible'
+    capabilities = ProviderCapabilities(streaming=True, batching=False, network=True, per_token_cost=False)
+
+    def __init__(self, base_url: str, model: str, api_key: str = '', request_policy: RequestPolicy = None):
+        super().__init__(model, request_policy)
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+
+    def is_available(self) -> bool:
+        return bool(self.base_url)
+
+    def _post(self, path: str, payload: Dict, timeout: float) -> Dict:
+        """POST a JSON payload to the endpoint and decode the JSON response"""
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        http_request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode('utf-8'),
+            headers=headers,
+            method='POST'
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            raise ProviderError(f"HTTP {e.code} from {self.base_url}: {e.reason}", e.code, e)
+
+    def generate(self, request: GenerationRequest) -> str:
+        payload = {
+            'model': self.model,
+            'messages': request.messages,
+            'temperature': request.temperature,
+            'max_tokens': request.max_tokens,
+            'stream': False
+        }
+        data = self.request_policy.call(
+            lambda timeout: self._post('/chat/completions', payload, timeout),
+            label="Local AI generation"
+        )
+        self._record_usage(data.get('usage'))
+        return data['choices'][0]['message']['content'].strip()
+
+    async def _apost(self, path: str, payload: Dict, timeout: float) -> Dict:
+        """Async POST of a JSON payload over a plain asyncio connection"""
+        url = urllib.parse.urlsplit(f"{self.base_url}{path}")
+        use_tls = url.scheme == 'https'
+        target = url.path + (f"?{url.query}" if url.query else '')
+        body = json.dumps(payload).encode('utf-8')
+
+        head = [f"POST {target} HTTP/1.1", f"Host: {url.netloc}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", "Connection: close"]
+        if self.api_key:
+            head.append(f"Authorization: Bearer {self.api_key}")
+
+        async def exchange():
+            reader, writer = await asyncio.open_connection(
+                url.hostname, url.port or (443 if use_tls else 80),
+                ssl=ssl.create_default_context() if use_tls else None
+            )
+            try:
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                return await reader.read()
+            finally:
+                writer.close()
+
+        raw = await asyncio.wait_for(exchange(), timeout)
+        header_blob, _, content = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = header_blob.decode('latin-1').split('\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = _decode_chunked(content)
+        if status >= 400:
+            raise ProviderError(f"HTTP {status} from {self.base_url}", status, SimpleNamespace(headers=headers))
+        return json.loads(content.decode('utf-8'))
+
+    async def agenerate(self, request: GenerationRequest) -> str:
+        payload = {
+            'model': self.model,
+            'messages': request.messages,
+            'temperature': request.temperature,
+            'max_tokens': request.max_tokens,
+            'stream': False
+        }
+        data = await self.request_policy.acall(
+            lambda timeout: self._apost('/chat/completions', payload, timeout),
+            label="Local AI generation"
+        )
+        self._record_usage(data.get('usage'))
+        return data['choices'][0]['message']['content'].strip()
+
+    def test_connection(self) -> bool:
+        self._post('/chat/completions', {
+            'model': self.model,
+            'messages': [{"role": "user", "content": "Say 'Hello' in a short message."}],
+            'max_tokens': 10
+        }, timeout=min(10.0, self.request_policy.timeout))
+        return True
+
+
+class TemplateProvider(GenerationProvider):
+    name = 'template'
+    capabilities = ProviderCapabilities(streaming=False, batching=True, network=False, per_token_cost=False,
+                                        uses_prompt=False)
+
+    def __init__(self, renderer: Callable[..., str], batch_renderer: Callable[..., List[str]] = None):
+        super().__init__()
+        self.renderer = renderer
+        self.batch_renderer = batch_renderer
+
+    def generate(self, request: GenerationRequest) -> str:
+        return self.renderer(request.recipient_name, request.message_request,
+                             request.tone_option, request.attachments)
+
+    async def agenerate(self, request: GenerationRequest) -> str:
+        # Rendering is CPU-only and fast; no need for a worker thread
+        return self.generate(request)
+
+    def generate_batch(self, requests: List[GenerationRequest]) -> List[str]:
+        if not self.batch_renderer:
+            return super().generate_batch(requests)
+
+        # Render each (tone, attachments) group in one column-oriented pass
+        groups = {}
+        for index, request in enumerate(requests):
+            key = (request.tone_option, tuple(request.attachments or ()))
+            groups.setdefault(key, []).append(index)
+
+        results = [None] * len(requests)
+        for (tone_option, attachments), indices in groups.items():
+            rendered = self.batch_renderer(
+                tone_option,
+                [requests[i].recipient_name for i in indices],
+                [requests[i].message_request for i in indices],
+                list(attachments)
+            )
+            for i, text in zip(indices, rendered):
+                results[i] = text
+        return results
+
+
+def _decode_chunked(content: bytes) -> bytes:
+    """Decode an HTTP/1.1 chunked transfer-encoded body"""
+    decoded = []
+    position = 0
+    while True:
+        line_end = content.index(b'\r\n', position)
+        size = int(content[position:line_end].split(b';')[0], 16)
+        if size == 0:
+            return b''.join(decoded)
+        start = line_end + 2
+        decoded.append(content[start:start + size])
+        position = start + size + 2
+
+
+def create_provider(config, request_policy: RequestPolicy, template_renderer: Callable[..., str],
+                    batch_renderer: Callable[..., List[str]] = None,
+                    section: str = 'ai_settings') -> GenerationProvider:
+    """Create the generation provider selected in [ai_settings]"""
+    provider_name = config.get(section, 'provider', fallback='groq').strip().lower()
+
+    if provider_name in ('openai_compatible', 'local'):
+        return OpenAICompatibleProvider(
+            base_url=config.get(section, 'local_base_url', fallback='http://localhost:11434/v1'),
+            model=config.get(section, 'local_model', fallback='llama3.1'),
+            api_key=config.get(section, 'local_api_key', fallback=''),
+            request_policy=request_policy
+        )
+
+    if provider_name == 'template':
+        return TemplateProvider(template_renderer, batch_renderer)
+
+    if provider_name != 'groq':
+        print(f"⚠️  Unknown AI provider '{provider_name}', using Groq")
+    return GroqProvider(
+        api_key=config.get(section, 'groq_api_key', fallback=''),
+        model=config.get(section, 'model', fallback='llama-3.1-8b-instant'),
+        request_policy=request_policy,
+        base_url=config.get(section, 'groq_base_url', fallback='')
+    )
@@ -1,5 +1,6 @@
 from email_sender import EmailSender
 from contact_manager import ContactManager
+from profiling import BatchProfiler
 import os
 import json
 from datetime import datetime
@@ -8,15 +9,16 @@ def clear_screen():
     """Clear terminal screen"""
     os.system('cls' if os.name == 'nt' else 'clear')
 
-def test_groq_connection(api_key, model='llama-3.1-8b-instant'):
+def test_groq_connection(api_key, model='llama-3.1-8b-instant', timeout=10.0):
     """Test Groq API connection"""
     from groq import Groq
     try:
-        client = Groq(api_key=api_key)
+        client = Groq(api_key=api_key, timeout=timeout, max_retries=0)
         chat_completion = client.chat.completions.create(
             messages=[{"role": "user", "content": "Say 'Hello' in a short message."}],
             model=model,
             max_tokens=10,
+            timeout=timeout,
         )
         print(f"✅ Groq API connection successful with model: {model}")
         return True
@@ -24,6 +26,19 @@ def test_groq_connection(api_key, model='llama-3.1-8b-instant'):
         print(f"❌ Groq API connection failed: {str(e)}")
         return False
 
+def test_ai_connection(email_sender):
+    """Test the configured AI generation provider"""
+    provider = email_sender.provider
+    if provider.name == 'groq':
+        return test_groq_connection(email_sender.groq_api_key, provider.model, email_sender.request_policy.timeout)
+    try:
+        provider.test_connection()
+        print(f"✅ AI provider ready: {provider.describe()}")
+        return True
+    except Exception as e:
+        print(f"❌ AI provider connection failed ({provider.describe()}): {str(e)}")
+        return False
+
 def save_draft(draft_data):
     """Save email draft to JSON file"""
     try:
@@ -262,12 +277,20 @@ def load_and_send_draft(email_sender, draft):
         print("❌ No recipient emails found in draft")
         return False
     
+    # Addresses may have unsubscribed or bounced since the draft was saved
+    recipient_emails = email_sender.filter_suppressed(recipient_emails)
+    if not recipient_emails:
+        print("❌ All draft recipients are suppressed")
+        return False
+    
     # Preview and send
     email_sender.preview_email(recipient_name, subject, body, tone)
     
     confirm = input("\nSend this draft? (y/n): ").lower().strip()
     if confirm == 'y':
-        success = email_sender.send_email(recipient_emails, subject, body)
+        # Sending the same draft again is a no-op for recipients it already reached
+        campaign_id = f"draft-{draft.get('id')}-{draft.get('created_at', '')}"
+        success = email_sender.send_email(recipient_emails, subject, body, campaign_id=campaign_id)
         if success:
             print(f"🎉 Draft sent successfully to {recipient_name}!")
             return True
@@ -285,10 +308,16 @@ def main():
     
     # Initialize email sender
     email_sender = EmailSender()
-    
+    try:
+        run_main_menu(email_sender)
+    finally:
+        email_sender.close()
+
+def run_main_menu(email_sender):
+    """Main menu loop"""
     # Test AI connection
-    if not test_groq_connection(email_sender.groq_api_key, email_sender.model):
-        print("❌ Please check your Groq API key in the config file.")
+    if not test_ai_connection(email_sender):
+        print("❌ Please check your AI provider settings in the config file.")
         return
     
     while True:
@@ -307,12 +336,15 @@ def main():
         print("6. 📎 Attachment Settings")
         print("7. 📊 View Statistics")
         print("8. 💾 Manage Drafts")
-        print("9. 🚪 Exit")
+        print("9. 🚫 Suppression List")
+        print("10. 🚪 Exit")
         
-        choice = input("\nSelect option (1-9): ").strip()
+        choice = input("\nSelect option (1-10): ").strip()
         
         if choice == '1':
-            send_email_flow(email_sender)
+            # Opt-in via [profiling] mode; prompt time is included in wall-clock samples
+            with BatchProfiler.from_config(email_sender.config, 'send_email_flow'):
+                send_email_flow(email_sender)
         elif choice == '2':
             manage_contacts_flow(email_sender.contact_manager)
         elif choice == '3':
@@ -328,6 +360,8 @@ def main():
         elif choice == '8':
             manage_drafts_flow(email_sender)
         elif choice == '9':
+            email_sender.manage_suppression_list()
+        elif choice == '10':
             print("👋 Goodbye!")
             break
         else:
@@ -358,6 +392,12 @@ def send_email_flow(email_sender):
         print("❌ No emails selected")
         return
     
+    # Suppressed addresses are dropped before any AI generation
+    selected_emails = email_sender.filter_suppressed(selected_emails)
+    if not selected_emails:
+        print("❌ All selected emails are suppressed")
+        return
+    
     message_request = input("What should the email say? ").strip()
     if not message_request:
         print("❌ Message is required")
@@ -416,11 +456,7 @@ def send_email_flow(email_sender):
                 print(f"🎉 Email sent successfully to {len(selected_emails)} recipient(s)!")
                 
                 # Update last contact time
-                contact = email_sender.contact_manager.find_contact(contact_name)
-                if contact:
-                    contact['last_contact'] = email_sender.contact_manager._get_current_timestamp()
-                    email_sender.contact_manager.contacts[contact_name] = contact
-                    email_sender.contact_manager.save_contacts()
+                email_sender.contact_manager.update_last_contact(contact_name)
             break
         
         elif action == '2':
@@ -473,14 +509,6 @@ def send_email_flow(email_sender):
                 print("❌ Draft name required")
         
         elif action == '7':
-            # Clean up temporary link files
-            if attachments:
-                for file_path in attachments:
-                    if file_path.startswith('link_') and os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                        except:
-                            pass
             print("❌ Email cancelled.")
             break
         
@@ -499,9 +527,10 @@ def manage_contacts_flow(contact_manager):
         print("6. 🏷️  View by Category")
         print("7. 📤 Export Contacts")
         print("8. 📥 Import Contacts")
-        print("9. ↩️  Back to Main Menu")
+        print("9. 🎯 Find Segment")
+        print("10. ↩️  Back to Main Menu")
         
-        choice = input("\nSelect option (1-9): ").strip()
+        choice = input("\nSelect option (1-10): ").strip()
         
         if choice == '1':
             contact_manager.create_contact()
@@ -585,14 +614,17 @@ def manage_contacts_flow(contact_manager):
                 print("📭 No categories found")
         
         elif choice == '7':
-            filename = input("Enter export filename (default: contacts_export.json): ").strip() or "contacts_export.json"
-            if contact_manager.export_contacts(filename):
+            filename = input("Enter export filename (.json, .jsonl or .csv, add .gz to compress) (default: contacts_export.json): ").strip() or "contacts_export.json"
+            segment = input("Segment query (blank for all contacts): ").strip() or None
+            fields = input("Fields to export, comma-separated (blank for all): ").strip()
+            fields = [field.strip() for field in fields.split(',') if field.strip()] or None
+            if contact_manager.export_contacts(filename, segment=segment, fields=fields):
                 print(f"✅ Contacts exported to {filename}")
             else:
                 print("❌ Export failed")
         
         elif choice == '8':
-            filename = input("Enter import filename: ").strip()
+            filename = input("Enter import filename (.json, .jsonl, .csv or .vcf, optionally .gz): ").strip()
             if filename and os.path.exists(filename):
                 if contact_manager.import_contacts(filename):
                     print("✅ Contacts imported successfully!")
@@ -602,60 +634,75 @@ def manage_contacts_flow(contact_manager):
                 print("❌ File not found")
         
         elif choice == '9':
+            find_segment_flow(contact_manager)
+        
+        elif choice == '10':
             break
         
         else:
             print("❌ Invalid choice")
 
+def find_segment_flow(contact_manager):
+    """Run a segment query over categories, tags, companies and creation dates"""
+    print("\n🎯 FIND SEGMENT")
+    print("Examples: tag:vip AND NOT category:family")
+    print("          (company:\"Acme Inc\" OR tag:partner) AND created>=2024-01-01")
+    tags = contact_manager.get_contact_tags()
+    if tags:
+        print(f"Tags in use: {', '.join(tags)}")
+    
+    query = input("Segment query: ").strip()
+    if not query:
+        print("❌ Segment query required")
+        return
+    
+    try:
+        names = sorted(contact_manager.find_segment(query))
+    except ValueError as e:
+        print(f"❌ Invalid segment query: {e}")
+        return
+    
+    if not names:
+        print("❌ No contacts match this segment")
+        return
+    
+    print(f"\n🎯 {len(names)} contact(s) in segment:")
+    for name in names[:50]:
+        details = contact_manager.get_contact_details(name)
+        emails = details.get('emails', []) if details else []
+        print(f"  • {name} - {', '.join(emails)}")
+    if len(names) > 50:
+        print(f"  ... and {len(names) - 50} more")
+
 def view_statistics(contact_manager):
     """Display comprehensive statistics"""
-    contacts = contact_manager.list_contacts()
-    total_contacts = len(contacts)
+    stats = contact_manager.get_statistics()
+    total_contacts = stats['total_contacts']
     
     if total_contacts == 0:
         print("\n📊 No contacts available for statistics")
         return
     
-    total_emails = 0
-    total_phones = 0
-    
-    for contact in contacts:
-        details = contact_manager.get_contact_details(contact)
-        if details:
-            total_emails += len(details.get('emails', []))
-            total_phones += len(details.get('phones', []))
-    
-    categories = contact_manager.get_contact_categories()
+    total_emails = stats['total_emails']
+    total_phones = stats['total_phones']
     
     print("\n📊 CONTACT STATISTICS")
     print("=" * 25)
     print(f"Total Contacts: {total_contacts}")
     print(f"Total Email Addresses: {total_emails}")
     print(f"Total Phone Numbers: {total_phones}")
-    if total_contacts > 0:
-        print(f"Average Emails per Contact: {total_emails/total_contacts:.1f}")
-    else:
-        print("Average Emails per Contact: 0")
+    print(f"Average Emails per Contact: {stats['average_emails']:.1f}")
     
-    if categories:
+    if stats['categories']:
         print(f"\n🏷️  CATEGORY BREAKDOWN:")
-        for category in categories:
-            contacts_in_category = contact_manager.list_contacts(category)
-            if total_contacts > 0:
-                percentage = (len(contacts_in_category) / total_contacts) * 100
-                print(f"  {category}: {len(contacts_in_category)} contacts ({percentage:.1f}%)")
-            else:
-                print(f"  {category}: {len(contacts_in_category)} contacts (0%)")
+        for category, count in stats['categories'].items():
+            percentage = (count / total_contacts) * 100
+            print(f"  {category}: {count} contacts ({percentage:.1f}%)")
     
     # Recent contacts
     print(f"\n📈 RECENT CONTACTS (last 5):")
-    for contact in contacts[-5:]:
-        details = contact_manager.get_contact_details(contact)
-        if details:
-            created = details.get('created_at', 'Unknown')
-            print(f"  • {contact} - {created}")
-        else:
-            print(f"  • {contact} - [Unknown creation date]")
+    for contact, created in stats['recent']:
+        print(f"  • {contact} - {created or 'Unknown'}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
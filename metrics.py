@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, List
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Process-wide counters and latency timers for the generate → parse → send pipeline"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = buckets
+        self.sinks = []
+        self.counters: Dict[str, float] = {}
+        # name -> [count, sum, max, bucket counts...]
+        self.timers: Dict[str, list] = {}
+        # Callables read at snapshot time, for values already counted elsewhere
+        self.collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+        # Seconds between the snapshots flush_if_due writes
+        self.flush_interval = 60.0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1):
+        """Add to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        """Record one latency sample"""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = [0, 0.0, 0.0] + [0] * (len(self.buckets) + 1)
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+            timer[3 + bisect_left(self.buckets, seconds)] += 1
+
+    def timer(self, name: str) -> _Timer:
+        """Context manager that records the time spent in its block"""
+        return _Timer(self, name)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, float]]):
+        """Register a callable returning gauge values; hot paths keep their own plain counters"""
+        self.collectors[name] = collector
+
+    def snapshot(self) -> dict:
+        """Copy of all counters, gauges and timers"""
+        with self._lock:
+            counters = dict(self.counters)
+            timers = {name: list(values) for name, values in self.timers.items()}
+        gauges = {}
+        for collector in list(self.collectors.values()):
+            gauges.update(collector())
+        return {
+            'timestamp': time.time(),
+            'counters': counters,
+            'gauges': gauges,
+            'timers': {
+                name: {
+                    'count': values[0],
+                    'sum': values[1],
+                    'max': values[2],
+                    'buckets': values[3:]
+                }
+                for name, values in timers.items()
+            }
+        }
+
+    def flush(self):
+        """Write a snapshot to every configured sink"""
+        if not self.enabled or not self.sinks:
+            return
+        self._last_flush = time.monotonic()
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            try:
+                sink.write(snapshot, self.buckets)
+            except Exception as e:
+                print(f"⚠️  Failed to write metrics: {e}")
+
+    def flush_if_due(self):
+        """Flush if flush_interval has passed since the last snapshot; cheap enough to call per send"""
+        if self.enabled and self.sinks and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def reset(self):
+        """Clear all counters and timers (collectors stay registered)"""
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+
+class MemorySink:
+    """Keep the most recent snapshots in memory"""
+
+    def __init__(self, max_snapshots: int = 100):
+        self.snapshots = deque(maxlen=max_snapshots)
+
+    def write(self, snapshot: dict, buckets):
+        self.snapshots.append(snapshot)
+
+
+class JsonLinesSink:
+    """Append one JSON snapshot per flush"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, snapshot: dict, buckets):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(snapshot) + '\n')
+
+
+class PrometheusTextfileSink:
+    """Write the Prometheus text exposition format for node_exporter's textfile collector"""
+
+    def __init__(self, path: str, prefix: str = 'email_assistant_'):
+        self.path = path
+        self.prefix = prefix
+
+    def render(self, snapshot: dict, buckets) -> str:
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{self.prefix}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f"{self.prefix}{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        for name, timer in sorted(snapshot['timers'].items()):
+            metric = f"{self.prefix}{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(buckets, timer['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {timer["count"]}')
+            lines.append(f"{metric}_sum {timer['sum']}")
+            lines.append(f"{metric}_count {timer['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, snapshot: dict, buckets):
+        # Write-then-rename so the collector never reads a half-written file
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(self.render(snapshot, buckets))
+        os.replace(temp_path, self.path)
+
+
+def create_sinks(config, section: str = 'metrics') -> List:
+    """Create the sinks listed in [metrics] sinks"""
+    sinks = []
+    names = config.get(section, 'sinks', fallback='memory')
+    for name in (part.strip().lower() for part in names.split(',')):
+        if name == 'memory':
+            sinks.append(MemorySink())
+        elif name == 'jsonl':
+            sinks.append(JsonLinesSink(config.get(section, 'jsonl_path', fallback='metrics.jsonl')))
+        elif name == 'prometheus':
+            sinks.append(PrometheusTextfileSink(config.get(section, 'prometheus_path', fallback='email_assistant.prom')))
+        elif name:
+            print(f"⚠️  Unknown metrics sink '{name}'")
+    return sinks
+
+
+def configure_metrics(config, section: str = 'metrics') -> 'Metrics':
+    """Enable the global metrics registry from the [metrics] section"""
+    metrics.enabled = config.getboolean(section, 'enabled', fallback=False)
+    if metrics.enabled:
+        metrics.sinks = create_sinks(config, section)
+        metrics.flush_interval = config.getfloat(section, 'flush_interval', fallback=60.0)
+    return metrics
+
+
+# Shared registry; disabled (no-op) until configure_metrics() turns it on
+metrics = Metrics()
+atexit.register(metrics.flush)
@@ -0,0 +1,159 @@
+import base64
+import mimetypes
+import mmap
+import os
+import re
+import uuid
+from email.header import Header
+from email.utils import formatdate
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from attachments import FileAttachment
+
+# 57 raw bytes encode to one 76-character base64 line
+BASE64_LINE_BYTES = 57
+DEFAULT_CHUNK_LINES = 1024
+
+CRLF = b'\r\n'
+LEADING_DOT = re.compile(rb'^\.', re.MULTILINE)
+BARE_LINE_ENDING = re.compile(rb'\r\n|\n|\r(?!\n)')
+
+
+def _encode_header(value: str) -> str:
+    """RFC 2047-encode a header value when it is not plain ASCII"""
+    value = value.replace('\r', ' ').replace('\n', ' ')
+    try:
+        value.encode('ascii')
+        return value
+    except UnicodeEncodeError:
+        return Header(value, 'utf-8').encode().replace('\n', '\r\n')
+
+
+def _to_crlf(text: str) -> bytes:
+    """Normalise line endings to CRLF and encode as UTF-8"""
+    return text.replace('\r\n', '\n').replace('\n', '\r\n').encode('utf-8')
+
+
+class StreamingMessage:
+    def __init__(self, headers: List[Tuple[str, str]], body: str, attachments: List[FileAttachment],
+                 chunk_lines: int = DEFAULT_CHUNK_LINES):
+        self.headers = headers
+        self.body = body
+        self.attachments = attachments
+        self.chunk_bytes = BASE64_LINE_BYTES * chunk_lines
+        self.boundary = f"==============={uuid.uuid4().hex}=="
+        self._files: Optional[List[BinaryIO]] = None
+
+    def open(self) -> 'StreamingMessage':
+        """Open every attachment now, so a missing file fails before the SMTP transaction starts"""
+        if self._files is None:
+            files = []
+            try:
+                for attachment in self.attachments:
+                    files.append(open(attachment.path, 'rb'))
+            except OSError:
+                for file in files:
+                    file.close()
+                raise
+            self._files = files
+        return self
+
+    def close(self):
+        for file in self._files or ():
+            file.close()
+        self._files = None
+
+    def __enter__(self) -> 'StreamingMessage':
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _header_block(self) -> bytes:
+        """Top-level message headers"""
+        lines = [f"{name}: {_encode_header(value)}" for name, value in self.headers]
+        lines.append(f"Date: {formatdate(localtime=True)}")
+        lines.append("MIME-Version: 1.0")
+        lines.append(f'Content-Type: multipart/mixed; boundary="{self.boundary}"')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('ascii')
+
+    def _body_part(self) -> bytes:
+        """The plain-text body part"""
+        try:
+            self.body.encode('ascii')
+            encoding_header = 'Content-Type: text/plain; charset="us-ascii"\r\nContent-Transfer-Encoding: 7bit'
+            payload = _to_crlf(self.body)
+        except UnicodeEncodeError:
+            encoding_header = 'Content-Type: text/plain; charset="utf-8"\r\nContent-Transfer-Encoding: base64'
+            payload = base64.encodebytes(self.body.encode('utf-8')).replace(b'\n', CRLF)
+        return (f"--{self.boundary}\r\n{encoding_header}\r\n\r\n").encode('ascii') + payload + CRLF
+
+    def _attachment_header(self, attachment: FileAttachment) -> bytes:
+        """MIME headers for one base64-encoded file part"""
+        mime_type, encoding = mimetypes.guess_type(attachment.path)
+        if mime_type is None or encoding is not None:
+            mime_type = 'application/octet-stream'
+        filename = attachment.name.replace('"', '')
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {mime_type}\r\n"
+            f"Content-Transfer-Encoding: base64\r\n"
+            f'Content-Disposition: attachment; filename="{_encode_header(filename)}"\r\n\r\n'
+        ).encode('ascii')
+
+    def _iter_file(self, file: BinaryIO) -> Iterator[bytes]:
+        """Base64-encode an open file chunk by chunk from a memory map"""
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, self.chunk_bytes):
+                    yield base64.encodebytes(view[offset:offset + self.chunk_bytes]).replace(b'\n', CRLF)
+            finally:
+                view.release()
+
+    def iter_chunks(self, dot_stuff: bool = False) -> Iterator[bytes]:
+        """Yield the serialised message in bounded-size chunks
+
+        With dot_stuff the output is ready for an SMTP DATA command.
+        Base64 lines never start with a dot, so only text parts need stuffing.
+        Attachments are opened first when open() has not been called.
+        """
+        def stuffed(data: bytes) -> bytes:
+            return LEADING_DOT.sub(b'..', data) if dot_stuff else data
+
+        opened_here = self._files is None
+        self.open()
+        try:
+            yield stuffed(self._header_block())
+            yield stuffed(self._body_part())
+            for attachment, file in zip(self.attachments, self._files):
+                yield stuffed(self._attachment_header(attachment))
+                yield from self._iter_file(file)
+            yield f"--{self.boundary}--\r\n".encode('ascii')
+        finally:
+            if opened_here:
+                self.close()
+
+
+class BytesMessage:
+    def __init__(self, data: bytes, chunk_size: int = 64 * 1024):
+        data = BARE_LINE_ENDING.sub(CRLF, data)
+        if not data.endswith(CRLF):
+            data += CRLF
+        self.data = data
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_mime(cls, msg) -> 'BytesMessage':
+        """Flatten an email.message object with CRLF line endings"""
+        return cls(msg.as_bytes(policy=msg.policy.clone(linesep='\r\n')))
+
+    def iter_chunks(self, dot_stuff: bool = False) -> Iterator[bytes]:
+        """Yield the already-serialised message in fixed-size chunks"""
+        data = LEADING_DOT.sub(b'..', self.data) if dot_stuff else self.data
+        view = memoryview(data)
+        for offset in range(0, len(data), self.chunk_size):
+            yield bytes(view[offset:offset + self.chunk_size])
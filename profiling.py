@@ -0,0 +1,161 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Dict, List, Tuple
+
+PROFILE_MODES = ('cprofile', 'sampling')
+OFF_MODES = ('', 'off', 'no', 'none')
+
+
+def parse_profile_mode(value: str) -> str:
+    """Normalise a profile mode from config or a prompt; unknown modes fall back to 'off' with a warning"""
+    mode = (value or '').strip().lower()
+    if mode in OFF_MODES:
+        return 'off'
+    if mode not in PROFILE_MODES:
+        print(f"⚠️  Unknown profile mode '{value.strip()}' (use off, {', '.join(PROFILE_MODES)}); "
+              f"profiling is off")
+        return 'off'
+    return mode
+
+
+def _label(filename: str, function_name: str) -> str:
+    """Frame label for collapsed stacks: module:function"""
+    # cProfile reports C functions with the filename '~'
+    module = 'builtins' if filename == '~' else os.path.splitext(os.path.basename(filename))[0] or filename
+    return f"{module}:{function_name}".replace(';', ':').replace(' ', '_')
+
+
+class BatchProfiler:
+    """Profile a block of code with cProfile or a low-overhead sampling profiler
+
+    Writes <output>.collapsed (flamegraph.pl / speedscope compatible) and
+    <output>.txt with the hottest functions; cProfile mode also keeps <output>.prof.
+    """
+
+    def __init__(self, mode: str = 'sampling', output: str = 'profile', interval: float = 0.005, top: int = 25):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (use {' or '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.output = output
+        self.interval = interval
+        self.top = top
+        self.samples = Counter()
+        self.profile = None
+        self._thread_id = None
+        self._sampler = None
+        self._stop = threading.Event()
+        self.elapsed = 0.0
+
+    @classmethod
+    def from_config(cls, config, label: str, mode: str = None, section: str = 'profiling'):
+        """Profiler configured in [profiling] (mode overrides it), or a no-op context when off"""
+        mode = parse_profile_mode(mode or config.get(section, 'mode', fallback='off'))
+        if mode == 'off':
+            return nullcontext()
+        output_dir = config.get(section, 'output_dir', fallback='profiles')
+        os.makedirs(output_dir, exist_ok=True)
+        output = os.path.join(output_dir, f"{label}_{time.strftime('%Y%m%d_%H%M%S')}")
+        return cls(mode, output, config.getfloat(section, 'sample_interval', fallback=0.005))
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self._thread_id = threading.get_ident()
+            self._sampler = threading.Thread(target=self._sample, name='profiler', daemon=True)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.mode == 'cprofile':
+            self.profile.disable()
+        else:
+            self._stop.set()
+            self._sampler.join()
+        self.elapsed = time.perf_counter() - self._started
+        self.write()
+        return False
+
+    def _sample(self):
+        """Record the profiled thread's stack every interval"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code.co_filename, frame.f_code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed_stacks(self) -> Dict[str, int]:
+        """Stack -> weight (samples, or microseconds of own time for cProfile)"""
+        if self.mode == 'sampling':
+            return dict(self.samples)
+
+        stats = pstats.Stats(self.profile).stats
+        stacks = Counter()
+        for function, (_, _, own_time, _, _) in stats.items():
+            weight = int(own_time * 1_000_000)
+            if weight:
+                stacks[';'.join(self._dominant_path(function, stats))] += weight
+        return dict(stacks)
+
+    @staticmethod
+    def _dominant_path(function, stats, limit: int = 64) -> List[str]:
+        """Approximate a call stack by following each function's heaviest caller
+
+        cProfile only records caller/callee pairs, not full stacks.
+        """
+        path = []
+        seen = set()
+        while function is not None and function not in seen and len(path) < limit:
+            seen.add(function)
+            filename, _, function_name = function
+            path.append(_label(filename, function_name))
+            callers = stats.get(function, (0, 0, 0, 0, {}))[4]
+            function = max(callers, key=lambda caller: callers[caller][3]) if callers else None
+        return list(reversed(path))
+
+    def top_functions(self) -> List[Tuple[str, float, float]]:
+        """(function, own seconds, total seconds) for the hottest functions"""
+        if self.mode == 'cprofile':
+            stats = pstats.Stats(self.profile).stats
+            rows = [(_label(f[0], f[2]), own, total) for f, (_, _, own, total, _) in stats.items()]
+        else:
+            own, total = Counter(), Counter()
+            for stack, count in self.samples.items():
+                frames = stack.split(';')
+                own[frames[-1]] += count
+                for frame in set(frames):
+                    total[frame] += count
+            # Samples are taken less often than requested under GIL contention; scale by the real rate
+            per_sample = self.elapsed / max(1, sum(self.samples.values()))
+            rows = [(name, own[name] * per_sample, total[name] * per_sample) for name in total]
+        return sorted(rows, key=lambda row: row[1], reverse=True)[:self.top]
+
+    def write(self):
+        """Write the collapsed stacks and the hot-function summary"""
+        collapsed_path = f"{self.output}.collapsed"
+        with open(collapsed_path, 'w', encoding='utf-8') as file:
+            for stack, weight in sorted(self.collapsed_stacks().items()):
+                file.write(f"{stack} {weight}\n")
+
+        summary_path = f"{self.output}.txt"
+        with open(summary_path, 'w', encoding='utf-8') as file:
+            file.write(f"Profile mode: {self.mode}  wall time: {self.elapsed:.2f}s\n\n")
+            file.write(f"{'own (s)':>10} {'total (s)':>10}  function\n")
+            for name, own, total in self.top_functions():
+                file.write(f"{own:>10.3f} {total:>10.3f}  {name}\n")
+
+        if self.mode == 'cprofile':
+            self.profile.dump_stats(f"{self.output}.prof")
+
+        print(f"📊 Profile written to {collapsed_path} and {summary_path}")
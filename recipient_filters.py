@@ -0,0 +1,140 @@
+import hashlib
+import math
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Above this many expected recipients the deduper switches from a set to a Bloom filter
+DEFAULT_BLOOM_THRESHOLD = 1_000_000
+MAX_REPORTED_DUPLICATES = 20
+
+
+def normalize_email(address: str, fold_plus: bool = False) -> Optional[str]:
+    """Canonical form of an address for duplicate detection, or None if it is not an address
+
+    Strips whitespace and angle brackets, lowercases, converts an internationalized
+    domain to its ASCII (punycode) form and, with fold_plus, drops a +tag from the
+    local part (jane+news@example.com -> jane@example.com).
+    """
+    address = (address or '').strip().strip('<>').strip()
+    local, separator, domain = address.rpartition('@')
+    if not separator or not local or not domain:
+        return None
+    local = local.lower()
+    if fold_plus and '+' in local:
+        local = local.split('+', 1)[0]
+    domain = domain.rstrip('.').lower()
+    if not domain.isascii():
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            return None
+    return f"{local}@{domain}"
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, false positives at about error_rate"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> bool:
+        """Add item; returns True if it was (probably) already present"""
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
+
+
+class DedupReport:
+    def __init__(self, probabilistic: bool = False):
+        self.probabilistic = probabilistic
+        self.total = 0
+        self.kept = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.samples: List[str] = []
+
+    def summary(self) -> str:
+        text = f"{self.kept} unique, {self.duplicates} duplicate(s) dropped"
+        if self.invalid:
+            text += f", {self.invalid} invalid"
+        if self.probabilistic and self.duplicates:
+            text += " (Bloom filter; a few may be false positives)"
+        return text
+
+
+class RecipientDeduper:
+    """Normalization and duplicate detection for recipient addresses
+
+    Uses a hash set, or a Bloom filter when more than bloom_threshold recipients
+    are expected, trading a small false-positive rate for bounded memory.
+    """
+
+    def __init__(self, fold_plus: bool = False, expected: int = None,
+                 bloom_threshold: int = DEFAULT_BLOOM_THRESHOLD, error_rate: float = 0.0001):
+        self.fold_plus = fold_plus
+        use_bloom = bool(expected and bloom_threshold and expected > bloom_threshold)
+        self._seen = BloomFilter(expected, error_rate) if use_bloom else set()
+        self.report = DedupReport(probabilistic=use_bloom)
+
+    @classmethod
+    def from_config(cls, config, expected: int = None, section: str = 'sending_settings') -> 'RecipientDeduper':
+        """Build a deduper from [sending_settings]"""
+        return cls(
+            fold_plus=config.getboolean(section, 'dedup_fold_plus', fallback=False),
+            expected=expected,
+            bloom_threshold=config.getint(section, 'dedup_bloom_threshold', fallback=DEFAULT_BLOOM_THRESHOLD)
+        )
+
+    def check(self, address: str) -> str:
+        """'new', 'duplicate' or 'invalid'; new addresses are remembered"""
+        self.report.total += 1
+        key = normalize_email(address, self.fold_plus)
+        if key is None:
+            self.report.invalid += 1
+            return 'invalid'
+        if isinstance(self._seen, set):
+            duplicate = key in self._seen
+            self._seen.add(key)
+        else:
+            duplicate = self._seen.add(key)
+        if duplicate:
+            self.report.duplicates += 1
+            if len(self.report.samples) < MAX_REPORTED_DUPLICATES:
+                self.report.samples.append(address.strip())
+            return 'duplicate'
+        self.report.kept += 1
+        return 'new'
+
+    def filter_emails(self, addresses: Iterable[str]) -> List[str]:
+        """Unique addresses (first occurrence, whitespace stripped); invalid ones are kept for the sender to report"""
+        return [address.strip() for address in addresses if self.check(address) != 'duplicate']
+
+    def filter_records(self, records: Iterable[Dict], on_duplicate=None, field: str = 'email') -> Iterator[Dict]:
+        """Stream records, dropping those whose address was already seen
+
+        on_duplicate(record) is called for each dropped record.
+        """
+        for record in records:
+            if self.check(record.get(field) or '') == 'duplicate':
+                if on_duplicate:
+                    on_duplicate(record)
+                continue
+            yield record
@@ -0,0 +1,68 @@
+import csv
+from typing import Dict, Iterator, List
+
+from contact_exporter import open_text
+
+# Contact fields passed to generation as recipient details
+PERSONALIZATION_FIELDS = ('company', 'position')
+
+
+def personalization(record: Dict) -> Dict[str, str]:
+    """Non-empty personalization fields of a recipient record"""
+    details = {}
+    for field in PERSONALIZATION_FIELDS:
+        value = (record.get(field) or '').strip()
+        if value:
+            details[field] = value
+    return details
+
+
+def csv_recipients(csv_file_path: str) -> Iterator[Dict]:
+    """Stream recipient rows (name, email, message, tone[, company, position]) from a CSV file (.csv.gz too)"""
+    with open_text(csv_file_path, 'r', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+class ContactBatchSource:
+    """Batch recipients streamed straight from the contact store
+
+    Contacts are selected with a segment query (see ContactIndex.query) or a
+    free-text search, and every record carries the campaign message and tone
+    plus the contact's personalization fields. Records are built one at a
+    time, so a large segment is never copied into a CSV or a second list of dicts.
+    """
+
+    def __init__(self, contact_manager, message: str, tone: str = 'Formal', segment: str = None,
+                 search: str = None, all_emails: bool = False):
+        if not segment and not search:
+            raise ValueError("A segment query or a search term is required")
+        self.contact_manager = contact_manager
+        self.message = message
+        self.tone = tone
+        self.all_emails = all_emails
+        if segment:
+            self.names: List[str] = sorted(contact_manager.find_segment(segment))
+        else:
+            self.names = contact_manager.search_contacts(search)
+
+    def __len__(self) -> int:
+        """Number of records the source will yield"""
+        contacts = self.contact_manager.contacts
+        if not self.all_emails:
+            return sum(1 for name in self.names if contacts.get(name, {}).get('emails'))
+        return sum(len(contacts[name].get('emails', [])) for name in self.names if name in contacts)
+
+    def __iter__(self) -> Iterator[Dict]:
+        contacts = self.contact_manager.contacts
+        for name in self.names:
+            contact = contacts.get(name)
+            # Contacts deleted or left without an email since selection are skipped
+            if not contact or not contact.get('emails'):
+                continue
+            emails = contact['emails'] if self.all_emails else contact['emails'][:1]
+            for email in emails:
+                record = {'name': name, 'email': email, 'message': self.message, 'tone': self.tone}
+                for field in PERSONALIZATION_FIELDS:
+                    if contact.get(field):
+                        record[field] = contact[field]
+                yield record
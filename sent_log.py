@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+
+from recipient_filters import normalize_email
+
+
+def content_hash(*parts) -> str:
+    """sha256 over the parts that define a message (subject, body, attachments, or a batch's message request)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def idempotency_key(account_email: str, recipient: str, message_hash: str, campaign_id: str) -> str:
+    """Stable key for 'this account sends this content to this recipient in this campaign'"""
+    recipient = normalize_email(recipient) or (recipient or '').strip().lower()
+    return content_hash((account_email or '').strip().lower(), recipient, message_hash, campaign_id)
+
+
+def message_id(key: str, account_email: str) -> str:
+    """Message-ID derived from an idempotency key, identical on every retry"""
+    domain = (account_email or '').rpartition('@')[2] or 'localhost'
+    return f"<{key[:40]}@{domain}>"
+
+
+class SentLog:
+    """Append-only JSON Lines log of delivered messages, indexed by idempotency key
+
+    Every successful send appends {"key", "recipient", "campaign", "message_id",
+    "sent_at"}; on load the keys go into a set of 32-byte digests, so checking
+    whether a message was already delivered is O(1) however long the log is.
+    Keys claimed by an in-flight send are held separately so concurrent
+    workers in one process never deliver the same message twice.
+    """
+
+    def __init__(self, path: str = 'sent_log.jsonl'):
+        self.path = path
+        self._sent = set()
+        self._in_flight = set()
+        self._file = None
+        self.load()
+
+    @classmethod
+    def from_config(cls, config, section: str = 'sending_settings') -> Optional['SentLog']:
+        """Sent log from [sending_settings] sent_log_file; None when blank (the default)"""
+        path = config.get(section, 'sent_log_file', fallback='').strip()
+        return cls(path) if path else None
+
+    def load(self):
+        self._sent = set()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    self._sent.add(bytes.fromhex(json.loads(line)['key']))
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash only loses that one entry
+                    continue
+
+    def __len__(self) -> int:
+        return len(self._sent)
+
+    def __contains__(self, key: str) -> bool:
+        return bytes.fromhex(key) in self._sent
+
+    def any_sent(self, keys: Iterable[str]) -> bool:
+        return any(key in self for key in keys)
+
+    def claim(self, key: str) -> bool:
+        """Reserve a key before sending; False if it was already sent or is being sent"""
+        digest = bytes.fromhex(key)
+        if digest in self._sent or digest in self._in_flight:
+            return False
+        self._in_flight.add(digest)
+        return True
+
+    def release(self, key: str):
+        """Give up a claim after a failed send so a retry can try again"""
+        self._in_flight.discard(bytes.fromhex(key))
+
+    def record(self, key: str, recipient: str, campaign_id: str, message_id: str = None):
+        """Mark a key as delivered and append it to the log"""
+        digest = bytes.fromhex(key)
+        self._in_flight.discard(digest)
+        if digest in self._sent:
+            return
+        self._sent.add(digest)
+        if self._file is None:
+            # Line buffered: each entry reaches the file as one append
+            self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+        self._file.write(json.dumps({
+            'key': key, 'recipient': recipient, 'campaign': campaign_id, 'message_id': message_id,
+            'sent_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
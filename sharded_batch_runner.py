@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import configparser
+import csv
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from batch_progress import BatchProgress
+from contact_exporter import open_text
+
+
+def shard_for(email: str, shard_count: int) -> int:
+    """Stable shard index for an email address (same address, same shard, every run)"""
+    return zlib.crc32(email.strip().lower().encode('utf-8')) % shard_count
+
+
+def partition_csv(csv_file_path: str, shard_count: int, output_dir: str) -> Tuple[List[str], List[int]]:
+    """Stream a recipient CSV (or .csv.gz) into one CSV per shard, partitioned by hash of email
+
+    Returns (shard paths, rows written to each shard). An empty file gives
+    empty shards, as it has no header row to copy.
+    """
+    shard_rows = [0] * shard_count
+    shard_paths = [os.path.join(output_dir, f"shard_{i}.csv") for i in range(shard_count)]
+    shard_files = [open(path, 'w', newline='', encoding='utf-8') for path in shard_paths]
+    try:
+        with open_text(csv_file_path, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            if reader.fieldnames is None:
+                return shard_paths, shard_rows
+            writers = [csv.DictWriter(shard_file, fieldnames=reader.fieldnames) for shard_file in shard_files]
+            for writer in writers:
+                writer.writeheader()
+            for row in reader:
+                shard = shard_for(row.get('email') or '', shard_count)
+                writers[shard].writerow(row)
+                shard_rows[shard] += 1
+    finally:
+        for shard_file in shard_files:
+            shard_file.close()
+    return shard_paths, shard_rows
+
+
+def _run_shard(shard_index: int, shard_path: str, config_file: str, account_name: Optional[str],
+               concurrency: Optional[int], progress_queue, campaign_id: Optional[str] = None) -> dict:
+    """Worker process entry point: send one shard with its own pooled connections"""
+    from async_email_sender import AsyncEmailSender
+
+    sender = AsyncEmailSender(config_file=config_file)
+    sender.verbose = False
+    if account_name:
+        if account_name not in sender.email_sender.email_accounts:
+            raise ValueError(f"Unknown email account '{account_name}'")
+        sender.email_sender.current_account = account_name
+
+    def on_result(status, recipient):
+        progress_queue.put((shard_index, status))
+
+    # A re-run with other --workers or --accounts can move a recipient to another account,
+    # so the sent log is checked under every configured account, not just this shard's
+    account_names = list(sender.email_sender.email_accounts)
+
+    async def run():
+        try:
+            with open(shard_path, 'r', encoding='utf-8', newline='') as file:
+                return await sender.send_batch(csv.DictReader(file), concurrency, on_result, campaign_id=campaign_id,
+                                               account_names=account_names)
+        finally:
+            await sender.close()
+            sender.email_sender.close()
+            if sender.email_sender.sent_log is not None:
+                sender.email_sender.sent_log.close()
+
+    summary = asyncio.run(run())
+    summary['shard'] = shard_index
+    summary['account'] = sender.email_sender.current_account
+    return summary
+
+
+class ShardedBatchRunner:
+    def __init__(self, config_file='email_config.cfg', workers: int = None, accounts: List[str] = None,
+                 concurrency: int = None):
+        self.config_file = config_file
+        self.workers = workers or os.cpu_count() or 1
+        self.accounts = accounts or []
+        self.concurrency = concurrency
+        self.config = configparser.ConfigParser()
+        self.config.read(config_file)
+
+    def account_for_shard(self, shard_index: int) -> Optional[str]:
+        """Map shards round-robin onto the configured sending accounts"""
+        if not self.accounts:
+            return None
+        return self.accounts[shard_index % len(self.accounts)]
+
+    def run(self, csv_file_path: str, campaign_id: str = None) -> dict:
+        """Partition the recipient file, send every shard in parallel and merge the results
+
+        campaign_id scopes the sent log (when enabled); shards append to it concurrently
+        and a re-run with the same ID skips recipients already delivered.
+        """
+        from async_email_sender import require_async_support
+
+        # Workers use AsyncEmailSender; fail here rather than once per shard
+        require_async_support()
+        if self.config.get('sending_settings', 'sent_log_file', fallback='').strip() and not campaign_id:
+            print("🧾 No campaign ID given; the sent log is not checked for this run")
+        started = time.monotonic()
+
+        with tempfile.TemporaryDirectory(prefix='email_shards_') as shard_dir:
+            shard_paths, shard_rows = partition_csv(csv_file_path, self.workers, shard_dir)
+            print(f"📋 Partitioned {sum(shard_rows)} recipients into {len(shard_paths)} shard(s)")
+            progress = BatchProgress.from_config(self.config, total=sum(shard_rows))
+
+            with multiprocessing.Manager() as manager:
+                progress_queue = manager.Queue()
+                stop = threading.Event()
+                reporter = threading.Thread(target=self._report_progress, args=(progress_queue, progress, stop),
+                                            daemon=True)
+                reporter.start()
+
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [
+                        executor.submit(_run_shard, i, path, self.config_file, self.account_for_shard(i),
+                                        self.concurrency, progress_queue, campaign_id)
+                        for i, path in enumerate(shard_paths)
+                    ]
+                    shard_summaries = []
+                    failed_shards = []
+                    for shard_index, future in enumerate(futures):
+                        try:
+                            shard_summaries.append(future.result())
+                        except Exception as e:
+                            print(f"❌ Shard {shard_index} worker failed: {e}")
+                            failed_shards.append(shard_index)
+
+                stop.set()
+                reporter.join()
+                progress.close()
+
+        # Worker summaries are authoritative; the queue only drives live progress
+        merged = {'sent': 0, 'failed': 0, 'skipped': 0, 'already_sent': 0, 'shards': shard_summaries,
+                  'failed_shards': failed_shards}
+        for summary in shard_summaries:
+            for key in ('sent', 'failed', 'skipped', 'already_sent'):
+                merged[key] += summary[key]
+        # A crashed worker reports nothing, so every row of its shard counts as failed
+        lost_rows = sum(shard_rows[shard_index] for shard_index in failed_shards)
+        merged['failed'] += lost_rows
+        merged['elapsed'] = time.monotonic() - started
+
+        print(f"\n✅ Sharded batch completed in {merged['elapsed']:.1f}s: "
+              f"{merged['sent']} sent, {merged['failed']} failed, {merged['skipped']} skipped")
+        if merged['already_sent']:
+            print(f"⏭️  {merged['already_sent']} recipient(s) skipped by the sent log: already sent in campaign "
+                  f"'{campaign_id}'")
+        if failed_shards:
+            print(f"❌ Failed shard(s): {', '.join(str(i) for i in failed_shards)} "
+                  f"({lost_rows} recipient(s) counted as failed)")
+        return merged
+
+    def _report_progress(self, progress_queue, progress: BatchProgress, stop: threading.Event):
+        """Coordinator thread: merge per-record progress from all workers"""
+        while not stop.is_set() or not progress_queue.empty():
+            try:
+                _, status = progress_queue.get(timeout=0.2)
+                progress.record(status)
+            except queue.Empty:
+                progress.update()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a large CSV campaign across several worker processes")
+    parser.add_argument('csv_file', help="CSV with name,email,message,tone columns")
+    parser.add_argument('--workers', type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument('--accounts', default='', help="Comma-separated email accounts to spread shards across")
+    parser.add_argument('--concurrency', type=int, default=None, help="In-flight recipients per worker")
+    parser.add_argument('--config', default='email_config.cfg', help="Config file path")
+    parser.add_argument('--campaign', default=None,
+                        help="Campaign ID for the sent log (re-runs with the same ID skip delivered recipients)")
+    args = parser.parse_args()
+
+    runner = ShardedBatchRunner(
+        config_file=args.config,
+        workers=args.workers,
+        accounts=[account.strip() for account in args.accounts.split(',') if account.strip()],
+        concurrency=args.concurrency
+    )
+    runner.run(args.csv_file, args.campaign)
@@ -0,0 +1,170 @@
+import smtplib
+from smtplib import quoteaddr
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from metrics import metrics
+
+# Outstanding BDAT replies allowed before draining them (keeps socket buffers bounded)
+MAX_OUTSTANDING_BDAT = 32
+
+
+# Protocol logic shared by PipeliningSMTP and the asyncio client; callers only do the I/O
+
+def envelope_commands(from_addr: str, to_addrs: List[str], use_data: bool) -> List[str]:
+    """MAIL FROM, one RCPT TO per recipient and, unless the body goes by BDAT, DATA"""
+    commands = [f"MAIL FROM:{quoteaddr(from_addr)}"]
+    commands += [f"RCPT TO:{quoteaddr(recipient)}" for recipient in to_addrs]
+    if use_data:
+        commands.append("DATA")
+    return commands
+
+
+def envelope_continues(replies: List[Tuple[int, bytes]], recipient_count: int) -> bool:
+    """Without PIPELINING: whether to send the next envelope command after these replies"""
+    if replies[0][0] != 250:
+        return False
+    if len(replies) == 1 + recipient_count:
+        # About to send DATA; pointless once every recipient was refused
+        return any(code in (250, 251) for code, _ in replies[1:])
+    return True
+
+
+def envelope_result(from_addr: str, to_addrs: List[str], replies: List[Tuple[int, bytes]],
+                    use_data: bool) -> Tuple[dict, bool, Optional[smtplib.SMTPException]]:
+    """Interpret envelope replies (in command order); returns (refused, data_accepted, error)
+
+    error is the exception to raise after resetting the transaction, or None.
+    data_accepted means the server answered DATA with 354 and is waiting for a body.
+    """
+    mail_code, mail_response = replies[0]
+    refused = {}
+    for recipient, (code, response) in zip(to_addrs, replies[1:]):
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+    data_reply = replies[1 + len(to_addrs)] if use_data and len(replies) > 1 + len(to_addrs) else None
+    data_accepted = data_reply is not None and data_reply[0] == 354
+
+    if mail_code != 250:
+        error = smtplib.SMTPSenderRefused(mail_code, mail_response, from_addr)
+    elif len(refused) == len(to_addrs):
+        error = smtplib.SMTPRecipientsRefused(refused)
+    elif use_data and not data_accepted:
+        error = smtplib.SMTPDataError(*(data_reply or (554, b'DATA not accepted')))
+    else:
+        error = None
+    return refused, data_accepted, error
+
+
+class BdatFrame(NamedTuple):
+    data: bytes
+    replies: int
+    last: bool
+
+
+def bdat_frames(message, pipelining: bool) -> Iterator[BdatFrame]:
+    """Frame the body as BDAT commands; after sending each frame, read frame.replies replies
+
+    With PIPELINING replies are read in batches of MAX_OUTSTANDING_BDAT,
+    otherwise after every chunk. The final frame is BDAT ... LAST.
+    """
+    outstanding = 0
+    previous = None
+    sent_bytes = 0
+    for chunk in message.iter_chunks(dot_stuff=False):
+        if previous is not None:
+            outstanding += 1
+            sent_bytes += len(previous)
+            flush = not pipelining or outstanding >= MAX_OUTSTANDING_BDAT
+            yield BdatFrame(b'BDAT %d\r\n' % len(previous) + previous, outstanding if flush else 0, False)
+            if flush:
+                outstanding = 0
+        previous = chunk
+
+    last = previous or b''
+    metrics.incr('smtp_bytes_sent', sent_bytes + len(last))
+    yield BdatFrame(b'BDAT %d LAST\r\n' % len(last) + last, outstanding + 1, True)
+
+
+class PipeliningSMTP(smtplib.SMTP):
+    """SMTP client that uses ESMTP PIPELINING (RFC 2920) and CHUNKING (RFC 3030) when advertised
+
+    in_message is True while message data is being sent; if a send fails in
+    that state the session cannot be reused or QUIT cleanly, only closed.
+    """
+
+    in_message = False
+
+    def send_streamed(self, from_addr: str, to_addrs: List[str], message) -> dict:
+        """Send a message object exposing iter_chunks(dot_stuff); returns refused recipients"""
+        self.ehlo_or_helo_if_needed()
+        pipelining = self.has_extn('pipelining')
+        chunking = self.has_extn('chunking')
+
+        commands = envelope_commands(from_addr, to_addrs, use_data=not chunking)
+        if pipelining:
+            # MAIL FROM, every RCPT TO (and DATA) in one flight, then the replies in order
+            self.send(''.join(command + '\r\n' for command in commands))
+            replies = [self.getreply() for _ in commands]
+        else:
+            replies = []
+            for command in commands:
+                self.putcmd(command)
+                replies.append(self.getreply())
+                if not envelope_continues(replies, len(to_addrs)):
+                    break
+
+        refused, data_accepted, error = envelope_result(from_addr, to_addrs, replies, use_data=not chunking)
+        if error is not None:
+            if data_accepted:
+                # Server accepted DATA anyway; close it with an empty body before resetting
+                self.send('.\r\n')
+                self.getreply()
+            self._rset()
+            raise error
+
+        self.in_message = True
+        if chunking:
+            self._send_bdat(message, pipelining)
+        else:
+            self._send_data(message)
+        self.in_message = False
+        return refused
+
+    def _send_data(self, message):
+        """Stream a dot-stuffed message body after DATA"""
+        sent_bytes = 0
+        for chunk in message.iter_chunks(dot_stuff=True):
+            self.sock.sendall(chunk)
+            sent_bytes += len(chunk)
+        self.sock.sendall(b'.\r\n')
+        metrics.incr('smtp_bytes_sent', sent_bytes)
+
+        code, response = self.getreply()
+        # The transaction is over either way; the session is back in command state
+        self.in_message = False
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+
+    def _send_bdat(self, message, pipelining: bool):
+        """Send the body as BDAT chunks; with PIPELINING the replies are read in batches"""
+        for frame in bdat_frames(message, pipelining):
+            self.sock.sendall(frame.data)
+            for index in range(frame.replies):
+                code, response = self.getreply()
+                if code != 250:
+                    if frame.last and index == frame.replies - 1:
+                        # Nothing is left in flight, so the session can be reset and reused
+                        self.in_message = False
+                        self._rset()
+                    raise smtplib.SMTPDataError(code, response)
+
+    def close(self):
+        self.in_message = False
+        super().close()
+
+    def _rset(self):
+        """Reset the transaction, ignoring errors on a broken connection"""
+        try:
+            self.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
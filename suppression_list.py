@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+import sys
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from contact_exporter import open_text
+from recipient_filters import normalize_email
+
+SUPPRESSION_REASONS = ('unsubscribed', 'bounced', 'complaint', 'manual')
+# Larger additions re-sort once instead of inserting one by one
+BULK_ADD_THRESHOLD = 64
+
+
+class SuppressionList:
+    """Persistent set of addresses that must never be sent to
+
+    Entries live in a JSON Lines file (one {"email", "reason", "added_at"} per
+    line); additions are appended, removals rewrite the file. In memory the
+    normalized addresses are kept in a sorted list searched with bisect, with a
+    parallel list of interned reasons, so a large list costs little more than
+    its strings. An entry like '@example.com' suppresses a whole domain, and
+    suppressing jane@example.com also covers jane+news@example.com.
+    """
+
+    def __init__(self, path: str = 'suppression_list.jsonl'):
+        self.path = path
+        self._keys: List[str] = []
+        self._reasons: List[str] = []
+        self.load()
+
+    @classmethod
+    def from_config(cls, config, section: str = 'sending_settings') -> Optional['SuppressionList']:
+        """Suppression list from [sending_settings] suppression_file; None when blank"""
+        path = config.get(section, 'suppression_file', fallback='suppression_list.jsonl').strip()
+        return cls(path) if path else None
+
+    @staticmethod
+    def _key(address: str) -> Optional[str]:
+        address = (address or '').strip()
+        if address.startswith('@'):
+            domain = normalize_email('x' + address)
+            return domain[1:] if domain else None
+        return normalize_email(address)
+
+    def load(self):
+        """Read the suppression file; later lines override earlier ones"""
+        self._keys, self._reasons = [], []
+        if not self.path or not os.path.exists(self.path):
+            return
+        entries = {}
+        with open_text(self.path, 'r') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                key = self._key(entry.get('email', ''))
+                if key:
+                    entries[key] = sys.intern(entry.get('reason') or 'manual')
+        for key in sorted(entries):
+            self._keys.append(key)
+            self._reasons.append(entries[key])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _find(self, key: str) -> int:
+        index = bisect_left(self._keys, key)
+        return index if index < len(self._keys) and self._keys[index] == key else -1
+
+    def reason(self, address: str) -> Optional[str]:
+        """Why an address is suppressed, or None if it may be sent to"""
+        key = normalize_email(address)
+        if key is None or not self._keys:
+            return None
+        local, _, domain = key.partition('@')
+        candidates = [key, '@' + domain]
+        if '+' in local:
+            candidates.append(f"{local.split('+', 1)[0]}@{domain}")
+        for candidate in candidates:
+            index = self._find(candidate)
+            if index >= 0:
+                return self._reasons[index]
+        return None
+
+    def __contains__(self, address: str) -> bool:
+        return self.reason(address) is not None
+
+    def add(self, address: str, reason: str = 'manual') -> bool:
+        """Suppress an address (or @domain); returns False if it is invalid or already suppressed"""
+        return self.add_many([address], reason) == 1
+
+    def add_many(self, addresses: Iterable[str], reason: str = 'manual') -> int:
+        """Suppress many addresses with one append to the file; returns how many were new"""
+        reason = sys.intern(reason or 'manual')
+        added_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        new_keys = {}
+        for address in addresses:
+            key = self._key(address)
+            if key and key not in new_keys and self._find(key) < 0:
+                new_keys[key] = None
+        if len(new_keys) > BULK_ADD_THRESHOLD:
+            entries = sorted(list(zip(self._keys, self._reasons)) + [(key, reason) for key in new_keys])
+            self._keys = [key for key, _ in entries]
+            self._reasons = [entry_reason for _, entry_reason in entries]
+        else:
+            for key in new_keys:
+                index = bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._reasons.insert(index, reason)
+        if new_keys:
+            with open_text(self.path, 'a') as file:
+                for key in new_keys:
+                    file.write(json.dumps({'email': key, 'reason': reason, 'added_at': added_at}, ensure_ascii=False))
+                    file.write('\n')
+        return len(new_keys)
+
+    def remove(self, address: str) -> bool:
+        """Lift a suppression and rewrite the file without it"""
+        key = self._key(address)
+        index = self._find(key) if key else -1
+        if index < 0:
+            return False
+        del self._keys[index]
+        del self._reasons[index]
+        remaining = []
+        with open_text(self.path, 'r') as file:
+            for line in file:
+                try:
+                    if line.strip() and self._key(json.loads(line).get('email', '')) != key:
+                        remaining.append(line)
+                except json.JSONDecodeError:
+                    continue
+        with open_text(self.path, 'w') as file:
+            file.writelines(remaining)
+        return True
+
+    def import_file(self, path: str, reason: str = 'bounced') -> int:
+        """Suppress every address in a CSV (email column) or plain list, e.g. an ESP bounce export"""
+        with open_text(path, 'r', newline='') as file:
+            first = file.readline()
+            file.seek(0)
+            if ',' in first and 'email' in first.lower():
+                addresses = (row.get('email') or row.get('Email') or '' for row in csv.DictReader(file))
+            else:
+                addresses = (line.split(',')[0] for line in file)
+            return self.add_many(addresses, reason)
+
+    def entries(self) -> Iterator[Tuple[str, str]]:
+        """(address, reason) in address order"""
+        return zip(self._keys, self._reasons)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {}
+        for reason in self._reasons:
+            counts[reason] = counts.get(reason, 0) + 1
+        return counts
+
+    def partition(self, addresses: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """(allowed, suppressed) addresses, order preserved"""
+        allowed, suppressed = [], []
+        for address in addresses:
+            (suppressed if address in self else allowed).append(address)
+        return allowed, suppressed
+
+    def filter_records(self, records: Iterable[Dict], on_suppressed=None, field: str = 'email') -> Iterator[Dict]:
+        """Stream records, dropping suppressed addresses
+
+        on_suppressed(record, reason) is called for each dropped record.
+        """
+        for record in records:
+            reason = self.reason(record.get(field) or '')
+            if reason:
+                if on_suppressed:
+                    on_suppressed(record, reason)
+                continue
+            yield record
@@ -0,0 +1,112 @@
+import re
+from itertools import repeat
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+FIELD_PATTERN = re.compile(r'\{(\w+)\}')
+
+FALLBACK_GREETINGS = {
+    "Formal (Full)": "Dear {recipient_name},",
+    "Formal": "Dear {recipient_name},",
+    "Formal + Casual": "Hello {recipient_name},",
+    "Casual": "Hi {recipient_name},",
+    "Casual + Friendly": "Hey {recipient_name}!"
+}
+
+FALLBACK_BODY = """Subject: {subject}
+
+
+{greeting}
+
+I hope this message finds you well.
+
+{message_request}{attachment_mention}
+
+Please let me know if you have any questions or need additional information.
+
+{signature}
+{ai_footer}
+"""
+
+DEFAULT_GREETING = "Dear {recipient_name},"
+
+
+def build_fallback_templates() -> Dict[str, str]:
+    """Build the fallback email template for each tone"""
+    return {tone: FALLBACK_BODY.replace('{greeting}', greeting)
+            for tone, greeting in FALLBACK_GREETINGS.items()}
+
+
+class CompiledTemplate:
+    __slots__ = ('fields', '_format')
+
+    def __init__(self, fields: Tuple[str, ...], format_string: str):
+        self.fields = fields
+        self._format = format_string
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Render a single email from a dict of field values"""
+        return self._format.format(*[values.get(name, '') for name in self.fields])
+
+    def render_columns(self, columns: Dict[str, Union[str, Sequence[str]]], count: int) -> List[str]:
+        """Render many emails from column-oriented field values
+
+        A plain string value is broadcast to every row.
+        """
+        args = []
+        for name in self.fields:
+            column = columns.get(name, '')
+            args.append(repeat(column, count) if isinstance(column, str) else column)
+        return list(map(self._format.format, *args))
+
+
+def compile_template(text: str, constants: Dict[str, str] = None) -> CompiledTemplate:
+    """Parse a {field} template once, folding constant fields into the literal text"""
+    constants = constants or {}
+    fields = []
+    parts = []
+    position = 0
+
+    for match in FIELD_PATTERN.finditer(text):
+        parts.append(_escape(text[position:match.start()]))
+        name = match.group(1)
+        if name in constants:
+            parts.append(_escape(constants[name]))
+        else:
+            parts.append(f"{{{len(fields)}}}")
+            fields.append(name)
+        position = match.end()
+
+    parts.append(_escape(text[position:]))
+    return CompiledTemplate(tuple(fields), ''.join(parts))
+
+
+def _escape(literal: str) -> str:
+    """Escape braces so literal text survives str.format"""
+    return literal.replace('{', '{{').replace('}', '}}')
+
+
+class TemplateEngine:
+    def __init__(self, templates: Dict[str, str], default_template: str = None):
+        self.templates = templates
+        self.default_template = default_template
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tone: str, account: str, constants_factory: Callable[[], Dict[str, str]]) -> CompiledTemplate:
+        """Get the compiled renderer for (tone, account), compiling it on first use"""
+        key = (tone, account)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        text = self.templates.get(tone, self.default_template)
+        compiled = compile_template(text, constants_factory())
+        self._cache[key] = compiled
+        return compiled
+
+    def clear(self):
+        """Drop compiled renderers (after signature, footer or account changes)"""
+        self._cache.clear()